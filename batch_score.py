@@ -0,0 +1,283 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# =====================================================
+# 오프라인 일괄 스코어링 (서버 없이 main 스코어 엔진 사용)
+#   python batch_score.py --input weekend.csv --out picks.csv
+#   python batch_score.py --history snapshot.parquet --input all.parquet \
+#       --out rescored.parquet --workers 8 --chunk-size 100000
+#
+# 히스토리로 load_data() 와 같은 집계를 만든 뒤
+# 입력 경기를 secret_score_fast / secret_pick_brain 기준으로 채점
+# 입력은 청크 단위로 읽어 프로세스 풀에 나눠 주고, 결과는 순서대로 바로 기록
+# (동시에 메모리에 있는 청크 수 = 워커 수 × 2)
+# =====================================================
+
+OUTPUT_COLUMNS = [
+    "no", "year", "round", "league", "home", "away", "type",
+    "pick", "EV", "sample",
+    "sp_pick", "confidence", "wp", "dp", "lp",
+    "secret"
+]
+
+ENGINE = {}
+
+
+def import_main():
+    # main 은 import 시점에 작업 폴더의 DATA_FILE 을 읽으므로 빈 폴더에서 import
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="secretcore_batch_"))
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
+
+
+def text_frame(df):
+    # CSV (dtype=str) 읽기와 같게: 값은 문자열, 결측은 NaN ("None"/"nan" 문자열 방지)
+    return df.astype("string").astype(object).where(df.notna(), np.nan)
+
+
+def read_frame(path):
+
+    if path.endswith(".parquet"):
+        return text_frame(pd.read_parquet(path))
+
+    return pd.read_csv(path, encoding="utf-8-sig", dtype=str, low_memory=False)
+
+
+def iter_chunks(path, chunk_size):
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield text_frame(batch.to_pandas())
+        return
+
+    yield from pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        dtype=str,
+        chunksize=chunk_size,
+        low_memory=False
+    )
+
+
+def build_engine(history_path, league_blend):
+
+    main = import_main()
+
+    df = read_frame(history_path)
+    if df.shape[1] != main.EXPECTED_COLS:
+        raise SystemExit(f"히스토리 컬럼 불일치: {df.shape[1]} / 기대값 {main.EXPECTED_COLS}")
+
+    main.LEAGUE_MODE = league_blend
+    main.CURRENT_DF = main.encode_frame(df)
+    main.rebuild_caches(main.CURRENT_DF)
+
+    # 워커에 넘길 집계 표 (CountTable/dict 는 pickle 가능)
+    return main, {
+        "five_cond": main.FIVE_COND_DIST,
+        "odds": main.ODDS_DIST_CACHE,
+        "league_cond": main.LEAGUE_COND_DIST,
+        "league_weight": dict(main.LEAGUE_WEIGHT),
+        "league_mode": league_blend
+    }
+
+
+def init_worker(tables):
+
+    main = import_main()
+
+    main.FIVE_COND_DIST = tables["five_cond"]
+    main.ODDS_DIST_CACHE = tables["odds"]
+    main.LEAGUE_COND_DIST = tables["league_cond"]
+    main.LEAGUE_WEIGHT = tables["league_weight"]
+    main.LEAGUE_MODE = tables["league_mode"]
+
+    ENGINE["main"] = main
+
+
+def score_chunk(chunk):
+
+    main = ENGINE["main"]
+    out = []
+
+    for row in chunk.itertuples(index=False):
+
+        sec = main.secret_score_fast_tuple(row)
+        brain = main.secret_pick_brain_tuple(row)
+        prob = brain["확률"]
+
+        # /matches 의 시크릿 판정과 동일
+        is_secret = bool(
+            sec["score"] > 0.05 and
+            sec["sample"] >= 20 and
+            sec["추천"] != "없음"
+        )
+
+        out.append((
+            row[main.COL_NO],
+            row[main.COL_YEAR],
+            row[main.COL_ROUND],
+            row[main.COL_LEAGUE],
+            row[main.COL_HOME],
+            row[main.COL_AWAY],
+            row[main.COL_TYPE],
+            sec["추천"],
+            sec["score"],
+            sec["sample"],
+            brain["추천"],
+            float(brain["confidence"]),
+            float(prob["승"]),
+            float(prob["무"]),
+            float(prob["패"]),
+            is_secret
+        ))
+
+    return pd.DataFrame(out, columns=OUTPUT_COLUMNS)
+
+
+class ResultWriter:
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.writer = None
+        self.rows = 0
+
+    def write(self, frame):
+
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(
+                self.path,
+                mode="w" if self.rows == 0 else "a",
+                header=self.rows == 0,
+                index=False,
+                encoding="utf-8-sig" if self.rows == 0 else "utf-8"
+            )
+
+        self.rows += len(frame)
+
+    def close(self):
+
+        # 결과가 없어도 헤더/스키마만 있는 파일은 남김
+        if self.rows == 0:
+            self.write(pd.DataFrame(columns=OUTPUT_COLUMNS))
+
+        if self.writer is not None:
+            self.writer.close()
+
+
+def filter_chunk(chunk, main, upcoming_only):
+
+    if chunk.shape[1] != main.EXPECTED_COLS:
+        raise SystemExit(f"입력 컬럼 불일치: {chunk.shape[1]} / 기대값 {main.EXPECTED_COLS}")
+
+    if upcoming_only:
+        chunk = chunk[chunk.iloc[:, main.COL_RESULT] == "경기전"]
+
+    return chunk
+
+
+def run(args):
+
+    start = time.perf_counter()
+    main, tables = build_engine(args.history, args.league_blend)
+
+    print(
+        f"[batch] 히스토리 {len(main.CURRENT_DF)}행 집계 "
+        f"{time.perf_counter() - start:.2f}s",
+        file=sys.stderr
+    )
+
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "csv")
+    writer = ResultWriter(args.out, fmt)
+    chunks = iter_chunks(args.input, args.chunk_size)
+
+    if args.workers <= 1:
+
+        init_worker(tables)
+
+        for chunk in chunks:
+            chunk = filter_chunk(chunk, main, args.upcoming_only)
+            writer.write(score_chunk(chunk))
+            print(f"[batch] {writer.rows}행", file=sys.stderr)
+
+    else:
+
+        # 제출 청크 수 제한 → 입력 크기와 무관하게 메모리 일정
+        pending = deque()
+
+        with ProcessPoolExecutor(
+            args.workers,
+            initializer=init_worker,
+            initargs=(tables,)
+        ) as pool:
+
+            for chunk in chunks:
+
+                chunk = filter_chunk(chunk, main, args.upcoming_only)
+                pending.append(pool.submit(score_chunk, chunk))
+
+                while len(pending) >= args.workers * 2:
+                    writer.write(pending.popleft().result())
+                    print(f"[batch] {writer.rows}행", file=sys.stderr)
+
+            while pending:
+                writer.write(pending.popleft().result())
+                print(f"[batch] {writer.rows}행", file=sys.stderr)
+
+    writer.close()
+
+    print(
+        f"[batch] 완료: {writer.rows}행 → {args.out} ({fmt}) "
+        f"{time.perf_counter() - start:.2f}s",
+        file=sys.stderr
+    )
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description="SecretCore 오프라인 일괄 스코어링")
+
+    parser.add_argument("--history", default="current_data.csv",
+                        help="집계용 히스토리 CSV/Parquet (기본: current_data.csv)")
+    parser.add_argument("--input", required=True,
+                        help="채점할 경기 CSV/Parquet (히스토리와 같은 17컬럼, 문자열)")
+    parser.add_argument("--out", required=True, help="결과 파일 (.csv / .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="출력 형식 (기본: 확장자 기준)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--upcoming-only", action="store_true",
+                        help="결과가 경기전인 행만 채점")
+    parser.add_argument("--league-blend", action="store_true",
+                        help="리그 5조건 분포 혼합 모드 (SECRETCORE_LEAGUE_MODE=blend 와 동일)")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,67 @@
+import asyncio
+from urllib.parse import urlencode
+
+# =====================================================
+# 인프로세스 ASGI 호출 (httpx 등 외부 의존성 없이 app 직접 호출)
+# =====================================================
+
+async def asgi_request(app, method, path, params=None, body=b"", headers=None):
+
+    query = urlencode(params or {}, doseq=True)
+
+    raw_headers = [(b"host", b"bench.local")]
+    for k, v in (headers or {}).items():
+        raw_headers.append((k.lower().encode("latin-1"), v.encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("latin-1"),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench.local", 80)
+    }
+
+    done = asyncio.Event()
+    sent_body = {"value": False}
+    response = {"status": None, "headers": [], "body": []}
+
+    async def receive():
+        if not sent_body["value"]:
+            sent_body["value"] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+
+    return response["status"], b"".join(response["body"])
+
+
+def multipart_body(field, filename, content, content_type="text/csv"):
+
+    boundary = "----secretcorebench"
+
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
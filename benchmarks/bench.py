@@ -0,0 +1,289 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synth_data import generate, write_csv
+from asgi_client import asgi_request
+
+# =====================================================
+# 벤치마크 (합성 데이터 기준 로드/빌드/스코어/엔드포인트 측정)
+#   python benchmarks/bench.py --rows 10000 100000 --out bench.json
+#   python benchmarks/bench.py --rows 10000 --compare bench.json
+# =====================================================
+
+HEAVY_ENDPOINTS = {"/strategy-sim", "/round-roi"}
+
+
+def import_main(workdir):
+    # main 은 import 시점에 DATA_FILE 을 읽으므로 빈 작업 폴더에서 import
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
+
+
+def measure(fn, repeat):
+
+    times = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "first_ms": round(times[0], 3),
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3),
+        "n": len(times)
+    }
+
+
+def upcoming_rows(main):
+    df = main.CURRENT_DF
+    return df[df.iloc[:, main.COL_RESULT] == "경기전"]
+
+
+def bench_functions(main, repeat):
+
+    results = {}
+    results["load_data"] = measure(main.load_data, 1)
+
+    df = main.CURRENT_DF
+    upcoming = upcoming_rows(main)
+    tuples = list(upcoming.itertuples(index=False))
+    series_rows = [row for _, row in upcoming.head(200).iterrows()]
+
+    results["frame_codes"] = measure(lambda: main.frame_codes(main.CURRENT_DF), repeat)
+    codes = main.frame_codes(main.CURRENT_DF)
+
+    # 빌더는 공통 코드를 받아 측정 (rebuild_caches 와 동일 조건)
+    for name in ("build_five_cond_cache", "build_league_weight", "build_odds_cache",
+                 "build_condition_cube", "build_odds_index", "build_similar_index"):
+        fn = getattr(main, name)
+        results[name] = measure(lambda: fn(main.CURRENT_DF, codes), repeat)
+
+    results["rebuild_caches"] = measure(lambda: main.rebuild_caches(main.CURRENT_DF), 1)
+
+    results["score.secret_score_fast_tuple"] = measure(
+        lambda: [main.secret_score_fast_tuple(r) for r in tuples], repeat
+    )
+    results["score.secret_pick_brain_tuple"] = measure(
+        lambda: [main.secret_pick_brain_tuple(r) for r in tuples], repeat
+    )
+    results["score.secret_score_fast"] = measure(
+        lambda: [main.secret_score_fast(r, df) for r in series_rows], repeat
+    )
+    results["score.secret_pick_brain"] = measure(
+        lambda: [main.secret_pick_brain(r, df) for r in series_rows], repeat
+    )
+
+    return results
+
+
+def check_cube(main, samples=20):
+
+    # 큐브 합산 == 완료 경기 직접 필터 (리그 등 NaN 행 포함 데이터에서 부분집합별 비교)
+    df = main.CURRENT_DF
+    result = df.iloc[:, main.COL_RESULT]
+    completed = df[result.notna() & (result != "경기전")]
+    keys = upcoming_rows(main).head(samples)
+
+    mismatches = []
+
+    for size in range(len(main.CUBE_DIMS) + 1):
+        for cols in itertools.combinations(main.CUBE_DIMS, size):
+            for _, row in keys.iterrows():
+
+                values = {c: row.iloc[c] for c in cols}
+                if any(pd.isna(v) for v in values.values()):
+                    continue
+
+                dist = main.cube_dist(values)
+                if dist is None:
+                    continue
+
+                rows = main.run_filter(completed, values)
+                expected = [len(rows)] + [
+                    int((rows.iloc[:, main.COL_RESULT] == label).sum())
+                    for label in main.RESULT_LABELS
+                ]
+
+                if [int(dist[k]) for k in ("총", "승", "무", "패")] != expected:
+                    mismatches.append({"cols": list(cols), "no": row.iloc[main.COL_NO]})
+
+    return mismatches
+
+
+def bench_endpoints(main, repeat):
+
+    results = {}
+    nos = upcoming_rows(main).iloc[:, main.COL_NO].tolist() or ["1"]
+    loop = asyncio.new_event_loop()
+
+    def call(path, params):
+        status, _ = loop.run_until_complete(
+            asgi_request(main.app, "GET", path, params)
+        )
+        if status >= 400:
+            raise RuntimeError(f"{path} {params} → {status}")
+
+    def per_match(path, extra=None):
+        state = {"i": 0}
+        def fn():
+            no = nos[state["i"] % len(nos)]
+            state["i"] += 1
+            call(path, dict({"no": no}, **(extra or {})))
+        return fn
+
+    cases = {
+        "/matches": lambda: call("/matches", {}),
+        "/matches?limit=30": lambda: call("/matches", {"limit": 30, "sort": "confidence"}),
+        "/top-ev": lambda: call("/top-ev", {}),
+        "/detail": per_match("/detail"),
+        "/page3": per_match("/page3", {"away": 0}),
+        "/page4": per_match("/page4"),
+        "/strategy-sim": lambda: call("/strategy-sim", {"wait": 3600}),
+        "/round-roi": lambda: call("/round-roi", {"wait": 3600})
+    }
+
+    for path, fn in cases.items():
+
+        if path in HEAVY_ENDPOINTS:
+            # 버전별 작업 캐시를 비워서 실제 계산 시간을 측정
+            def cold(fn=fn):
+                main.JOB_RESULTS.clear()
+                fn()
+            results["asgi" + path] = measure(cold, 1)
+        else:
+            results["asgi" + path] = measure(fn, repeat)
+
+    loop.close()
+    return results
+
+
+def run(args):
+
+    workdir = tempfile.mkdtemp(prefix="secretcore-bench-")
+    main = import_main(workdir)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": main.pd.__version__,
+            "numpy": main.np.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": {}
+    }
+
+    for rows in args.rows:
+
+        print(f"== {rows} rows")
+
+        data = generate(rows, upcoming=args.upcoming, seed=args.seed)
+        path = os.path.join(workdir, f"data_{rows}.csv")
+        write_csv(data, path)
+        del data
+
+        main.DATA_FILE = path
+        main.DIST_CACHE.clear()
+        main.SECRET_CACHE.clear()
+
+        results = bench_functions(main, args.repeat)
+
+        mismatches = check_cube(main)
+        report.setdefault("checks", {})[str(rows)] = {"cube_mismatches": mismatches}
+        print(f"  cube check: {len(mismatches)} mismatch(es)")
+        if not args.skip_endpoints:
+            results.update(bench_endpoints(main, args.repeat))
+
+        for case, r in results.items():
+            print(f"  {case:40s} median {r['median_ms']:>11.3f} ms  (first {r['first_ms']:.3f})")
+
+        report["results"][str(rows)] = results
+        os.remove(path)
+
+    return report
+
+
+def compare(report, baseline, threshold, min_ms):
+
+    regressions = []
+
+    for rows, cases in report["results"].items():
+        base_cases = baseline.get("results", {}).get(rows, {})
+        for case, r in cases.items():
+            base = base_cases.get(case)
+            if not base:
+                continue
+            before = base["median_ms"]
+            after = r["median_ms"]
+            ratio = after / before if before else float("inf")
+            flag = after - before > min_ms and ratio > 1 + threshold
+            print(
+                f"{'REGRESSION' if flag else 'ok':10s} {rows:>8s} {case:40s} "
+                f"{before:>11.3f} → {after:>11.3f} ms  (x{ratio:.2f})"
+            )
+            if flag:
+                regressions.append({
+                    "rows": rows, "case": case,
+                    "baseline_ms": before, "current_ms": after,
+                    "ratio": round(ratio, 3)
+                })
+
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="SecretCore 벤치마크")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--upcoming", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-endpoints", action="store_true")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default=None, help="비교할 기준 JSON")
+    parser.add_argument("--threshold", type=float, default=0.20, help="회귀 판정 비율 (0.20 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="회귀 판정 최소 차이(ms)")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.threshold, args.min_ms)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare and report["regressions"]:
+        print(f"{len(report['regressions'])} regression(s)")
+        sys.exit(1)
+
+    if any(c["cube_mismatches"] for c in report.get("checks", {}).values()):
+        print("cube check failed")
+        sys.exit(1)
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synth_data import generate, write_csv
+from asgi_client import asgi_request, multipart_body
+from bench import import_main
+
+# =====================================================
+# 부하 테스트 (인프로세스 ASGI 또는 로컬 uvicorn 대상)
+#   python benchmarks/loadtest.py --rows 100000 --concurrency 32 --duration 30 --upload-at 10
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 16
+#   python benchmarks/loadtest.py --replay access.log --duration 60
+# 결과: 라우트별 처리량 / p50 / p95 / p99
+# =====================================================
+
+DEFAULT_MIX = {
+    "/": 8,
+    "/filters": 10,
+    "/matches": 30,
+    "/detail": 20,
+    "/page3": 12,
+    "/page4": 10,
+    "/top-ev": 4,
+    "/high-confidence": 3,
+    "/elite-picks": 1,
+    "/strategy-sim": 1,
+    "/round-roi": 1
+}
+
+PER_MATCH = {"/detail", "/page3", "/page4", "/risk-grade"}
+
+LOG_LINE = re.compile(r'"(GET|POST|HEAD) (\S+) HTTP/[\d.]+"')
+
+
+# =====================================================
+# 요청 시퀀스 (가중치 mix 또는 access log 재생)
+# =====================================================
+
+def mix_requests(mix, nos, rng):
+
+    routes = list(mix.keys())
+    weights = list(mix.values())
+
+    while True:
+        path = rng.choices(routes, weights)[0]
+        params = {}
+        if path in PER_MATCH:
+            params["no"] = rng.choice(nos)
+        if path == "/page3":
+            params["away"] = rng.choice([0, 1])
+        yield "GET", path, params
+
+
+def parse_access_log(path):
+
+    entries = []
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = LOG_LINE.search(line)
+            if not m:
+                continue
+            method, target = m.groups()
+            if method != "GET":
+                continue
+            parts = urlsplit(target)
+            entries.append((method, parts.path, dict(parse_qsl(parts.query))))
+
+    return entries
+
+
+def replay_requests(entries):
+    while True:
+        for entry in entries:
+            yield entry
+
+
+# =====================================================
+# 집계
+# =====================================================
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[k]
+
+
+def summarize(samples, elapsed):
+
+    routes = {}
+
+    for route, ms, ok in samples:
+        r = routes.setdefault(route, {"lat": [], "errors": 0})
+        r["lat"].append(ms)
+        if not ok:
+            r["errors"] += 1
+
+    report = {}
+    all_lat = []
+
+    for route, r in sorted(routes.items()):
+        lat = sorted(r["lat"])
+        all_lat.extend(lat)
+        report[route] = {
+            "count": len(lat),
+            "errors": r["errors"],
+            "rps": round(len(lat) / elapsed, 2),
+            "p50_ms": round(percentile(lat, 50), 2),
+            "p95_ms": round(percentile(lat, 95), 2),
+            "p99_ms": round(percentile(lat, 99), 2),
+            "max_ms": round(lat[-1], 2)
+        }
+
+    all_lat.sort()
+    report["__total__"] = {
+        "count": len(all_lat),
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": round(len(all_lat) / elapsed, 2),
+        "p50_ms": round(percentile(all_lat, 50), 2),
+        "p95_ms": round(percentile(all_lat, 95), 2),
+        "p99_ms": round(percentile(all_lat, 99), 2),
+        "max_ms": round(all_lat[-1], 2) if all_lat else 0.0
+    }
+
+    return report
+
+
+def print_report(report, elapsed):
+
+    print(f"\n{'route':22s} {'count':>7s} {'err':>5s} {'rps':>8s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'max':>9s}")
+    for route, r in report.items():
+        print(
+            f"{route:22s} {r['count']:>7d} {r['errors']:>5d} {r['rps']:>8.2f} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}"
+        )
+    print(f"\nelapsed {elapsed:.2f}s")
+
+
+# =====================================================
+# 인프로세스 실행 (asyncio 태스크 = 동시 사용자)
+# =====================================================
+
+async def run_inprocess(main, requests_iter, args, upload_bytes):
+
+    samples = []
+    deadline = time.perf_counter() + args.duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            method, path, params = next(requests_iter)
+            start = time.perf_counter()
+            try:
+                status, _ = await asgi_request(main.app, method, path, params)
+                ok = status < 400
+            except Exception:
+                ok = False
+            samples.append((path, (time.perf_counter() - start) * 1000, ok))
+
+    async def uploader():
+        await asyncio.sleep(args.upload_at)
+        body, headers = multipart_body("file", "upload.csv", upload_bytes)
+        start = time.perf_counter()
+        status, _ = await asgi_request(main.app, "POST", "/upload-data", body=body, headers=headers)
+        samples.append(("POST /upload-data", (time.perf_counter() - start) * 1000, status < 400))
+
+    tasks = [worker() for _ in range(args.concurrency)]
+    if upload_bytes is not None:
+        tasks.append(uploader())
+
+    await asyncio.gather(*tasks)
+    return samples
+
+
+# =====================================================
+# 원격 실행 (로컬 uvicorn, 스레드 = 동시 사용자)
+# =====================================================
+
+def run_remote(requests_iter, args, upload_bytes):
+
+    import requests
+
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    base = args.url.rstrip("/")
+
+    def worker():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            with lock:
+                method, path, params = next(requests_iter)
+            start = time.perf_counter()
+            try:
+                r = session.request(method, base + path, params=params, timeout=120, allow_redirects=False)
+                ok = r.status_code < 400
+            except requests.RequestException:
+                ok = False
+            with lock:
+                samples.append((path, (time.perf_counter() - start) * 1000, ok))
+
+    def uploader():
+        time.sleep(args.upload_at)
+        start = time.perf_counter()
+        r = requests.post(
+            base + "/upload-data",
+            files={"file": ("upload.csv", upload_bytes, "text/csv")},
+            timeout=600, allow_redirects=False
+        )
+        with lock:
+            samples.append(("POST /upload-data", (time.perf_counter() - start) * 1000, r.status_code < 400))
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    if upload_bytes is not None:
+        threads.append(threading.Thread(target=uploader))
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return samples
+
+
+def remote_match_nos(url):
+    import requests
+    rows = requests.get(url.rstrip("/") + "/matches", timeout=60).json()
+    return [r["row"][0] for r in rows] or ["1"]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="SecretCore 부하 테스트")
+    parser.add_argument("--url", default=None, help="대상 서버 (미지정 시 인프로세스)")
+    parser.add_argument("--data", default=None, help="인프로세스용 CSV (미지정 시 합성 데이터)")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", default=None, help='가중치 JSON 파일 ({"/matches": 30, ...})')
+    parser.add_argument("--replay", default=None, help="access log 재생")
+    parser.add_argument("--upload-at", type=float, default=None, help="N초 후 업로드 1회 (동시 실행)")
+    parser.add_argument("--upload-file", default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    mix = DEFAULT_MIX
+    if args.mix:
+        with open(args.mix, encoding="utf-8") as f:
+            mix = json.load(f)
+
+    upload_bytes = None
+    main = None
+
+    if args.url is None:
+        workdir = tempfile.mkdtemp(prefix="secretcore-load-")
+        main = import_main(workdir)
+        data_path = args.data
+        if data_path is None:
+            data_path = os.path.join(workdir, "data.csv")
+            write_csv(generate(args.rows), data_path)
+        main.DATA_FILE = os.path.join(workdir, "current_data.csv")
+        with open(data_path, "rb") as src, open(main.DATA_FILE, "wb") as dst:
+            dst.write(src.read())
+        main.load_data()
+        main.LOGGED_IN = True
+        upcoming = main.CURRENT_DF[main.CURRENT_DF.iloc[:, main.COL_RESULT] == "경기전"]
+        nos = upcoming.iloc[:, main.COL_NO].tolist() or ["1"]
+    else:
+        nos = remote_match_nos(args.url)
+
+    if args.upload_at is not None:
+        upload_path = args.upload_file or (main.DATA_FILE if main else None)
+        if upload_path is None:
+            parser.error("--url 모드에서는 --upload-file 필요")
+        with open(upload_path, "rb") as f:
+            upload_bytes = f.read()
+
+    if args.replay:
+        entries = parse_access_log(args.replay)
+        if not entries:
+            parser.error("access log 에서 GET 요청을 찾지 못함")
+        requests_iter = replay_requests(entries)
+    else:
+        requests_iter = mix_requests(mix, nos, rng)
+
+    start = time.perf_counter()
+
+    if main is not None:
+        samples = asyncio.run(run_inprocess(main, requests_iter, args, upload_bytes))
+    else:
+        samples = run_remote(requests_iter, args, upload_bytes)
+
+    elapsed = time.perf_counter() - start
+    report = summarize(samples, elapsed)
+    print_report(report, elapsed)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"elapsed_s": round(elapsed, 3), "routes": report}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,120 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# 합성 데이터 생성기 (17컬럼 COL_* 구조)
+# 리그/팀/조건/배당 분포를 실제 데이터와 비슷한 카디널리티로 생성
+# =====================================================
+
+COLUMNS = [
+    "번호", "년도", "회차", "경기", "종목", "리그", "홈팀", "원정팀",
+    "승", "무", "패", "일반", "핸디", "결과", "유형", "정역", "홈원정"
+]
+
+TYPES      = ["일반", "핸디1", "핸디2", "언더오버"]
+TYPE_P     = [0.55, 0.25, 0.12, 0.08]
+GENERALS   = ["정배", "역배", "무"]
+DIRS       = ["정", "역"]
+HOMEAWAYS  = ["홈", "원정"]
+HANDIS     = ["없음", "H-1", "H+1", "H-2", "H+2", "H-1.5", "H+1.5"]
+HANDI_P    = [0.40, 0.18, 0.18, 0.08, 0.08, 0.04, 0.04]
+SPORTS     = ["축구", "농구", "야구", "배구"]
+SPORT_P    = [0.60, 0.20, 0.15, 0.05]
+
+
+def zipf_choice(rng, names, size, a=1.3):
+    # 상위 리그/팀에 경기가 몰리는 분포
+    weights = 1.0 / np.arange(1, len(names) + 1) ** a
+    weights /= weights.sum()
+    return rng.choice(names, size=size, p=weights)
+
+
+def generate(rows, upcoming=300, leagues=80, teams=2000, seed=42, blank_league=0.01):
+
+    rng = np.random.default_rng(seed)
+
+    league_names = np.array([f"리그{i:03d}" for i in range(leagues)])
+    team_names = np.array([f"팀{i:04d}" for i in range(teams)])
+
+    # 년도/회차는 오름차순 (마지막 회차가 경기전)
+    per_round = 120
+    rounds_total = max(1, rows // per_round + 1)
+    round_idx = np.sort(rng.integers(0, rounds_total, rows))
+    year = 2010 + round_idx // 150
+    rnd = round_idx % 150 + 1
+
+    # 배당: 디리클레 확률 + 마진 10%
+    probs = rng.dirichlet([4.0, 2.2, 3.0], size=rows)
+    odds = np.round(1 / (probs * 1.10), 2).clip(1.01, 30.0)
+
+    # 결과는 실제 확률대로 추첨
+    u = rng.random(rows)
+    result = np.where(
+        u < probs[:, 0], "승",
+        np.where(u < probs[:, 0] + probs[:, 1], "무", "패")
+    ).astype(object)
+
+    if upcoming:
+        result[-upcoming:] = "경기전"
+
+    general = np.where(
+        odds[:, 0] < odds[:, 2], "정배",
+        np.where(odds[:, 0] > odds[:, 2], "역배", "무")
+    )
+    flip = rng.random(rows) < 0.05
+    general[flip] = rng.choice(GENERALS, size=int(flip.sum()))
+
+    home = zipf_choice(rng, team_names, rows, a=0.6)
+    away = zipf_choice(rng, team_names, rows, a=0.6)
+
+    df = pd.DataFrame({
+        COLUMNS[0]:  np.arange(1, rows + 1).astype(str),
+        COLUMNS[1]:  year.astype(str),
+        COLUMNS[2]:  rnd.astype(str),
+        COLUMNS[3]:  rng.integers(1, 15, rows).astype(str),
+        COLUMNS[4]:  rng.choice(SPORTS, size=rows, p=SPORT_P),
+        COLUMNS[5]:  zipf_choice(rng, league_names, rows),
+        COLUMNS[6]:  home,
+        COLUMNS[7]:  away,
+        COLUMNS[8]:  np.char.mod("%.2f", odds[:, 0]),
+        COLUMNS[9]:  np.char.mod("%.2f", odds[:, 1]),
+        COLUMNS[10]: np.char.mod("%.2f", odds[:, 2]),
+        COLUMNS[11]: general,
+        COLUMNS[12]: rng.choice(HANDIS, size=rows, p=HANDI_P),
+        COLUMNS[13]: result,
+        COLUMNS[14]: rng.choice(TYPES, size=rows, p=TYPE_P),
+        COLUMNS[15]: rng.choice(DIRS, size=rows),
+        COLUMNS[16]: rng.choice(HOMEAWAYS, size=rows)
+    })
+
+    df = df.astype(str)
+
+    # 리그 빈칸 행 (실데이터처럼 일부 누락 → 로드 후 NaN)
+    blank = rng.random(rows) < blank_league
+    df.loc[blank, COLUMNS[5]] = ""
+
+    return df
+
+
+def write_csv(df, path):
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="SecretCore 합성 데이터 생성")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--upcoming", type=int, default=300)
+    parser.add_argument("--leagues", type=int, default=80)
+    parser.add_argument("--teams", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--blank-league", type=float, default=0.01, help="리그 빈칸 비율")
+    parser.add_argument("--out", default="current_data.csv")
+    args = parser.parse_args()
+
+    data = generate(
+        args.rows, args.upcoming, args.leagues, args.teams, args.seed, args.blank_league
+    )
+    write_csv(data, args.out)
+    print(f"{len(data)} rows → {args.out}")
@@ -1,17 +1,109 @@
 import streamlit as st
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_URL = "https://secretcore.onrender.com"
 
+# (connect, read) seconds
+TIMEOUT = (5, 30)
+UPLOAD_TIMEOUT = (5, 300)
+
+# Panels loaded together after login (cached per token)
+PANELS = {
+    "history": "/my-analyses"
+}
+
 st.set_page_config(page_title="SecretCore", page_icon="🔐")
 st.title("🔐 SecretCore Web App")
 
+# =========================
+# HTTP SESSION (shared keep-alive pool)
+# =========================
+@st.cache_resource
+def http_session():
+
+    session = requests.Session()
+
+    # Only idempotent GETs are retried
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=("GET",)
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+# =========================
+# RESPONSE CACHE (per token, survives reruns)
+# =========================
+def token_cache():
+
+    cache = st.session_state.api_cache
+
+    if cache.get("token") != st.session_state.token:
+        cache.clear()
+        cache["token"] = st.session_state.token
+
+    return cache
+
+
+def invalidate(*names):
+
+    cache = token_cache()
+
+    for name in names:
+        cache.pop(name, None)
+
+
+def fetch_panel(session, path, headers):
+
+    try:
+        response = session.get(f"{API_URL}{path}", headers=headers, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        return {"status": None, "body": str(e)}
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+
+    return {"status": response.status_code, "body": body}
+
+
+def load_panels(headers):
+
+    # Fetch only uncached panels, independent ones in parallel
+    cache = token_cache()
+    missing = [name for name in PANELS if name not in cache]
+
+    if missing:
+        # st.* calls stay on the script thread; workers only use the session
+        session = http_session()
+        with ThreadPoolExecutor(len(missing)) as pool:
+            results = pool.map(lambda name: fetch_panel(session, PANELS[name], headers), missing)
+            for name, result in zip(missing, results):
+                cache[name] = result
+
+    return cache
+
+
 # =========================
 # SESSION INIT
 # =========================
 if "token" not in st.session_state:
     st.session_state.token = None
 
+if "api_cache" not in st.session_state:
+    st.session_state.api_cache = {}
+
 # =========================
 # SIDEBAR MENU
 # =========================
@@ -30,9 +122,10 @@ if choice == "Register":
 
     if st.button("Register"):
 
-        response = requests.post(
+        response = http_session().post(
             f"{API_URL}/register",
             params={"username": username, "password": password},
+            timeout=TIMEOUT,
         )
 
         st.write("Status:", response.status_code)
@@ -55,9 +148,10 @@ if choice == "Login":
 
     if st.button("Login"):
 
-        response = requests.post(
+        response = http_session().post(
             f"{API_URL}/login",
             data={"username": username, "password": password},
+            timeout=TIMEOUT,
         )
 
         st.write("Status:", response.status_code)
@@ -90,26 +184,41 @@ if st.session_state.token:
 
             st.write("Analyze button clicked")
 
-            response = requests.post(
-                f"{API_URL}/analyze",
-                headers=headers,
-                files={
-                    "file": (
-                        uploaded_file.name,
-                        uploaded_file,
-                        uploaded_file.type
-                    )
-                }
-            )
-
-            st.write("Status Code:", response.status_code)
-            st.write("Raw Response:", response.text)
-
-            if response.status_code == 200:
-                st.success("Analysis completed")
-                st.json(response.json())
-            else:
-                st.error("Analysis failed")
+            try:
+                response = http_session().post(
+                    f"{API_URL}/analyze",
+                    headers=headers,
+                    files={
+                        "file": (
+                            uploaded_file.name,
+                            uploaded_file,
+                            uploaded_file.type
+                        )
+                    },
+                    timeout=UPLOAD_TIMEOUT
+                )
+            except requests.RequestException as e:
+                response = None
+                st.error(f"Analysis request failed: {e}")
+
+            if response is not None:
+
+                st.write("Status Code:", response.status_code)
+                st.write("Raw Response:", response.text)
+
+                if response.status_code == 200:
+                    token_cache()["analysis"] = response.json()
+                    # New record -> history must be refetched once
+                    invalidate("history")
+                    st.success("Analysis completed")
+                else:
+                    st.error("Analysis failed")
+
+    panels = load_panels(headers)
+
+    if "analysis" in panels:
+        st.subheader("🧾 Last Analysis")
+        st.json(panels["analysis"])
 
     # =========================
     # HISTORY
@@ -117,15 +226,12 @@ if st.session_state.token:
     st.markdown("---")
     st.subheader("📜 My Analysis History")
 
-    history = requests.get(
-        f"{API_URL}/my-analyses",
-        headers=headers
-    )
+    history = panels["history"]
 
-    st.write("History Status:", history.status_code)
+    st.write("History Status:", history["status"])
 
-    if history.status_code == 200:
-        records = history.json()
+    if history["status"] == 200:
+        records = history["body"]["items"]
         if records:
             for r in records:
                 st.write(
@@ -139,10 +245,15 @@ if st.session_state.token:
     else:
         st.error("History load failed")
 
+    if st.button("Refresh history"):
+        invalidate("history")
+        st.rerun()
+
 # =========================
 # LOGOUT
 # =========================
 if st.session_state.token:
     if st.sidebar.button("Logout"):
         st.session_state.token = None
+        st.session_state.api_cache = {}
         st.success("Logged out")
\ No newline at end of file
@@ -0,0 +1,8 @@
+# 작업 프로세스 표시 (ProcessPoolExecutor initializer)
+# main 과 분리: initializer 를 풀 때 main 을 import 하면 초기 데이터 적재가 먼저 실행됨
+
+WORKER = {"active": False}
+
+
+def init_worker():
+    WORKER["active"] = True
@@ -1,12 +1,46 @@
 from fastapi import FastAPI, UploadFile, File, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse
 from fastapi import Response
+from starlette.routing import Match
 import pandas as pd
+import numpy as np
 import os
 import json
 import time
 import traceback
 import logging
+import asyncio
+import threading
+import functools
+import inspect
+import itertools
+import sys
+import uuid
+import contextvars
+import gzip
+import multiprocessing
+import hashlib
+import sqlite3
+import shutil
+import tempfile
+from collections import Counter, deque
+from collections.abc import Mapping
+import heapq
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from urllib.parse import quote
+from sqlalchemy import and_, or_
+
+from database import Base, SessionLocal, engine
+import job_worker
+
+# /analyze 토큰 검증 (python-jose 없으면 해당 API 만 501)
+try:
+    from jose import JWTError, jwt
+except ImportError:
+    JWTError = jwt = None
+from models import AnalysisRecord, User
 
 app = FastAPI()
 
@@ -37,6 +71,101 @@ DATA_FILE = "current_data.csv"
 BACKUP_FILE = "backup_snapshot.csv"
 FAVORITES_FILE = "favorites.json"
 
+# =====================================================
+# 집계 테이블 (배열 기반 W/D/L 카운트)
+# key → slot 해시 + int32 카운트 배열 [총, 승, 무, 패]
+# 비율(wp/dp/lp)은 읽을 때 계산, 기존 dict 호출부와 호환되는 읽기 전용 뷰
+# =====================================================
+
+RESULT_LABELS = ("승", "무", "패")
+
+
+def count_dist(row):
+
+    total, win, draw, lose = row.tolist()
+
+    # numpy 스칼라 유지 (하위 점수 계산의 반올림 규칙 동일)
+    wp, dp, lp = (
+        np.round(row[1:] / np.float64(total) * 100, 2)
+        if total else (0, 0, 0)
+    )
+
+    return {
+        "총": total,
+        "승": win,
+        "무": draw,
+        "패": lose,
+        "wp": wp,
+        "dp": dp,
+        "lp": lp
+    }
+
+
+class CountTable(Mapping):
+
+    def __init__(self, keys=(), counts=None):
+        self.slots = dict(zip(keys, range(len(keys))))
+        self.counts = (
+            counts if counts is not None
+            else np.zeros((0, 4), dtype=np.int32)
+        )
+
+    @classmethod
+    def from_cells(cls, keys, labels, counts):
+
+        # counts: 셀 × 결과값(labels) 카운트 → [총, 승, 무, 패]
+        table = np.zeros((len(counts), 4), dtype=np.int32)
+        table[:, 0] = counts.sum(axis=1)
+
+        for j, label in enumerate(RESULT_LABELS, start=1):
+            if label in labels:
+                table[:, j] = counts[:, labels.index(label)]
+
+        return cls(keys, table)
+
+    def dist(self, slot):
+        return count_dist(self.counts[slot])
+
+    def __getitem__(self, key):
+        return self.dist(self.slots[key])
+
+    def get(self, key, default=None):
+        slot = self.slots.get(key)
+        return default if slot is None else self.dist(slot)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def nbytes(self):
+
+        # 키 원소(문자열)는 factorize 고유값 공유 객체 → 튜플/슬롯/배열만 계산
+        n = len(self.slots)
+        first = next(iter(self.slots), ())
+
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.slots) +
+            n * (sys.getsizeof(first) + sys.getsizeof(n)) +
+            self.counts.nbytes
+        )
+
+    def clear(self):
+        self.slots = {}
+        self.counts = np.zeros((0, 4), dtype=np.int32)
+
+    def replaced(self, counts, slots=None):
+
+        # 카운트만 바뀐 새 표 (slot 해시는 공유 또는 복사본 전달)
+        table = CountTable()
+        table.slots = self.slots if slots is None else slots
+        table.counts = counts
+        return table
+
 # =====================================================
 # 글로벌 상태
 # =====================================================
@@ -47,46 +176,380 @@ FAVORITES = []
 
 DIST_CACHE = {}
 SECRET_CACHE = {}
-ODDS_DIST_CACHE = {}
+ODDS_DIST_CACHE = CountTable()
 
 LEAGUE_COUNT = {}
 LEAGUE_WEIGHT = {}
-FIVE_COND_DIST = {}
+FIVE_COND_DIST = CountTable()
+
+# (리그, 유형, 홈/원정, 일반, 정역, 핸디) → W/D/L (완료 경기 기준)
+LEAGUE_COND_DIST = CountTable()
+
+# 리그 반영 점수 모드 (SECRETCORE_LEAGUE_MODE=blend)
+# 리그 5조건 분포를 표본수/(표본수+PRIOR) 비중으로 섞음
+LEAGUE_MODE = os.getenv("SECRETCORE_LEAGUE_MODE", "") == "blend"
+LEAGUE_PRIOR = float(os.getenv("SECRETCORE_LEAGUE_PRIOR", "50"))
+
+# 데이터셋 버전 (로드/업로드/캐시 재생성 시 증가)
+DATA_VERSION = 0
+
+# 경기전 스코어 인덱스 / 페이지 캐시
+PICK_INDEX = {}
+PAGE_CACHE = {}
+PAGE_CACHE_MAX = 256
+
+# 필터 패싯 인덱스 (값별 비트맵)
+FACET_INDEX = {}
+
+# 조건 격자 큐브 (조건 부분집합별 W/D/L, 완료 경기 기준)
+CONDITION_CUBE = {}
+
+# 5조건 셀별 완료 경기 행 위치 (번호 내림차순, 상세 경기목록)
+CONDITION_ROWS = {}
+
+# 유형별 정렬 배당 인덱스 (승/무/패 배당 + 누적 W/D/L)
+ODDS_INDEX = {}
+
+# 유사 배당 검색 (완료 경기 (승,무,패) 배당 KD-tree, 범위별 지연 생성)
+SIMILAR_INDEX = {}
+
+# 기간 구간 분포 (키별 년도/회차 누적합)
+WINDOW_INDEX = {}
+
+# 데이터 검증 보고서 (버전별 1회) + 배당 불량 행의 배당 문자열 (점수 계산 생략)
+VALIDATION = {}
+BAD_ODDS = frozenset()
+
+# 경기 저장소: memory (기본) | sqlite (인덱스 SQLite 표 + 집계 표)
+# SQLITE + PRELOAD=0 → 시작 시 경기전 행 + 집계 표만 메모리에 적재
+STORE_BACKEND = os.getenv("SECRETCORE_STORE", "memory")
+STORE_PATH = os.getenv("SECRETCORE_STORE_PATH", "matches.db")
+STORE_PRELOAD = os.getenv("SECRETCORE_STORE_PRELOAD", "1") == "1"
+
+STORE_STATE = {"ready": False, "rows": 0, "columns": None, "lazy": False}
+
+# 업로드 데이터 저장 (쓰기 지연: 임시 파일 → 원자적 교체 + 압축 스냅샷 순환)
+BACKUP_KEEP = int(os.getenv("SECRETCORE_BACKUP_KEEP", "5"))
+
+PERSIST_POOL = None
+PERSIST_LOCK = threading.Lock()
+PERSIST = {
+    "status": "idle",
+    "seq": 0,
+    "pending": None,
+    "written": None,
+    "seconds": None,
+    "bytes": None,
+    "snapshot": None,
+    "error": None
+}
+
+# 캐시 재생성 스레드 수 (factorize / 독립 집계 병렬)
+AGG_THREADS = int(os.getenv("SECRETCORE_AGG_THREADS", "4"))
+
+# 백그라운드 작업 (프로세스 풀)
+JOB_WORKERS = int(os.getenv("SECRETCORE_JOB_WORKERS", "2"))
+JOB_WAIT_DEFAULT = 20.0
+JOB_MAX = 200
+
+# 작업 프로세스는 forkserver (스레드가 있는 서버 프로세스를 fork 하지 않음)
+JOB_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+JOB_POOL = None
+JOB_POOL_LOCK = threading.Lock()
+JOBS = {}
+JOB_RESULTS = {}
+JOB_LOCK = threading.Lock()
+
+# 작업 데이터 원본 (버전별 1회 준비) / 작업 프로세스 쪽 적재 상태
+JOB_SOURCES = {}
+JOB_SOURCE_LOCK = threading.Lock()
+JOB_DIR = {"path": None}
+JOB_STATE = {"source": None}
+
+# 업로드 후 경기전 페이지 사전 렌더링 (gzip, 데이터 버전 단위)
+PRERENDER_ENABLED = os.getenv("SECRETCORE_PRERENDER", "1") == "1"
+# 작업 풀 공유, 동시에 제출하는 배치 수 → 최대 워커 수 - 1 (사용자 작업용 슬롯 1개 항상 비움)
+PRERENDER_WORKERS = max(1, min(
+    int(os.getenv("SECRETCORE_PRERENDER_WORKERS", str(JOB_WORKERS - 1))),
+    JOB_WORKERS - 1
+))
+PRERENDER_BATCH = 20
+
+PRERENDER = {"version": None, "pages": {}}
+
+# 동일 요청 합치기 (single-flight)
+INFLIGHT = {}
+INFLIGHT_LOCK = threading.Lock()
+COALESCE_STATS = {}
+COALESCE_WAIT = float(os.getenv("SECRETCORE_COALESCE_WAIT", "30"))
 
 MIN_CONFIDENCE = 0.32
 
+# 메트릭 (Prometheus 텍스트 포맷)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = {}
+ERROR_COUNT = {}
+LATENCY_HIST = {}
+IN_FLIGHT = {"value": 0}
+
+CACHE_STATS = {
+    "five_cond": [0, 0],
+    "league_cond": [0, 0],
+    "odds": [0, 0],
+    "dist": [0, 0],
+    "secret": [0, 0]
+}
+CACHE_STATS_LOCK = threading.Lock()
+
+LOAD_SECONDS = {}
+BUILD_SECONDS = {}
+
+# 요청 프로파일링 (샘플링, 최근 N개 보관)
+PROFILE_SLOW_MS = float(os.getenv("SECRETCORE_PROFILE_SLOW_MS", "0"))
+PROFILE_TOKEN = os.getenv("SECRETCORE_PROFILE_TOKEN", "")
+PROFILE_INTERVAL = 0.005
+PROFILE_KEEP = 20
+
+PROFILES = deque(maxlen=PROFILE_KEEP)
+PROFILE_SESSIONS = {}
+PROFILE_LOCK = threading.Lock()
+PROFILE_SAMPLER = {"thread": None}
+PROFILE_CURRENT = contextvars.ContextVar("profile_session", default=None)
+
+# 메모리 예산 (SECRETCORE_MEMORY_BUDGETS="dist=64MB,secret=16MB,rss=1GB")
+MEMORY_BUDGETS = {
+    "dist": 64 * 1024 ** 2,
+    "secret": 16 * 1024 ** 2,
+    "page": 16 * 1024 ** 2,
+    "jobs": 32 * 1024 ** 2,
+    "cube": 32 * 1024 ** 2,
+    "prerender": 64 * 1024 ** 2
+}
+MEMORY_SAMPLE = 500
+MEMORY_CHECK_EVERY = 500
+MEMORY_REPORT_CACHE = {}
+
 logging.basicConfig(level=logging.INFO)
 
+# =====================================================
+# 캐시 조회 (hit/miss 카운트)
+# =====================================================
+
+def cache_get(name, cache, key, default=None):
+
+    value = cache.get(key)
+    count_cache(name, value is not None)
+
+    if value is None:
+        return default
+
+    return value
+
+
+def count_cache(name, hit):
+
+    # 스레드풀에서도 호출되므로 잠금 후 증가
+    with CACHE_STATS_LOCK:
+        CACHE_STATS[name][0 if hit else 1] += 1
+
+
+def timed(store, name, fn, *args):
+
+    start = time.perf_counter()
+    result = fn(*args)
+    store[name] = round(time.perf_counter() - start, 6)
+
+    return result
+
+# =====================================================
+# 문자열 사전 인코딩
+# 팀/리그/조건/배당 컬럼은 category (고유값 1회 intern + 행별 정수 코드)
+# 홈/원정은 같은 팀 사전 공유, 사전은 정렬 → factorize(sort=True) 순서 동일
+# 행 값/집계 키가 같은 str 객체를 공유 → 키 해시 캐시 재사용, 비교는 동일 객체
+# =====================================================
+
+ENCODE_GROUPS = {
+    "team":     (COL_HOME, COL_AWAY),
+    "league":   (COL_LEAGUE,),
+    "sport":    (COL_SPORT,),
+    "type":     (COL_TYPE,),
+    "homeaway": (COL_HOMEAWAY,),
+    "general":  (COL_GENERAL,),
+    "dir":      (COL_DIR,),
+    "handi":    (COL_HANDI,),
+    "result":   (COL_RESULT,),
+    "odds":     (COL_WIN_ODDS, COL_DRAW_ODDS, COL_LOSE_ODDS)
+}
+
+VOCAB = {}
+
+def intern_value(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def encode_frame(df):
+
+    if df.empty or df.shape[1] != EXPECTED_COLS:
+        return df
+
+    df = df.copy(deep=False)
+
+    for group, cols in ENCODE_GROUPS.items():
+
+        values = pd.unique(np.concatenate([
+            df.iloc[:, col].dropna().to_numpy(dtype=object) for col in cols
+        ]))
+        dtype = pd.CategoricalDtype(sorted(intern_value(v) for v in values))
+
+        for col in cols:
+            df.isetitem(col, df.iloc[:, col].astype(dtype))
+
+        VOCAB[group] = dtype
+
+    return df
+
+
+def vocab_status():
+
+    return {
+        group: len(dtype.categories)
+        for group, dtype in VOCAB.items()
+    }
+
+# =====================================================
+# 공통 집계 코드
+# 키 컬럼을 1회 factorize (정렬) → 모든 집계 표/인덱스가 정수 코드 공유
+# 셀 = 혼합 기수 결합 코드의 np.unique, 결과별 건수 = bincount
+# =====================================================
+
+CODE_COLS = (
+    COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI,
+    COL_LEAGUE, COL_HOME, COL_AWAY, COL_RESULT,
+    COL_WIN_ODDS, COL_DRAW_ODDS, COL_LOSE_ODDS
+)
+
+ODDS_COLS = (COL_WIN_ODDS, COL_DRAW_ODDS, COL_LOSE_ODDS)
+
+def frame_codes(df):
+
+    if df.empty:
+        return {}
+
+    def factorize(col):
+        codes, uniques = pd.factorize(df.iloc[:, col], sort=True)
+        return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+    with ThreadPoolExecutor(AGG_THREADS) as pool:
+        parts = dict(zip(CODE_COLS, pool.map(factorize, CODE_COLS)))
+
+    # 배당 숫자값은 고유 문자열만 변환 (코드 -1 → NaN)
+    numeric = {
+        col: np.append(
+            pd.to_numeric(pd.Series(parts[col][1]), errors="coerce").to_numpy(dtype=float),
+            np.nan
+        )[parts[col][0]]
+        for col in ODDS_COLS
+    }
+
+    result_codes, result_values = parts[COL_RESULT]
+    labels = result_values.tolist()
+
+    return {
+        "codes": parts,
+        "numeric": numeric,
+        "labels": labels,
+        "pre": labels.index("경기전") if "경기전" in labels else -2
+    }
+
+
+def group_codes(arrays, sizes):
+
+    # 반환: (셀별 컬럼 코드 목록, 행 → 셀 번호)
+    key = np.zeros(len(arrays[0]) if arrays else 0, dtype=np.int64)
+
+    for codes, size in zip(arrays, sizes):
+        key = key * size + codes
+
+    uniq, inv = np.unique(key, return_inverse=True)
+
+    cells = []
+    for size in reversed(sizes):
+        cells.append(uniq % size)
+        uniq = uniq // size
+
+    return cells[::-1], inv
+
+
+def cell_counts(codes, cols, completed_only=False, keep_missing=False):
+
+    # 키 NaN / 결과 NaN 행은 제외 (groupby 기본 동작과 동일)
+    # keep_missing: 키 NaN 을 코드 len(값) 셀로 남김 (부분집합별로 호출부가 제외)
+    parts = codes["codes"]
+    result = parts[COL_RESULT][0]
+    n_labels = len(codes["labels"])
+
+    keep = result >= 0
+    if completed_only:
+        keep &= result != codes["pre"]
+
+    if keep_missing:
+        arrays = [
+            np.where(parts[col][0] >= 0, parts[col][0], len(parts[col][1]))[keep]
+            for col in cols
+        ]
+        sizes = [len(parts[col][1]) + 1 for col in cols]
+    else:
+        for col in cols:
+            keep &= parts[col][0] >= 0
+
+        arrays = [parts[col][0][keep] for col in cols]
+        sizes = [max(len(parts[col][1]), 1) for col in cols]
+
+    if cols:
+        cells, inv = group_codes(arrays, sizes)
+    else:
+        cells, inv = [], np.zeros(int(keep.sum()), dtype=np.int64)
+
+    n_cells = int(inv.max()) + 1 if len(inv) else 0
+    counts = np.bincount(
+        inv * n_labels + result[keep],
+        minlength=n_cells * n_labels
+    ).reshape(n_cells, n_labels)
+
+    return cells, counts
+
+
+def cell_keys(codes, cols, cells):
+
+    if not cols:
+        return [()] * (len(cells[0]) if cells else 1)
+
+    return list(zip(*[
+        codes["codes"][col][1][cell].tolist()
+        for col, cell in zip(cols, cells)
+    ]))
+
 # =====================================================
 # 배당 분포 사전 캐시 생성
 # =====================================================
 
-def build_odds_cache(df):
+def build_odds_cache(df, codes=None):
     global ODDS_DIST_CACHE
-    ODDS_DIST_CACHE.clear()
 
     if df.empty:
+        ODDS_DIST_CACHE = CountTable()
         return
 
-    grouped = df.groupby(
-        [df.columns[COL_WIN_ODDS],
-         df.columns[COL_DRAW_ODDS],
-         df.columns[COL_LOSE_ODDS],
-         df.columns[COL_RESULT]]
-    ).size().unstack(fill_value=0)
-
-    for key, row in grouped.iterrows():
-        total = row.sum()
-
-        ODDS_DIST_CACHE[key] = {
-            "총": int(total),
-            "승": int(row.get("승", 0)),
-            "무": int(row.get("무", 0)),
-            "패": int(row.get("패", 0)),
-            "wp": round(row.get("승", 0)/total*100,2) if total else 0,
-            "dp": round(row.get("무", 0)/total*100,2) if total else 0,
-            "lp": round(row.get("패", 0)/total*100,2) if total else 0
-        }
+    codes = codes or frame_codes(df)
+    cells, counts = cell_counts(codes, ODDS_COLS)
+
+    ODDS_DIST_CACHE = CountTable.from_cells(
+        cell_keys(codes, ODDS_COLS, cells), codes["labels"], counts
+    )
 
 # =====================================================
 # 데이터 로드
@@ -95,10 +558,21 @@ def build_odds_cache(df):
 def load_data():
     global CURRENT_DF
 
+    # 쓰기 도중 종료로 남은 임시 파일 (DATA_FILE 은 교체 전 상태 그대로)
+    if os.path.exists(DATA_FILE + ".tmp"):
+        os.remove(DATA_FILE + ".tmp")
+
+    # SQLite 저장소가 CSV 와 같으면 CSV 파싱 생략
+    if STORE_BACKEND == "sqlite" and store_current():
+        load_store()
+        return
+
     if not os.path.exists(DATA_FILE):
         CURRENT_DF = pd.DataFrame()
         return
 
+    start = time.perf_counter()
+
     df = pd.read_csv(
         DATA_FILE,
         encoding="utf-8-sig",
@@ -106,17 +580,22 @@ def load_data():
         low_memory=False
     )
 
+    LOAD_SECONDS["file"] = round(time.perf_counter() - start, 6)
+
     if df.shape[1] != EXPECTED_COLS:
         CURRENT_DF = pd.DataFrame()
         return
 
-    CURRENT_DF = df
+    df = encode_frame(df)
 
-    build_five_cond_cache(CURRENT_DF)
-    build_league_weight(CURRENT_DF)
-    build_odds_cache(CURRENT_DF)
+    if STORE_BACKEND == "sqlite":
+        store_sync(df)
+        load_store(df)
+        return
+
+    CURRENT_DF = df
 
-load_data()
+    rebuild_caches(CURRENT_DF)
 
 # =====================================================
 # 조건 빌더
@@ -193,13 +672,16 @@ def distribution(df):
     key = tuple(df.index)
 
     if key in DIST_CACHE:
+        count_cache("dist", True)
         return DIST_CACHE[key]
 
+    count_cache("dist", False)
+
     total = len(df)
 
     if total == 0:
         result = {"총":0,"승":0,"무":0,"패":0,"wp":0,"dp":0,"lp":0}
-        DIST_CACHE[key] = result
+        store_dist(key, result)
         return result
 
     result_col = df.iloc[:, COL_RESULT]
@@ -222,58 +704,97 @@ def distribution(df):
         "lp":lp
     }
 
-    DIST_CACHE[key] = result
+    store_dist(key, result)
     return result
 
+
+def store_dist(key, result):
+
+    DIST_CACHE[key] = result
+
+    # 요청마다 커지는 캐시라 일정 건수마다 예산 점검
+    if len(DIST_CACHE) % MEMORY_CHECK_EVERY == 0:
+        enforce_budgets(["dist"])
+
 # =====================================================
 # 5조건 사전 집계 캐시 생성
 # =====================================================
 
-def build_five_cond_cache(df):
-    global FIVE_COND_DIST
-    FIVE_COND_DIST.clear()
+def build_five_cond_cache(df, codes=None):
+    global FIVE_COND_DIST, LEAGUE_COND_DIST
 
     if df.empty:
+        FIVE_COND_DIST = CountTable()
+        LEAGUE_COND_DIST = CountTable()
         return
 
-    group_cols = [
-        COL_TYPE,
-        COL_HOMEAWAY,
-        COL_GENERAL,
-        COL_DIR,
-        COL_HANDI
-    ]
+    codes = codes or frame_codes(df)
 
-    grouped = df.groupby(
-        df.columns[group_cols].tolist() + [df.columns[COL_RESULT]]
-    ).size().unstack(fill_value=0)
+    five_cols = (COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI)
+    league_cols = (COL_LEAGUE,) + five_cols
 
-    for key, row in grouped.iterrows():
+    # 5조건 총은 경기전 포함 (기존과 동일), 리그 표는 완료 경기만
+    cells, counts = cell_counts(codes, five_cols)
+    FIVE_COND_DIST = CountTable.from_cells(
+        cell_keys(codes, five_cols, cells), codes["labels"], counts
+    )
 
-        total = row.sum()
+    cells, counts = cell_counts(codes, league_cols, completed_only=True)
+    LEAGUE_COND_DIST = CountTable.from_cells(
+        cell_keys(codes, league_cols, cells), codes["labels"], counts
+    )
 
-        FIVE_COND_DIST[key] = {
-            "총": int(total),
-            "승": int(row.get("승", 0)),
-            "무": int(row.get("무", 0)),
-            "패": int(row.get("패", 0)),
-        }
 
-        if total > 0:
-            FIVE_COND_DIST[key]["wp"] = round(row.get("승", 0)/total*100,2)
-            FIVE_COND_DIST[key]["dp"] = round(row.get("무", 0)/total*100,2)
-            FIVE_COND_DIST[key]["lp"] = round(row.get("패", 0)/total*100,2)
-        else:
-            FIVE_COND_DIST[key]["wp"] = 0
-            FIVE_COND_DIST[key]["dp"] = 0
-            FIVE_COND_DIST[key]["lp"] = 0
+def league_cond_dist(row, filters=None, window=None):
+
+    # 상세 카드2 동일리그: 고정 조건이 필터에서 빠지면 빈 분포
+    cond = build_league_cond(row)
+
+    if filters and any(
+        col in filters and value not in filters[col]
+        for col, value in cond.items()
+    ):
+        return count_dist(np.zeros(4, dtype=np.int64))
+
+    key = (
+        cond[COL_LEAGUE],
+        cond[COL_TYPE],
+        cond[COL_HOMEAWAY],
+        cond[COL_GENERAL],
+        cond[COL_DIR],
+        cond[COL_HANDI]
+    )
+
+    table = scoring_table("league_cond", LEAGUE_COND_DIST, window)
+
+    return table.get(key) or count_dist(np.zeros(4, dtype=np.int64))
+
+
+def league_blend(sp_w, sp_d, sp_l, league, key, window=None):
+
+    lg = cache_get(
+        "league_cond", scoring_table("league_cond", LEAGUE_COND_DIST, window), (league,) + key
+    )
+
+    if lg is None:
+        return sp_w, sp_d, sp_l, 0, 0
+
+    weight = lg["총"] / (lg["총"] + LEAGUE_PRIOR)
+
+    return (
+        (1 - weight) * sp_w + weight * lg["wp"],
+        (1 - weight) * sp_d + weight * lg["dp"],
+        (1 - weight) * sp_l + weight * lg["lp"],
+        lg["총"],
+        round(weight, 3)
+    )
 
 
 # =====================================================
 # 리그 가중치 생성
 # =====================================================
 
-def build_league_weight(df):
+def build_league_weight(df, codes=None):
 
     global LEAGUE_COUNT, LEAGUE_WEIGHT
 
@@ -283,18 +804,29 @@ def build_league_weight(df):
     if df.empty:
         return
 
-    league_counts = df.iloc[:, COL_LEAGUE].value_counts()
+    codes = codes or frame_codes(df)
+    league_codes, leagues = codes["codes"][COL_LEAGUE]
 
-    for league, count in league_counts.items():
+    counts = np.bincount(league_codes[league_codes >= 0], minlength=len(leagues))
 
-        LEAGUE_COUNT[league] = int(count)
+    # value_counts() 와 같은 건수 내림차순
+    for i in np.argsort(-counts, kind="stable"):
 
-        if count >= 800:
-            LEAGUE_WEIGHT[league] = 1.05
-        elif count >= 300:
-            LEAGUE_WEIGHT[league] = 1.00
-        else:
-            LEAGUE_WEIGHT[league] = 0.90
+        count = int(counts[i])
+        league = leagues[i]
+
+        LEAGUE_COUNT[league] = count
+        LEAGUE_WEIGHT[league] = league_weight(count)
+
+
+def league_weight(count):
+
+    if count >= 800:
+        return 1.05
+    elif count >= 300:
+        return 1.00
+    else:
+        return 0.90
 
 
 # =====================================================
@@ -303,6 +835,10 @@ def build_league_weight(df):
 
 def safe_ev(dist, row):
 
+    # 검증에서 불량으로 확인된 배당은 변환 없이 건너뜀
+    if BAD_ODDS and (row.iloc[COL_WIN_ODDS], row.iloc[COL_DRAW_ODDS], row.iloc[COL_LOSE_ODDS]) in BAD_ODDS:
+        return {"EV": {"승":0,"무":0,"패":0}, "추천":"없음"}
+
     try:
         win_odds  = float(row.iloc[COL_WIN_ODDS])
         draw_odds = float(row.iloc[COL_DRAW_ODDS])
@@ -331,7 +867,7 @@ def safe_ev(dist, row):
 # Secret Score (캐싱 적용)
 # =====================================================
 
-def secret_score_fast(row, df):
+def secret_score_fast(row, df, window=None):
 
     key = (
         row.iloc[COL_TYPE],
@@ -341,7 +877,7 @@ def secret_score_fast(row, df):
         row.iloc[COL_HANDI]
     )
 
-    dist = FIVE_COND_DIST.get(key, {
+    dist = cache_get("five_cond", scoring_table("five_cond", FIVE_COND_DIST, window), key, {
         "총":0,"승":0,"무":0,"패":0,
         "wp":0,"dp":0,"lp":0
     })
@@ -373,8 +909,11 @@ def secret_score_cached(row, df):
     )
 
     if key in SECRET_CACHE:
+        count_cache("secret", True)
         return SECRET_CACHE[key]
 
+    count_cache("secret", False)
+
     result = secret_score_fast(row, df)
     SECRET_CACHE[key] = result
 
@@ -384,7 +923,7 @@ def secret_score_cached(row, df):
 # SecretPick Brain
 # =====================================================
 
-def secret_pick_brain(row, df):
+def secret_pick_brain(row, df, window=None):
 
     key = (
         row.iloc[COL_TYPE],
@@ -394,7 +933,7 @@ def secret_pick_brain(row, df):
         row.iloc[COL_HANDI]
     )
 
-    p5 = FIVE_COND_DIST.get(key, {
+    p5 = cache_get("five_cond", scoring_table("five_cond", FIVE_COND_DIST, window), key, {
         "총": 0,
         "wp": 0, "dp": 0, "lp": 0
     })
@@ -418,7 +957,7 @@ def secret_pick_brain(row, df):
         row.iloc[COL_LOSE_ODDS]
     )
 
-    exact_dist = ODDS_DIST_CACHE.get(odds_key, {
+    exact_dist = cache_get("odds", scoring_table("odds", ODDS_DIST_CACHE, window), odds_key, {
         "총": 0,
         "wp": 0, "dp": 0, "lp": 0
     })
@@ -427,6 +966,13 @@ def secret_pick_brain(row, df):
     sp_d = w5 * p5.get("dp", 0) + w_exact * exact_dist.get("dp", 0)
     sp_l = w5 * p5.get("lp", 0) + w_exact * exact_dist.get("lp", 0)
 
+    league = row.iloc[COL_LEAGUE]
+
+    if LEAGUE_MODE:
+        sp_w, sp_d, sp_l, league_sample, w_league = league_blend(
+            sp_w, sp_d, sp_l, league, key, window
+        )
+
     sp_map = {
         "승": round(sp_w, 2),
         "무": round(sp_d, 2),
@@ -435,12 +981,11 @@ def secret_pick_brain(row, df):
 
     best = max(sp_map, key=sp_map.get)
 
-    league = row.iloc[COL_LEAGUE]
     league_weight = LEAGUE_WEIGHT.get(league, 1.0)
 
     adjusted_conf = round((sp_map[best] / 100) * league_weight, 3)
 
-    return {
+    result = {
         "추천": best,
         "확률": sp_map,
         "confidence": adjusted_conf,
@@ -449,12 +994,22 @@ def secret_pick_brain(row, df):
         "league_weight": league_weight
     }
 
+    if LEAGUE_MODE:
+        result["league_sample"] = league_sample
+        result["weight_league"] = w_league
+
+    return result
+
 # =====================================================
 # safe_ev_tuple
 # =====================================================
 
 def safe_ev_tuple(dist, row):
 
+    # 검증에서 불량으로 확인된 배당은 변환 없이 건너뜀
+    if BAD_ODDS and (row[COL_WIN_ODDS], row[COL_DRAW_ODDS], row[COL_LOSE_ODDS]) in BAD_ODDS:
+        return {"EV": {"승":0,"무":0,"패":0}, "추천":"없음"}
+
     try:
         win_odds  = float(row[COL_WIN_ODDS])
         draw_odds = float(row[COL_DRAW_ODDS])
@@ -482,7 +1037,7 @@ def safe_ev_tuple(dist, row):
 # secret_score_fast_tuple
 # =====================================================
 
-def secret_score_fast_tuple(row):
+def secret_score_fast_tuple(row, window=None):
 
     key = (
         row[COL_TYPE],
@@ -492,7 +1047,7 @@ def secret_score_fast_tuple(row):
         row[COL_HANDI]
     )
 
-    dist = FIVE_COND_DIST.get(key, {
+    dist = cache_get("five_cond", scoring_table("five_cond", FIVE_COND_DIST, window), key, {
         "총":0,"승":0,"무":0,"패":0,
         "wp":0,"dp":0,"lp":0
     })
@@ -513,7 +1068,7 @@ def secret_score_fast_tuple(row):
 # secret_pick_brain
 # =====================================================
 
-def secret_pick_brain_tuple(row):
+def secret_pick_brain_tuple(row, window=None):
 
     key = (
         row[COL_TYPE],
@@ -523,7 +1078,7 @@ def secret_pick_brain_tuple(row):
         row[COL_HANDI]
     )
 
-    p5 = FIVE_COND_DIST.get(key, {
+    p5 = cache_get("five_cond", scoring_table("five_cond", FIVE_COND_DIST, window), key, {
         "총": 0,
         "wp": 0, "dp": 0, "lp": 0
     })
@@ -547,7 +1102,7 @@ def secret_pick_brain_tuple(row):
         row[COL_LOSE_ODDS]
     )
 
-    exact_dist = ODDS_DIST_CACHE.get(odds_key, {
+    exact_dist = cache_get("odds", scoring_table("odds", ODDS_DIST_CACHE, window), odds_key, {
         "총": 0,
         "wp": 0, "dp": 0, "lp": 0
     })
@@ -556,6 +1111,13 @@ def secret_pick_brain_tuple(row):
     sp_d = w5 * p5.get("dp", 0) + w_exact * exact_dist.get("dp", 0)
     sp_l = w5 * p5.get("lp", 0) + w_exact * exact_dist.get("lp", 0)
 
+    league = row[COL_LEAGUE]
+
+    if LEAGUE_MODE:
+        sp_w, sp_d, sp_l, league_sample, w_league = league_blend(
+            sp_w, sp_d, sp_l, league, key, window
+        )
+
     sp_map = {
         "승": round(sp_w, 2),
         "무": round(sp_d, 2),
@@ -564,12 +1126,11 @@ def secret_pick_brain_tuple(row):
 
     best = max(sp_map, key=sp_map.get)
 
-    league = row[COL_LEAGUE]
     league_weight = LEAGUE_WEIGHT.get(league, 1.0)
 
     adjusted_conf = round((sp_map[best] / 100) * league_weight, 3)
 
-    return {
+    result = {
         "추천": best,
         "확률": sp_map,
         "confidence": adjusted_conf,
@@ -578,1394 +1139,4336 @@ def secret_pick_brain_tuple(row):
         "league_weight": league_weight
     }
 
+    if LEAGUE_MODE:
+        result["league_sample"] = league_sample
+        result["weight_league"] = w_league
+
+    return result
+
 # =====================================================
-# 로그인
+# 경기전 스코어 인덱스 (버전별 사전 정렬)
 # =====================================================
 
-@app.post("/login")
-def login(username: str = Form(...), password: str = Form(...)):
-    global LOGGED_IN
-
-    if username == "ryan" and password == "963258":
-        LOGGED_IN = True
+SORT_KEYS = ["row", "no", "confidence", "ev", "sample"]
+ORDER_KEYS = ["asc", "desc"]
+PAGE_LIMIT_MAX = 1000
 
-    return RedirectResponse("/", status_code=302)
+def build_pick_index(df):
 
+    global PICK_INDEX
 
-@app.get("/logout")
-def logout():
-    global LOGGED_IN
-    LOGGED_IN = False
-    return RedirectResponse("/", status_code=302)
+    PAGE_CACHE.clear()
+    PICK_INDEX = {}
 
+    if df.empty:
+        return
 
-@app.get("/auth-status")
-def auth_status():
-    return {"logged_in": LOGGED_IN}
+    base_df = df[df.iloc[:, COL_RESULT] == "경기전"].reset_index(drop=True)
 
-# =====================================================
-# 업로드 페이지
-# =====================================================
+    rows = []
+    secs = []
+    brains = []
 
-@app.get("/page-upload", response_class=HTMLResponse)
-def page_upload():
+    for row in base_df.itertuples(index=False):
+        rows.append(row)
+        secs.append(secret_score_fast_tuple(row))
+        brains.append(secret_pick_brain_tuple(row))
+
+    n = len(rows)
+
+    conf   = np.array([b["confidence"] for b in brains], dtype=float)
+    ev     = np.array([s["score"] for s in secs], dtype=float)
+    sample = np.array([s["sample"] for s in secs], dtype=np.int64)
+    no_num = pd.to_numeric(base_df.iloc[:, COL_NO], errors="coerce").to_numpy()
+
+    # 내림차순 정렬은 기존 sorted(reverse=True)와 동일하게 행 순서를 유지 (stable)
+    order = {
+        "row":        np.arange(n),
+        "no":         np.argsort(no_num, kind="stable"),
+        "confidence": np.lexsort((-ev, -conf)),
+        "ev":         np.argsort(-ev, kind="stable"),
+        "sample":     np.argsort(-sample, kind="stable")
+    }
 
-    if not LOGGED_IN:
-        return RedirectResponse("/", status_code=302)
+    PICK_INDEX = {
+        "frame": base_df,
+        "rows": rows,
+        "sec": secs,
+        "brain": brains,
+        "conf": conf,
+        "ev": ev,
+        "sample": sample,
+        "order": order
+    }
 
-    return """
-<html>
-<body style='background:#0f1720;color:white;padding:30px;font-family:Arial;'>
-<h2>📤 업로드</h2>
-<form action="/upload-data" method="post" enctype="multipart/form-data">
-    <input type="file" name="file" required><br><br>
-    <button type="submit">업로드 실행</button>
-</form>
-<br>
-<button onclick="history.back()">← 뒤로</button>
-</body>
-</html>
-"""
 
 # =====================================================
-# 업로드 처리
+# 필터 패싯 인덱스 (경기전 기준, 값별 비트맵 + 건수)
 # =====================================================
 
-@app.post("/upload-data")
-def upload(file: UploadFile = File(...)):
+FACET_COLS = {
+    "type":     COL_TYPE,
+    "homeaway": COL_HOMEAWAY,
+    "general":  COL_GENERAL,
+    "dir":      COL_DIR,
+    "handi":    COL_HANDI
+}
 
-    global CURRENT_DF
+def build_facet_index():
 
-    df = pd.read_csv(
-        file.file,
-        encoding="utf-8-sig",
-        dtype=str,
-        low_memory=False
-    )
+    global FACET_INDEX
+    FACET_INDEX = {}
 
-    if df.shape[1] != EXPECTED_COLS:
-        return {
-            "error": f"컬럼 불일치: {df.shape[1]} / 기대값 {EXPECTED_COLS}"
+    if not PICK_INDEX:
+        return
+
+    frame = PICK_INDEX["frame"]
+    facets = {}
+
+    for name, col in FACET_COLS.items():
+        codes, uniques = pd.factorize(frame.iloc[:, col], sort=True)
+        facets[name] = {
+            str(v): codes == k for k, v in enumerate(uniques)
         }
 
-    df.to_csv(DATA_FILE, index=False, encoding="utf-8-sig")
+    # 건수 기준은 /matches 대상 (경기전 + 일반/핸디1)
+    empty = np.zeros(len(frame), dtype=bool)
+    base = (
+        facets["type"].get("일반", empty) |
+        facets["type"].get("핸디1", empty)
+    )
 
-    CURRENT_DF = df
+    FACET_INDEX = {"facets": facets, "base": base}
+    FACET_INDEX["default"] = facet_counts({})
 
-    DIST_CACHE.clear()
-    SECRET_CACHE.clear()
 
-    build_five_cond_cache(CURRENT_DF)
-    build_league_weight(CURRENT_DF)
-    build_odds_cache(CURRENT_DF)
+def selection_mask(selection, skip=None):
 
-    return RedirectResponse("/", status_code=302)
+    mask = FACET_INDEX["base"].copy()
 
-# =====================================================
-# Health Check
-# =====================================================
+    for name, values in selection.items():
 
-def self_check():
+        if not values or name == skip:
+            continue
 
-    report = {}
+        bitmaps = FACET_INDEX["facets"][name]
+        selected = np.zeros(len(mask), dtype=bool)
 
-    report["data_loaded"] = not CURRENT_DF.empty
-    report["rows"] = len(CURRENT_DF)
+        for v in values.split(","):
+            if v in bitmaps:
+                selected |= bitmaps[v]
 
-    report["column_count_ok"] = (
-        CURRENT_DF.shape[1] == EXPECTED_COLS
-        if not CURRENT_DF.empty else False
-    )
+        mask &= selected
 
-    try:
-        _ = CURRENT_DF.iloc[:, COL_NO]
-        _ = CURRENT_DF.iloc[:, COL_TYPE]
-        report["index_access_ok"] = True
-    except:
-        report["index_access_ok"] = False
+    return mask
 
-    report["dist_cache_size"] = len(DIST_CACHE)
-    report["secret_cache_size"] = len(SECRET_CACHE)
-    report["expected_cols"] = EXPECTED_COLS
 
-    return report
+def facet_counts(selection):
 
+    # 각 패싯은 자기 자신을 제외한 나머지 선택조건 기준으로 집계
+    counts = {}
+
+    for name, bitmaps in FACET_INDEX["facets"].items():
+        others = selection_mask(selection, skip=name)
+        counts[name] = {
+            v: int(np.count_nonzero(bm & others))
+            for v, bm in bitmaps.items()
+        }
+
+    return {
+        "counts": counts,
+        "total": int(np.count_nonzero(selection_mask(selection)))
+    }
 
-@app.get("/health")
-def health():
-    return {"self_check": self_check()}
 
 # =====================================================
-# 필터 값 추출 API
+# 조건 격자 큐브
+# {유형, 홈/원정, 일반, 정역, 핸디, 리그} 모든 부분집합 → 채워진 셀만 W/D/L
+# 가장 세밀한 집계 1회 후 상위 부분집합은 그 표에서 합산
+# (NaN 키도 셀로 남겨 두고, 부분집합에 포함된 컬럼이 NaN 인 셀만 제외)
 # =====================================================
 
-@app.get("/filters")
-def filters():
+CUBE_DIMS = (COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI, COL_LEAGUE)
 
-    if CURRENT_DF.empty:
-        return {}
+def build_condition_cube(df, codes=None):
 
-    df = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] == "경기전"]
+    global CONDITION_CUBE
+    CONDITION_CUBE = {}
 
-    return {
-        "type": sorted(df.iloc[:, COL_TYPE].dropna().unique().tolist()),
-        "homeaway": sorted(df.iloc[:, COL_HOMEAWAY].dropna().unique().tolist()),
-        "general": sorted(df.iloc[:, COL_GENERAL].dropna().unique().tolist()),
-        "dir": sorted(df.iloc[:, COL_DIR].dropna().unique().tolist()),
-        "handi": sorted(df.iloc[:, COL_HANDI].dropna().unique().tolist())
-    }
+    if df.empty:
+        return
 
-# =====================================================
-# 경기목록 API
-# =====================================================
+    codes = codes or frame_codes(df)
+    cells, counts = cell_counts(codes, CUBE_DIMS, completed_only=True, keep_missing=True)
 
-@app.get("/matches")
-def matches(
-    type: str = None,
-    homeaway: str = None,
-    general: str = None,
-    dir: str = None,
-    handi: str = None
-):
+    if not len(counts):
+        return
 
-    if CURRENT_DF.empty:
-        return []
+    # 셀 × [총, 승, 무, 패] 로 줄인 뒤 부분집합마다 셀 코드 재결합 + 합산
+    finest = CountTable.from_cells([], codes["labels"], counts).counts.astype(np.int64)
+    sizes = [len(codes["codes"][col][1]) + 1 for col in CUBE_DIMS]
+    present = [cell < size - 1 for cell, size in zip(cells, sizes)]
 
-    base_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_RESULT] == "경기전") &
-        (
-            (CURRENT_DF.iloc[:, COL_TYPE] == "일반") |
-            (CURRENT_DF.iloc[:, COL_TYPE] == "핸디1")
-        )
-    ]
+    budget = MEMORY_BUDGETS.get("cube")
+    tables = {}
+    skipped = []
+    used = 0
 
-    base_df = apply_filters(base_df, type, homeaway, general, dir, handi)
+    # 거친 부분집합부터 → 예산 초과 시 세밀한 쪽이 빠짐 (조회는 스캔으로 대체)
+    for size in range(len(CUBE_DIMS) + 1):
+        for subset in itertools.combinations(range(len(CUBE_DIMS)), size):
 
-    result = []
+            cols = tuple(CUBE_DIMS[i] for i in subset)
 
-    for row in base_df.itertuples(index=False):
+            # 이 부분집합 컬럼 중 하나라도 NaN 인 셀 제외 (다른 컬럼 NaN 은 유지)
+            keep = np.ones(len(finest), dtype=bool)
+            for i in subset:
+                keep &= present[i]
 
-        data = list(row)
+            if not keep.any():
+                tables[cols] = CountTable()
+                continue
 
-        # tuple → pandas row 형태로 접근 제거
-        sec = secret_score_fast_tuple(row)
-        brain = secret_pick_brain_tuple(row)
+            if size == 0:
+                sub_cells, inv = [], np.zeros(int(keep.sum()), dtype=np.int64)
+            else:
+                sub_cells, inv = group_codes(
+                    [cells[i][keep] for i in subset], [sizes[i] for i in subset]
+                )
 
-        is_secret = bool(
-            sec["score"] > 0.05 and
-            sec["sample"] >= 20 and
-            sec["추천"] != "없음"
-        )
+            summed = np.zeros((int(inv.max()) + 1, 4), dtype=np.int64)
+            np.add.at(summed, inv, finest[keep])
 
-        result.append({
-            "row": list(map(str, data)),
-            "secret": is_secret,
-            "pick": sec["추천"] if is_secret else "",
-            "sp_pick": brain["추천"],
-            "confidence": brain["confidence"]
-        })
+            table = CountTable(cell_keys(codes, cols, sub_cells), summed.astype(np.int32))
+            table_bytes = table.nbytes()
 
-    return result
+            if budget and used + table_bytes > budget:
+                skipped.append(cols)
+                continue
 
-@app.get("/", response_class=HTMLResponse)
-def home():
+            tables[cols] = table
+            used += table_bytes
 
-    if not LOGGED_IN:
-        return """
-<html>
-<body style="background:#0f1720;color:white;
-display:flex;justify-content:center;
-align-items:center;height:100vh;">
-<form action="/login" method="post">
-<h2>Login</h2>
-<input name="username"><br><br>
-<input name="password" type="password"><br><br>
-<button type="submit">로그인</button>
-</form>
-</body>
-</html>
-"""
+    if skipped:
+        logging.warning(f"[CUBE] 예산 {budget} bytes 초과 → 부분집합 {len(skipped)}개 제외")
 
-    return """
-<html>
-<head>
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-body{background:#0f1720;color:white;font-family:Arial;margin:0;}
-.header{
-display:flex;justify-content:space-between;align-items:center;
-padding:14px 18px;background:#111827;position:sticky;top:0;z-index:50;
-}
-.logo{font-weight:700;font-size:18px;color:#38bdf8;}
-.top-icons{display:flex;gap:18px;font-size:18px;cursor:pointer;}
-.card{
-background:#1e293b;margin:14px;padding:18px;
-border-radius:18px;position:relative;
-box-shadow:0 4px 12px rgba(0,0,0,0.3);
-}
-.info-btn{position:absolute;right:14px;top:12px;font-size:12px;}
-.bottom-nav{
-position:fixed;bottom:0;width:100%;
-background:#111827;display:flex;
-justify-content:space-around;padding:12px 0;font-size:20px;
-}
-.modal{
-display:none;position:fixed;top:0;left:0;width:100%;height:100%;
-background:rgba(0,0,0,0.6);justify-content:center;align-items:center;
-}
-.modal-content{
-background:#1e293b;padding:20px;border-radius:16px;
-width:340px;max-height:80vh;overflow:auto;
-}
-.checkbox-group{margin-bottom:12px;}
-.secret-badge{
-position:absolute;right:18px;top:50%;
-transform:translateY(-50%);
-background:#22c55e;color:#0f1720;
-padding:8px 12px;border-radius:14px;
-font-size:12px;font-weight:bold;
-box-shadow:0 4px 10px rgba(0,0,0,0.4);
-}
-</style>
-</head>
+    CONDITION_CUBE = {
+        "tables": tables,
+        "skipped": skipped,
+        "cells": sum(len(t) for t in tables.values()),
+        "bytes": used
+    }
 
-<body>
 
-<div class="header">
-<div class="logo">SecretCore PRO</div>
-<div class="top-icons">
-<div onclick="resetFilters()">🔄</div>
-<div onclick="openModal()">🔍</div>
-<div onclick="location.href='/page-upload'">📤</div>
-<div onclick="location.href='/logout'">👤</div>
-</div>
-</div>
+def cube_dist(conditions):
 
-<div id="conditionBar"
-style="padding:8px 16px;font-size:12px;
-opacity:0.8;border-bottom:1px solid #1e293b;">
-기본조건
-</div>
+    # conditions: {컬럼: 값 또는 값 목록}, 목록은 isin 처럼 셀 합산
+    # 큐브에 없는 부분집합이면 None → 호출부가 스캔
+    if not CONDITION_CUBE:
+        return None
 
-<div id="list" style="padding-bottom:100px;"></div>
+    cols = tuple(c for c in CUBE_DIMS if c in conditions)
+    table = CONDITION_CUBE["tables"].get(cols)
 
-<div class="bottom-nav">
-<a href="/strategy1-view">🧠</a>
-<a href="/strategy2-view">🎯</a>
-<a href="/history">📊</a>
-<a href="/evaluate">🧪</a>
-</div>
+    if table is None:
+        return None
 
-<div class="modal" id="filterModal">
-<div class="modal-content">
-<h3>필터</h3>
-<div id="filterArea"></div>
-<button onclick="applyFilters()">적용</button>
-<button onclick="closeModal()">닫기</button>
-</div>
-</div>
+    values = [
+        conditions[c] if isinstance(conditions[c], (list, tuple, set)) else [conditions[c]]
+        for c in cols
+    ]
 
-<script>
+    counts = np.zeros(4, dtype=np.int64)
 
-function resetFilters(){ window.location.href="/"; }
+    for key in itertools.product(*values):
+        slot = table.slots.get(key)
+        if slot is not None:
+            counts += table.counts[slot]
 
-function openModal(){
-document.getElementById("filterModal").style.display="flex";
-loadFilters();
-}
+    return count_dist(counts)
 
-function closeModal(){
-document.getElementById("filterModal").style.display="none";
-}
 
-async function loadFilters(){
+# =====================================================
+# 조건별 경기 행 인덱스 (상세 카드2/3 경기목록)
+# 5조건 셀마다 완료 경기 행 위치를 번호 내림차순으로 보관
+# → 목록은 셀 구간 앞부분만, 전체 프레임 스캔 없음
+# =====================================================
 
-    let res = await fetch("/filters");
-    let data = await res.json();
+ROW_DIMS = (COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI)
 
-    let area = document.getElementById("filterArea");
-    area.innerHTML = "";
+def build_condition_rows(df, codes=None):
 
-    function createGroup(title, key){
-        if(!data[key] || data[key].length===0) return;
+    global CONDITION_ROWS
+    CONDITION_ROWS = {}
 
-        let div = document.createElement("div");
-        div.className="checkbox-group";
+    if df.empty:
+        return
 
-        let html = `<b>${title}</b><br>`;
-        data[key].forEach(v=>{
-            html += `
-            <label style="display:block;font-size:13px;">
-            <input type="checkbox" name="${key}" value="${v}">
-            ${v}
-            </label>`;
-        });
+    codes = codes or frame_codes(df)
+    parts = codes["codes"]
 
-        div.innerHTML = html;
-        area.appendChild(div);
+    # 상세 목록과 같은 기준: 경기전만 제외 (결과 NaN 행은 목록에 포함)
+    keep = parts[COL_RESULT][0] != codes["pre"]
+    for col in ROW_DIMS:
+        keep &= parts[col][0] >= 0
+
+    # 번호 숫자 내림차순 (숫자 아님은 뒤로) → 셀별로 안정 정렬
+    order = np.argsort(-numeric_values(df.iloc[:, COL_NO]), kind="stable")
+    order = order[keep[order]]
+
+    if not len(order):
+        return
+
+    cells, inv = group_codes(
+        [parts[col][0][order] for col in ROW_DIMS],
+        [max(len(parts[col][1]), 1) for col in ROW_DIMS]
+    )
+    grouped = np.argsort(inv, kind="stable")
+
+    CONDITION_ROWS = {
+        "slots": dict(zip(cell_keys(codes, ROW_DIMS, cells), range(len(cells[0])))),
+        "starts": np.searchsorted(inv[grouped], np.arange(len(cells[0]) + 1)),
+        "positions": order[grouped],
+        "leagues": parts[COL_LEAGUE][0],
+        "league_values": parts[COL_LEAGUE][1]
     }
 
-    createGroup("유형","type");
-    createGroup("홈/원정","homeaway");
-    createGroup("일반","general");
-    createGroup("정역","dir");
-    createGroup("핸디","handi");
-}
 
-function applyFilters(){
+def condition_rows(conditions, window=None):
 
-    let params = new URLSearchParams();
+    # conditions: pinned_conditions(5조건, 필터)
+    # 반환: (행 위치 (번호 내림차순), 행별 리그 코드, 리그 코드 → 값)
+    ensure_index("condition_rows")
+    index = CONDITION_ROWS
+    empty = np.zeros(0, dtype=np.int64)
 
-    ["type","homeaway","general","dir","handi"].forEach(key=>{
+    if not index:
+        return empty, empty, np.zeros(0, dtype=object)
 
-        let checked = Array.from(
-            document.querySelectorAll(`input[name="${key}"]:checked`)
-        ).map(el=>el.value);
+    key = []
+    for col in ROW_DIMS:
+        value = conditions[col]
+        if isinstance(value, list):
+            if not value:
+                return empty, empty, index["league_values"]
+            value = value[0]
+        key.append(value)
 
-        if(checked.length>0){
-            params.set(key, checked.join(","));
-        }
-    });
+    slot = index["slots"].get(tuple(key))
+    if slot is None:
+        return empty, empty, index["league_values"]
 
-    window.location.href = "/?" + params.toString();
-}
+    starts = index["starts"]
+    positions = index["positions"][starts[slot]:starts[slot + 1]]
 
-async function load(){
+    if window is not None:
+        ensure_index("window_index")
+        positions = window_positions(positions, window)
 
-    let params = new URLSearchParams(window.location.search);
-    let r = await fetch('/matches?' + params.toString());
-    let data = await r.json();
-
-    // 🔥 여기서 conditionBar 처리
-    if(data.length>0){
-        let first=data[0].row;
-        document.getElementById("conditionBar").innerText =
-        first[1] + "년 · " + first[2];
-    } else {
-        document.getElementById("conditionBar").innerText="경기 없음";
+    return positions, index["leagues"][positions], index["league_values"]
+
+
+def filter_conditions(type, homeaway, general, dir, handi):
+    return {
+        col: value.split(",")
+        for col, value in (
+            (COL_TYPE, type),
+            (COL_HOMEAWAY, homeaway),
+            (COL_GENERAL, general),
+            (COL_DIR, dir),
+            (COL_HANDI, handi)
+        )
+        if value
     }
 
-    let html="";
-    let query = window.location.search;
 
-    data.forEach(function(m){
+def pinned_conditions(pinned, filters):
 
-        let row=m.row;
-        let badge="";
+    # 고정 조건 + 필터 목록 교집합 (고정값이 필터에 없으면 빈 목록)
+    conditions = dict(filters)
 
-        if(m.secret){
-            badge=`<div class="secret-badge">
-            시크릿픽 ${m.pick}
-            </div>`;
-        }
+    for col, value in pinned.items():
+        if col in filters:
+            conditions[col] = [value] if value in filters[col] else []
+        else:
+            conditions[col] = value
 
-        html+=`<div class="card">
-        ${badge}
-        <div><b>${row[6]}</b> vs <b>${row[7]}</b></div>
-        <div>승 ${row[8]} | 무 ${row[9]} | 패 ${row[10]}</div>
-        <div>${row[14]} · ${row[16]} · ${row[11]} · ${row[15]} · ${row[12]}</div>
-        <div class="info-btn">
-        <a href="/detail?no=${row[0]}${query}" style="color:#38bdf8;">정보</a>
-        </div>
-        </div>`;
-    });
+    return conditions
 
-    document.getElementById("list").innerHTML=html;
-}
 
-load();
-</script>
+def lookup_distribution(conditions, df, window=None):
+
+    # df: 표 조회가 안 될 때 집계할 프레임 (함수면 그때만 생성)
+    if window is not None:
+        return window_lookup(conditions, df, window)
+
+    dist = cube_dist(conditions)
+    return dist if dist is not None else distribution(df() if callable(df) else df)
+
+
+def window_lookup(conditions, df, window):
+
+    # 완료 경기 누적합 표 중 조건 컬럼이 같은 표가 있으면 구간 조회, 아니면 구간 프레임 집계
+    cols = set(conditions)
+
+    if not any(isinstance(v, (list, tuple, set)) for v in conditions.values()):
+        for name, (table_cols, completed) in WINDOW_TABLES.items():
+            if completed and set(table_cols) == cols:
+                key = tuple(conditions[c] for c in table_cols)
+                return window_dist(
+                    name, key, window, count_dist(np.zeros(4, dtype=np.int64))
+                )
+
+    return distribution(df() if callable(df) else df)
 
-</body>
-</html>
-"""
 
 # =====================================================
-# PRO 막대그래프
+# 배당 구간 인덱스
+# 유형 × (승/무/패 배당) 별 숫자 정렬 + 누적 [총, 승, 무, 패]
+# → ±δ / 범위 분포는 이진탐색 2회 + 누적합 차이 (O(log n))
 # =====================================================
 
-def bar_html(percent, mode="win"):
+ODDS_SIDES = {
+    "win":  COL_WIN_ODDS,
+    "draw": COL_DRAW_ODDS,
+    "lose": COL_LOSE_ODDS
+}
 
-    color_map = {
-        "win":"linear-gradient(90deg,#22c55e,#16a34a)",
-        "draw":"linear-gradient(90deg,#94a3b8,#64748b)",
-        "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
-    }
-
-    return f"""
-<div style="width:100%;background:rgba(255,255,255,0.08);
-border-radius:999px;height:14px;margin:6px 0;">
-<div style="width:{percent}%;
-background:{color_map[mode]};
-height:100%;
-border-radius:999px;"></div>
-</div>
-"""
+# 문자열 배당을 float 로 바꾼 경계값 오차 보정
+ODDS_EPS = 1e-9
 
-# =====================================================
-# Page2 - 상세 분석 (ULTRA MASTER FINAL COMPLETE)
-# 카드1 좌우 / 카드2 좌우 / 카드3 리그별 / 3버튼 / 경기수표시 전부포함
-# =====================================================
+def build_odds_index(df, codes=None):
 
-@app.get("/detail", response_class=HTMLResponse)
-def detail(
-    no: str = None,
-    type: str = None,
-    homeaway: str = None,
-    general: str = None,
-    dir: str = None,
-    handi: str = None
-):
+    global ODDS_INDEX
+    ODDS_INDEX = {}
 
-    if not no:
-        return "<h2>잘못된 접근</h2>"
+    if df.empty:
+        return
 
-    if CURRENT_DF.empty:
-        return "<h2>데이터 없음</h2>"
+    codes = codes or frame_codes(df)
+    result = codes["codes"][COL_RESULT][0]
+    type_codes, type_values = codes["codes"][COL_TYPE]
 
-    row_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_NO] == str(no)]
-    if row_df.empty:
-        return "<h2>경기 없음</h2>"
+    completed = result != codes["pre"]
 
-    row = row_df.iloc[0]
+    outcome = np.zeros((len(df), 4), dtype=np.int32)
+    outcome[:, 0] = 1
+    for j, label in enumerate(RESULT_LABELS, start=1):
+        if label in codes["labels"]:
+            outcome[:, j] = result == codes["labels"].index(label)
 
-    home   = row.iloc[COL_HOME]
-    away   = row.iloc[COL_AWAY]
-    league = row.iloc[COL_LEAGUE]
+    for side, col in ODDS_SIDES.items():
 
-    card_condition = (
-        f"유형={row.iloc[COL_TYPE]} · "
-        f"{row.iloc[COL_HOMEAWAY]} · "
-        f"{row.iloc[COL_GENERAL]} · "
-        f"{row.iloc[COL_DIR]} · "
-        f"{row.iloc[COL_HANDI]}"
-    )
+        odds = codes["numeric"][col]
+        valid = np.flatnonzero(completed & ~np.isnan(odds) & (type_codes >= 0))
 
-    odds_text = (
-        f"승 {row.iloc[COL_WIN_ODDS]} · "
-        f"무 {row.iloc[COL_DRAW_ODDS]} · "
-        f"패 {row.iloc[COL_LOSE_ODDS]}"
-    )
+        # (유형, 배당) 1회 정렬 후 유형 경계로 분할
+        pos = valid[np.lexsort((odds[valid], type_codes[valid]))]
+        bounds = np.flatnonzero(np.diff(type_codes[pos])) + 1
 
-    filtered_df = apply_filters(CURRENT_DF, type, homeaway, general, dir, handi)
+        for part in np.split(pos, bounds):
 
-    # =====================================================
-    # 공통 UI
-    # =====================================================
+            if not len(part):
+                continue
 
-    def bar_html(percent, mode="win"):
-        color_map = {
-            "win":"linear-gradient(90deg,#3b82f6,#2563eb)",
-            "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
-            "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
-        }
-        return f"""
-        <div style="width:100%;background:rgba(255,255,255,0.08);
-        border-radius:999px;height:14px;margin:6px 0;">
-        <div style="width:{percent}%;
-        background:{color_map[mode]};
-        height:100%;
-        border-radius:999px;"></div>
-        </div>
-        """
+            cum = np.zeros((len(part) + 1, 4), dtype=np.int64)
+            np.cumsum(outcome[part], axis=0, out=cum[1:])
 
-    def result_circle(result, reverse=False):
-        if not reverse:
-            color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
-        else:
-            color_map = {"승":"#ef4444","무":"#22c55e","패":"#3b82f6"}
-        color = color_map.get(result, "#64748b")
-        return f"""
-        <span style="display:inline-flex;
-        align-items:center;justify-content:center;
-        width:22px;height:22px;border-radius:50%;
-        background:{color};color:white;
-        font-size:12px;font-weight:bold;margin-left:6px;">
-        {result}</span>
-        """
+            ODDS_INDEX.setdefault(type_values[type_codes[part[0]]], {})[side] = {
+                "odds": odds[part],
+                "pos": part,
+                "cum": cum
+            }
 
-    def match_list_html(df, reverse=False):
-        df = df.assign(
-            __no_numeric=pd.to_numeric(df.iloc[:, COL_NO], errors="coerce")
-        ).sort_values(by="__no_numeric", ascending=False).head(20)
 
-        html=""
-        for _, r in df.iterrows():
-            html+=f"""
-            <div style="font-size:12px;border-bottom:1px solid #334155;padding:6px 0;">
-            {r.iloc[COL_YEAR]} · {r.iloc[COL_ROUND]} · {r.iloc[COL_LEAGUE]} ·
-            {r.iloc[COL_HOME]} vs {r.iloc[COL_AWAY]} ·
-            유형={r.iloc[COL_TYPE]} · {r.iloc[COL_HOMEAWAY]} ·
-            {r.iloc[COL_GENERAL]} · {r.iloc[COL_DIR]} · {r.iloc[COL_HANDI]}
-            {result_circle(r.iloc[COL_RESULT], reverse)}
-            </div>
-            """
-        return html if html else "<div style='font-size:12px;'>경기 없음</div>"
+def odds_band(type_val, side, low, high):
 
-    # =====================================================
-    # 카드1 : 맞대결 좌우 비교
-    # =====================================================
+    # 반환: (분포, CURRENT_DF 행 위치 배열)
+    ensure_index("odds_index")
+    index = ODDS_INDEX.get(type_val, {}).get(side)
 
-    h2h_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_HOME] == home) &
-        (CURRENT_DF.iloc[:, COL_AWAY] == away) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+    if index is None:
+        return count_dist(np.zeros(4, dtype=np.int64)), np.zeros(0, dtype=np.int64)
 
-    h2h_reverse_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_HOME] == away) &
-        (CURRENT_DF.iloc[:, COL_AWAY] == home) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+    lo = np.searchsorted(index["odds"], low - ODDS_EPS, side="left")
+    hi = np.searchsorted(index["odds"], high + ODDS_EPS, side="right")
 
-    h2h_dist = distribution(h2h_df)
-    h2h_reverse_dist = distribution(h2h_reverse_df)
+    return count_dist(index["cum"][hi] - index["cum"][lo]), index["pos"][lo:hi]
 
-    # =====================================================
-    # 카드2 : 5조건 전체 vs 동일리그
-    # =====================================================
 
-    base_df = run_filter(filtered_df, build_5cond(row))
-    base_df = base_df[base_df.iloc[:, COL_RESULT] != "경기전"]
-    base_dist = distribution(base_df)
+# =====================================================
+# 유사 배당 KD-tree
+# 완료 경기의 (승, 무, 패) 배당 3차원 점 → 중앙값 분할, 리프 단위 벡터 거리 계산
+# 질의는 노드 박스 최소거리 기준 best-first + 가지치기
+# =====================================================
 
-    league_df = run_filter(filtered_df, build_league_cond(row))
-    league_df = league_df[league_df.iloc[:, COL_RESULT] != "경기전"]
-    league_dist = distribution(league_df)
+class OddsKDTree:
 
-    # =====================================================
-    # 카드3 : 리그별 분포
-    # =====================================================
+    LEAF_SIZE = 32
 
-    league_group_df = base_df
-    league_groups = league_group_df.groupby(
-        league_group_df.iloc[:, COL_LEAGUE]
-    )
+    def __init__(self, points):
 
-    league_card_html = ""
+        # 힙 배치 완전 이진트리: 노드 i 의 자식 2i+1, 2i+2 / 모든 리프 같은 깊이
+        # 레벨 단위 벡터 생성: 분할 차원은 깊이 순환, (구간, 차원 순위) 정수 정렬로 중앙 분할
+        # 경계 박스는 리프에서 계산 후 부모로 min/max 전파
+        self.points = points
+        self.perm = np.arange(len(points))
 
-    for lg, group in league_groups:
-        dist = distribution(group)
-        box_id = f"lg_{lg}"
+        n = len(points)
+        self.depth = max(0, int(np.ceil(np.log2(max(n, 1) / self.LEAF_SIZE))))
+        self.first_leaf = 2 ** self.depth - 1
 
-        league_card_html += f"""
-        <div style="background:#1e293b;padding:16px;
-        border-radius:16px;margin-top:20px;">
+        if n == 0:
+            self.lo = self.hi = np.zeros((0, 3))
+            self.start = self.end = np.zeros(0, dtype=np.int64)
+            return
 
-        <h3>카드3 - 리그별 분포 ({lg})  총 ({dist["총"]}경기)</h3>
+        ranks = np.empty((3, n), dtype=np.int64)
+        for dim in range(3):
+            ranks[dim, np.argsort(points[:, dim], kind="stable")] = np.arange(n)
 
-        <div style="font-size:12px;opacity:0.7;">
-        조건: 리그={lg} · {card_condition}
-        </div>
+        starts = np.array([0])
+        ends = np.array([n])
+        start, end = [starts], [ends]
 
-        <div>승 {dist["wp"]}% ({dist["승"]}경기)</div>{bar_html(dist["wp"],"win")}
-        <div>무 {dist["dp"]}% ({dist["무"]}경기)</div>{bar_html(dist["dp"],"draw")}
-        <div>패 {dist["lp"]}% ({dist["패"]}경기)</div>{bar_html(dist["lp"],"lose")}
+        for level in range(self.depth):
 
-        <button onclick="toggleBox('{box_id}')">경기목록</button>
-        <div id="{box_id}" style="display:none;">
-        {match_list_html(group)}
-        </div>
+            seg = np.repeat(np.arange(len(starts)), ends - starts)
+            key = seg * n + ranks[level % 3][self.perm]
+            self.perm = self.perm[np.argsort(key, kind="stable")]
 
-        </div>
-        """
+            mids = starts + (ends - starts) // 2
+            starts = np.column_stack([starts, mids]).ravel()
+            ends = np.column_stack([mids, ends]).ravel()
 
-    # =====================================================
-    # HTML
-    # =====================================================
+            start.append(starts)
+            end.append(ends)
 
-    return f"""
-<html>
-<body style="background:#0f1720;color:white;
-font-family:Arial;padding:20px;">
+        leaf_pts = points[self.perm]
+        lo = [np.minimum.reduceat(leaf_pts, starts, axis=0)]
+        hi = [np.maximum.reduceat(leaf_pts, starts, axis=0)]
 
-<div style="display:flex;justify-content:space-between;align-items:center;">
-<h2>[{league}] {home} vs {away}</h2>
+        for level in range(self.depth):
+            lo.append(np.minimum(lo[-1][0::2], lo[-1][1::2]))
+            hi.append(np.maximum(hi[-1][0::2], hi[-1][1::2]))
 
-<div style="display:flex;gap:12px;">
-<a href="/page3?no={no}&away=0" style="color:#38bdf8;">홈팀분석</a>
-<a href="/page3?no={no}&away=1" style="color:#38bdf8;">원정팀분석</a>
-<a href="/page4?no={no}" style="color:#38bdf8;">배당분석</a>
-</div>
+        self.lo = np.concatenate(lo[::-1])
+        self.hi = np.concatenate(hi[::-1])
+        self.start = np.concatenate(start)
+        self.end = np.concatenate(end)
 
-</div>
+    def box_dist(self, node, point):
 
-<div style="opacity:0.7;font-size:12px;margin-bottom:15px;">
-{card_condition}<br>배당: {odds_text}
-</div>
+        gap = np.maximum(self.lo[node] - point, 0) + np.maximum(point - self.hi[node], 0)
+        return float(gap @ gap)
 
-<!-- 카드1 -->
-<div style="display:flex;gap:20px;flex-wrap:wrap;margin-bottom:25px;">
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드1 - 맞대결 (정방향)  총 ({h2h_dist["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;">
-조건: 유형={row.iloc[COL_TYPE]} · 홈={home} · 원정={away}
-</div>
-<div>승 {h2h_dist["wp"]}% ({h2h_dist["승"]}경기)</div>{bar_html(h2h_dist["wp"],"win")}
-<div>무 {h2h_dist["dp"]}% ({h2h_dist["무"]}경기)</div>{bar_html(h2h_dist["dp"],"draw")}
-<div>패 {h2h_dist["lp"]}% ({h2h_dist["패"]}경기)</div>{bar_html(h2h_dist["lp"],"lose")}
-<button onclick="toggleBox('h1')">경기목록</button>
-<div id="h1" style="display:none;">{match_list_html(h2h_df)}</div>
-</div>
+    def query(self, point, k):
 
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드1 - 맞대결 (역방향)  총 ({h2h_reverse_dist["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;">
-조건: 유형={row.iloc[COL_TYPE]} · 홈={away} · 원정={home}
-</div>
-<div>승 {h2h_reverse_dist["wp"]}% ({h2h_reverse_dist["승"]}경기)</div>{bar_html(h2h_reverse_dist["wp"],"win")}
-<div>무 {h2h_reverse_dist["dp"]}% ({h2h_reverse_dist["무"]}경기)</div>{bar_html(h2h_reverse_dist["dp"],"draw")}
-<div>패 {h2h_reverse_dist["lp"]}% ({h2h_reverse_dist["패"]}경기)</div>{bar_html(h2h_reverse_dist["lp"],"lose")}
-<button onclick="toggleBox('h2')">경기목록</button>
-<div id="h2" style="display:none;">
-{match_list_html(h2h_reverse_df,True)}
-</div>
-</div>
-</div>
+        # 반환: (제곱거리, points 인덱스) 거리 오름차순
+        best_d = np.zeros(0)
+        best_i = np.zeros(0, dtype=np.int64)
 
-<!-- 카드2 -->
-<div style="display:flex;gap:20px;flex-wrap:wrap;margin-bottom:25px;">
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드2 - 5조건 전체  총 ({base_dist["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;">
-조건: {card_condition}
-</div>
-<div>승 {base_dist["wp"]}% ({base_dist["승"]}경기)</div>{bar_html(base_dist["wp"],"win")}
-<div>무 {base_dist["dp"]}% ({base_dist["무"]}경기)</div>{bar_html(base_dist["dp"],"draw")}
-<div>패 {base_dist["lp"]}% ({base_dist["패"]}경기)</div>{bar_html(base_dist["lp"],"lose")}
-<button onclick="toggleBox('b1')">경기목록</button>
-<div id="b1" style="display:none;">
-{match_list_html(base_df)}
-</div>
-</div>
+        if not len(self.start) or k <= 0:
+            return best_d, best_i
 
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드2 - 동일리그 5조건  총 ({league_dist["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;">
-조건: 리그={league} · {card_condition}
-</div>
-<div>승 {league_dist["wp"]}% ({league_dist["승"]}경기)</div>{bar_html(league_dist["wp"],"win")}
-<div>무 {league_dist["dp"]}% ({league_dist["무"]}경기)</div>{bar_html(league_dist["dp"],"draw")}
-<div>패 {league_dist["lp"]}% ({league_dist["패"]}경기)</div>{bar_html(league_dist["lp"],"lose")}
-<button onclick="toggleBox('b2')">경기목록</button>
-<div id="b2" style="display:none;">
-{match_list_html(league_df)}
-</div>
-</div>
-</div>
+        heap = [(0.0, 0)]
 
-<!-- 카드3 -->
-<button onclick="toggleBox('lg_card')">
-카드3 - 리그별 분포 보기/숨기기
-</button>
+        while heap:
 
-<div id="lg_card" style="display:none;">
-{league_card_html}
-</div>
+            d2, node = heapq.heappop(heap)
 
-<br><br>
-<button onclick="history.back()">← 뒤로가기</button>
+            if len(best_d) == k and d2 > best_d.max():
+                break
 
-<script>
-function toggleBox(id){{
-    var el=document.getElementById(id);
-    if(el.style.display==="none"){{el.style.display="block";}}
-    else{{el.style.display="none";}}
-}}
-</script>
+            if node >= self.first_leaf:
+                idx = self.perm[self.start[node]:self.end[node]]
+                diff = self.points[idx] - point
+                best_d = np.concatenate([best_d, np.einsum("ij,ij->i", diff, diff)])
+                best_i = np.concatenate([best_i, idx])
 
-</body>
-</html>
-"""
+                if len(best_d) > k:
+                    keep = np.argpartition(best_d, k - 1)[:k]
+                    best_d, best_i = best_d[keep], best_i[keep]
+                continue
 
-# =====================================================
-# Page3 - 팀 분석
-# =====================================================
+            for child in (2 * node + 1, 2 * node + 2):
+                heapq.heappush(heap, (self.box_dist(child, point), child))
 
-@app.get("/page3", response_class=HTMLResponse)
-def page3_view(no: str = None, away: int = 0):
+        order = np.lexsort((best_i, best_d))
+        return best_d[order], best_i[order]
 
-    if not no:
-        return "<h2>잘못된 접근</h2>"
-    if CURRENT_DF.empty:
-        return "<h2>데이터 없음</h2>"
 
-    row_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_NO] == str(no)]
-    if row_df.empty:
-        return "<h2>경기 없음</h2>"
+def build_similar_index(df, codes=None):
 
-    row = row_df.iloc[0]
+    global SIMILAR_INDEX
+    SIMILAR_INDEX = {}
 
-    home_team = row.iloc[COL_HOME]
-    away_team = row.iloc[COL_AWAY]
-    league    = row.iloc[COL_LEAGUE]
+    if df.empty:
+        return
 
-    team = home_team if away == 0 else away_team
-    page_title = "홈팀분석" if away == 0 else "원정팀분석"
+    codes = codes or frame_codes(df)
+    odds = np.column_stack([codes["numeric"][col] for col in ODDS_COLS])
 
-    match_condition = (
-        f"{row.iloc[COL_TYPE]} · "
-        f"{row.iloc[COL_HOMEAWAY]} · "
-        f"{row.iloc[COL_GENERAL]} · "
-        f"{row.iloc[COL_DIR]} · "
-        f"{row.iloc[COL_HANDI]}"
+    valid = (
+        (codes["codes"][COL_RESULT][0] != codes["pre"]) &
+        ~np.isnan(odds).any(axis=1)
     )
 
-    odds_text = (
-        f"승 {row.iloc[COL_WIN_ODDS]} · "
-        f"무 {row.iloc[COL_DRAW_ODDS]} · "
-        f"패 {row.iloc[COL_LOSE_ODDS]}"
-    )
+    positions = np.flatnonzero(valid)
 
-    reverse_mode = (away == 1)
+    SIMILAR_INDEX = {
+        "points": odds[positions],
+        "positions": positions,
+        "types": df.iloc[positions, COL_TYPE].to_numpy(),
+        "leagues": df.iloc[positions, COL_LEAGUE].to_numpy(),
+        "trees": {}
+    }
+
+    # 전체 범위 트리는 즉시, 유형/리그 범위는 첫 조회 시 생성
+    similar_tree(None, None)
+
+
+def similar_tree(type_val, league):
+
+    key = (type_val, league)
+    trees = SIMILAR_INDEX["trees"]
+
+    if key not in trees:
+
+        members = np.ones(len(SIMILAR_INDEX["positions"]), dtype=bool)
+        if type_val is not None:
+            members &= SIMILAR_INDEX["types"] == type_val
+        if league is not None:
+            members &= SIMILAR_INDEX["leagues"] == league
+
+        members = np.flatnonzero(members)
+        trees[key] = (members, OddsKDTree(SIMILAR_INDEX["points"][members]))
+
+    return trees[key]
+
+
+def similar_matches(point, k, type_val=None, league=None, exclude=None):
+
+    # 반환: (CURRENT_DF 행 위치, 거리) — exclude 위치는 제외
+    ensure_index("similar_index")
+    if not SIMILAR_INDEX:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    members, tree = similar_tree(type_val, league)
+    d2, idx = tree.query(np.asarray(point, dtype=float), k + 1)
+
+    positions = SIMILAR_INDEX["positions"][members[idx]]
+    keep = positions != exclude
+
+    return positions[keep][:k], np.sqrt(d2[keep][:k])
+
+
+# =====================================================
+# 기간 구간 분포 (년도/회차 누적합)
+# 키별로 (년도*10000+회차) 오름차순 누적 [총,승,무,패] → 구간 = 누적합 차
+# 구간 조회는 키 내 이분 탐색 2회 (전체 기간이면 집계 표와 같은 값)
+# =====================================================
+
+WINDOW_TABLES = {
+    # 이름: (키 컬럼, 완료 경기만)
+    "five_cond":   ((COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI), False),
+    "five_done":   ((COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI), True),
+    "league_cond": ((COL_LEAGUE, COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI), True),
+    "odds":        (ODDS_COLS, False),
+    "home":        ((COL_HOME, COL_TYPE), True),
+    "away":        ((COL_AWAY, COL_TYPE), True)
+}
+
+WINDOW_END = 10 ** 12
+WINDOW_HELP = "기간 형식: 2y (최근 2시즌) · 30r (최근 30회차) · 2024-10 (2024년 10회차부터) · 2023-1~2024-50"
+
+
+class WindowTable:
+
+    def __init__(self, keys=(), starts=None, periods=None, cum=None):
+        # starts: 키별 periods 시작 위치 (키 수 + 1), cum: 앞에 0 행이 붙은 전체 누적합
+        self.slots = dict(zip(keys, range(len(keys))))
+        self.starts = starts if starts is not None else np.zeros(1, dtype=np.int64)
+        self.periods = periods if periods is not None else np.zeros(0, dtype=np.int64)
+        self.cum = cum if cum is not None else np.zeros((1, 4), dtype=np.int32)
+
+    def counts(self, key, span):
+
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+
+        a, b = self.starts[slot], self.starts[slot + 1]
+        periods = self.periods[a:b]
+
+        lo = a + np.searchsorted(periods, span[0], side="left")
+        hi = a + np.searchsorted(periods, span[1], side="right")
+
+        return self.cum[hi] - self.cum[lo]
+
+    def nbytes(self):
+
+        # CountTable.nbytes 와 같은 방식 (키 문자열은 공유 객체)
+        n = len(self.slots)
+        first = next(iter(self.slots), ())
+
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.slots) +
+            n * (sys.getsizeof(first) + sys.getsizeof(n)) +
+            self.starts.nbytes + self.periods.nbytes + self.cum.nbytes
+        )
+
+
+def window_periods(df):
+
+    # 행별 기간 키 (년도 또는 회차가 숫자가 아니면 NaN → 모든 구간에서 제외)
+    return numeric_values(df.iloc[:, COL_YEAR]) * 10000 + numeric_values(df.iloc[:, COL_ROUND])
+
+
+def window_table(codes, period, cols, completed_only):
+
+    parts = codes["codes"]
+    result = parts[COL_RESULT][0]
+
+    keep = (result >= 0) & ~np.isnan(period)
+    if completed_only:
+        keep &= result != codes["pre"]
+    for col in cols:
+        keep &= parts[col][0] >= 0
+
+    if not keep.any():
+        return WindowTable()
+
+    arrays = [parts[col][0][keep] for col in cols]
+    sizes = [max(len(parts[col][1]), 1) for col in cols]
+    cells, inv = group_codes(arrays, sizes)
+
+    # (셀, 기간) 순 정렬 후 같은 (셀, 기간) 묶음별 결과 건수
+    periods = period[keep].astype(np.int64)
+    result = result[keep]
+
+    order = np.lexsort((periods, inv))
+    inv, periods, result = inv[order], periods[order], result[order]
+
+    first = np.ones(len(inv), dtype=bool)
+    first[1:] = (inv[1:] != inv[:-1]) | (periods[1:] != periods[:-1])
+    group = np.cumsum(first) - 1
+
+    n_labels = len(codes["labels"])
+    counts = np.bincount(
+        group * n_labels + result,
+        minlength=(int(group[-1]) + 1) * n_labels
+    ).reshape(-1, n_labels)
+
+    table = CountTable.from_cells([], codes["labels"], counts).counts
+    group_cell = inv[first]
+
+    return WindowTable(
+        cell_keys(codes, cols, cells),
+        np.searchsorted(group_cell, np.arange(len(cells[0]) + 1)),
+        periods[first],
+        np.vstack([np.zeros((1, 4), dtype=np.int32), np.cumsum(table, axis=0, dtype=np.int32)])
+    )
+
+
+def build_window_index(df, codes=None):
+
+    global WINDOW_INDEX
+    WINDOW_INDEX = {}
+
+    if df.empty:
+        return
+
+    codes = codes or frame_codes(df)
+    period = window_periods(df)
+
+    with np.errstate(invalid="ignore"):
+        ordered = bool(np.all(period[1:] >= period[:-1]))
+
+    WINDOW_INDEX = {
+        "period": period,
+        "periods": np.unique(period[~np.isnan(period)]).astype(np.int64),
+        "ordered": ordered,
+        "tables": {
+            name: window_table(codes, period, cols, completed)
+            for name, (cols, completed) in WINDOW_TABLES.items()
+        }
+    }
+
+
+def period_key(text, end=False):
+
+    # "2024-10" → 2024년 10회차, "2024" → 2024년 첫/마지막 회차
+    year, _, rnd = text.strip().partition("-")
+
+    if rnd:
+        return int(year) * 10000 + int(rnd)
+
+    return int(year) * 10000 + (9999 if end else 0)
+
+
+def parse_window(window):
+
+    # 반환: None (전체 기간) 또는 (시작, 끝) 기간 키 (양끝 포함), 형식 오류는 ValueError
+    if not window:
+        return None
+
+    text = window.strip().lower()
+    ensure_index("window_index")
+    periods = WINDOW_INDEX.get("periods", np.zeros(0, dtype=np.int64))
+
+    try:
+        if text[-1] in ("y", "r"):
+
+            n = int(text[:-1])
+            if n < 1:
+                raise ValueError
+            if not len(periods):
+                return (WINDOW_END, WINDOW_END)
+
+            if text[-1] == "y":
+                return ((int(periods[-1]) // 10000 - n + 1) * 10000, WINDOW_END)
+
+            return (int(periods[-min(n, len(periods))]), WINDOW_END)
+
+        start, _, end = text.partition("~")
+
+        return (
+            period_key(start) if start else 0,
+            period_key(end, end=True) if end else WINDOW_END
+        )
+
+    except (ValueError, IndexError):
+        raise ValueError(WINDOW_HELP)
+
+
+def window_dist(name, key, span, default=None):
+
+    ensure_index("window_index")
+    table = WINDOW_INDEX.get("tables", {}).get(name)
+
+    if table is not None:
+        counts = table.counts(key, span)
+    elif store_ready():
+        # 지연 로드 저장소는 누적합 표 없음 → SQL 조회
+        cols, completed = WINDOW_TABLES[name]
+        counts = frame_counts(store_frame(dict(zip(cols, key)), completed=completed, window=span))
+    else:
+        counts = None
+
+    if counts is None or not counts[0]:
+        return default
+
+    return count_dist(counts)
+
+
+class WindowView:
+
+    # 점수 함수용: CountTable.get 과 같은 조회를 구간 누적합으로
+    def __init__(self, name, span):
+        self.name = name
+        self.span = span
+
+    def get(self, key, default=None):
+        return window_dist(self.name, key, self.span, default)
+
+
+def scoring_table(name, table, window):
+    return table if window is None else WindowView(name, window)
+
+
+def window_frame(window):
+
+    # 구간 행만: 년도/회차 정렬 데이터면 이분 탐색 슬라이스, 아니면 마스크
+    if window is None:
+        return CURRENT_DF
+
+    ensure_index("window_index")
+    if "period" not in WINDOW_INDEX:
+        return CURRENT_DF
+
+    period = WINDOW_INDEX["period"]
+
+    if WINDOW_INDEX["ordered"]:
+        lo = np.searchsorted(period, window[0], side="left")
+        hi = np.searchsorted(period, window[1], side="right")
+        return CURRENT_DF.iloc[lo:hi]
+
+    return CURRENT_DF[(period >= window[0]) & (period <= window[1])]
+
+
+def window_positions(positions, window):
+
+    if window is None or "period" not in WINDOW_INDEX:
+        return positions
+
+    period = WINDOW_INDEX["period"][positions]
+
+    return positions[(period >= window[0]) & (period <= window[1])]
+
+
+def window_query(window):
+    return f"&window={quote(window)}" if window else ""
+
+
+def window_label(window):
+    return f"<br>기간: {window}" if window else ""
+
+# =====================================================
+# SQLite 경기 저장소 (SECRETCORE_STORE=sqlite)
+# 경기 표 (pos = CURRENT_DF 행 위치) + 번호/팀/조건/배당 인덱스 + 집계 표
+# 상세/팀/배당 페이지 필터는 SQL 조회, 갱신은 임시 파일 생성 후 교체
+# =====================================================
+
+STORE_COLS = {
+    COL_NO: "match_no", COL_YEAR: "year", COL_ROUND: "round",
+    COL_MATCH: "game", COL_SPORT: "sport", COL_LEAGUE: "league",
+    COL_HOME: "home", COL_AWAY: "away",
+    COL_WIN_ODDS: "win_odds", COL_DRAW_ODDS: "draw_odds", COL_LOSE_ODDS: "lose_odds",
+    COL_GENERAL: "general", COL_HANDI: "handi", COL_RESULT: "result",
+    COL_TYPE: "type", COL_DIR: "dir", COL_HOMEAWAY: "homeaway"
+}
+
+STORE_NAMES = [STORE_COLS[i] for i in range(EXPECTED_COLS)]
+
+# 배당 구간 조회용 숫자 컬럼
+STORE_ODDS = {"win": "win_num", "draw": "draw_num", "lose": "lose_num"}
+
+STORE_INDEXES = {
+    "ix_matches_no":        "match_no",
+    "ix_matches_home":      "home, away, type",
+    "ix_matches_away":      "away, type",
+    "ix_matches_cond":      "type, homeaway, general, dir, handi, league",
+    "ix_matches_odds":      "type, win_odds, draw_odds, lose_odds",
+    "ix_matches_draw_odds": "type, draw_odds",
+    "ix_matches_lose_odds": "type, lose_odds",
+    "ix_matches_win_num":   "type, win_num",
+    "ix_matches_draw_num":  "type, draw_num",
+    "ix_matches_lose_num":  "type, lose_num",
+    "ix_matches_result":    "result"
+}
+
+# 집계 표 (FIVE_COND_DIST / LEAGUE_COND_DIST / ODDS_DIST_CACHE 와 같은 키 순서)
+STORE_AGGREGATES = {
+    "agg_five_cond":   (("type", "homeaway", "general", "dir", "handi"), False),
+    "agg_league_cond": (("league", "type", "homeaway", "general", "dir", "handi"), True),
+    "agg_odds":        (("win_odds", "draw_odds", "lose_odds"), False)
+}
+
+STORE_COMPLETED = "result IS NOT '경기전'"
+
+# 완료 경기 전체 순회 (백테스트) 시 한 번에 읽는 행 수
+STORE_CHUNK = 20000
+
+# 기간 키 (년도*10000+회차), 기간 구간 조회용
+STORE_PERIOD = "(CAST(year AS INTEGER) * 10000 + CAST(round AS INTEGER))"
+
+
+def store_ready():
+    return STORE_STATE["ready"]
+
+
+def store_connect(path=None):
+    return sqlite3.connect(path or STORE_PATH, check_same_thread=False)
+
+
+def store_signature():
+
+    # 원본 CSV 크기/수정시각 → 저장소가 최신인지 판단
+    if not os.path.exists(DATA_FILE):
+        return None
+
+    stat = os.stat(DATA_FILE)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def store_sync(df):
+
+    start = time.perf_counter()
+    tmp = STORE_PATH + ".tmp"
+
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = store_connect(tmp)
+
+    try:
+        columns = ", ".join(f"{name} TEXT" for name in STORE_NAMES)
+        numeric = ", ".join(f"{name} REAL" for name in STORE_ODDS.values())
+
+        conn.execute(f"CREATE TABLE matches (pos INTEGER PRIMARY KEY, {columns}, {numeric})")
+
+        odds = [
+            pd.to_numeric(df.iloc[:, col], errors="coerce").to_numpy(dtype=float)
+            for col in ODDS_COLS
+        ]
+
+        # NaN 은 SQLite 에서 NULL 로 저장
+        rows = zip(range(len(df)), *[df.iloc[:, i].tolist() for i in range(EXPECTED_COLS)], *odds)
+
+        conn.executemany(
+            f"INSERT INTO matches VALUES ({', '.join('?' * (EXPECTED_COLS + 4))})",
+            rows
+        )
+
+        for name, cols in STORE_INDEXES.items():
+            conn.execute(f"CREATE INDEX {name} ON matches ({cols})")
+
+        # 키/결과 NULL 행 제외 (cell_counts 와 동일)
+        for name, (cols, completed) in STORE_AGGREGATES.items():
+
+            keys = ", ".join(cols)
+            where = " AND ".join(f"{c} IS NOT NULL" for c in cols + ("result",))
+            if completed:
+                where += f" AND {STORE_COMPLETED}"
+
+            conn.execute(f"""
+                CREATE TABLE {name} AS
+                SELECT {keys}, COUNT(*) AS total,
+                    SUM(result = '승') AS win,
+                    SUM(result = '무') AS draw,
+                    SUM(result = '패') AS lose
+                FROM matches WHERE {where}
+                GROUP BY {keys}
+            """)
+            conn.execute(f"CREATE UNIQUE INDEX ix_{name} ON {name} ({keys})")
+
+        conn.execute("""
+            CREATE TABLE agg_league AS
+            SELECT league, COUNT(*) AS total FROM matches
+            WHERE league IS NOT NULL GROUP BY league
+        """)
+
+        conn.execute("CREATE TABLE store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO store_meta VALUES (?, ?)", [
+            ("columns", json.dumps([str(c) for c in df.columns], ensure_ascii=False)),
+            ("rows", str(len(df))),
+            ("source", store_signature() or "")
+        ])
+
+        conn.commit()
+
+    finally:
+        conn.close()
+
+    # 열린 조회 연결은 이전 파일을 계속 읽음 → 교체는 원자적
+    os.replace(tmp, STORE_PATH)
+
+    LOAD_SECONDS["store_sync"] = round(time.perf_counter() - start, 6)
+
+
+def store_meta():
+
+    if not os.path.exists(STORE_PATH):
+        return {}
+
+    conn = store_connect()
+    try:
+        return dict(conn.execute("SELECT key, value FROM store_meta"))
+    except sqlite3.DatabaseError:
+        return {}
+    finally:
+        conn.close()
+
+
+def store_mark_source():
+
+    conn = store_connect()
+    try:
+        conn.execute(
+            "UPDATE store_meta SET value = ? WHERE key = 'source'",
+            (store_signature() or "",)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def store_current():
+
+    # CSV 가 없으면 저장소만으로 시작
+    meta = store_meta()
+    signature = store_signature()
+
+    return bool(meta) and (signature is None or meta.get("source") == signature)
+
+
+def store_select(where, params=(), order="pos", limit=None):
+
+    sql = (
+        f"SELECT pos, {', '.join(STORE_NAMES)} FROM matches "
+        f"WHERE {where} ORDER BY {order}"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    conn = store_connect()
+    try:
+        frame = pd.read_sql_query(sql, conn, params=list(params), index_col="pos")
+    finally:
+        conn.close()
+
+    return store_rows(frame)
+
+
+def store_chunks(where, params=(), size=STORE_CHUNK):
+
+    # 행 순서대로 size 행씩 (전체 결과를 메모리에 올리지 않음)
+    sql = f"SELECT pos, {', '.join(STORE_NAMES)} FROM matches WHERE {where} ORDER BY pos"
+
+    conn = store_connect()
+    try:
+        for frame in pd.read_sql_query(
+            sql, conn, params=list(params), index_col="pos", chunksize=size
+        ):
+            yield store_rows(frame)
+    finally:
+        conn.close()
+
+
+def store_rows(frame):
+
+    # 인덱스 = CURRENT_DF 행 위치 (DIST_CACHE 키 동일), NULL → NaN
+    frame.columns = STORE_STATE["columns"] or STORE_NAMES
+    frame.index.name = None
+
+    return frame.astype(object).where(frame.notna(), np.nan)
+
+
+def store_frame(conditions, team=None, completed=True, window=None):
+
+    # conditions: {컬럼: 값 또는 값 목록} (목록은 isin, 빈 목록은 0건)
+    clauses = []
+    params = []
+
+    for col, value in conditions.items():
+        name = STORE_COLS[col]
+        if isinstance(value, (list, tuple, set)):
+            value = list(value)
+            clauses.append(f"{name} IN ({', '.join('?' * len(value))})")
+            params += value
+        else:
+            clauses.append(f"{name} = ?")
+            params.append(value)
+
+    if team is not None:
+        clauses.append("(home = ? OR away = ?)")
+        params += [team, team]
+
+    if completed:
+        clauses.append(STORE_COMPLETED)
+
+    if window is not None:
+        clauses.append(f"{STORE_PERIOD} BETWEEN ? AND ?")
+        params += list(window)
+
+    return store_select(" AND ".join(clauses) or "1", params)
+
+
+def store_band(type_val, side, low, high, window=None):
+
+    # odds_band 와 같은 범위/순서 (배당 오름차순, 같은 배당은 행 순서)
+    num = STORE_ODDS[side]
+    where = f"type = ? AND {num} BETWEEN ? AND ? AND {STORE_COMPLETED}"
+    params = [type_val, low - ODDS_EPS, high + ODDS_EPS]
+
+    if window is not None:
+        where += f" AND {STORE_PERIOD} BETWEEN ? AND ?"
+        params += list(window)
+
+    frame = store_select(where, params, order=f"{num}, pos")
+
+    return count_dist(frame_counts(frame)), frame
+
+
+def store_match(no):
+    frame = store_select("match_no = ?", (str(no),), limit=1)
+    return None if frame.empty else frame.iloc[0]
+
+
+def find_match(no):
+
+    # 경기 번호 → 행 (없으면 None), 지연 로드 모드는 완료 경기도 저장소에서 조회
+    if store_ready():
+        return store_match(no)
+
+    row_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_NO] == str(no)]
+    return None if row_df.empty else row_df.iloc[0]
+
+
+def frame_counts(frame):
+
+    result_col = frame.iloc[:, COL_RESULT].to_numpy()
+
+    return np.array([len(result_col)] + [
+        int(np.count_nonzero(result_col == label)) for label in RESULT_LABELS
+    ])
+
+
+def store_table(name):
+
+    cols, _ = STORE_AGGREGATES[name]
+
+    conn = store_connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(cols)}, total, win, draw, lose FROM {name}"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    n = len(cols)
+    counts = np.array([r[n:] for r in rows], dtype=np.int32).reshape(len(rows), 4)
+
+    return CountTable([tuple(map(intern_value, r[:n])) for r in rows], counts)
+
+
+def build_store_league_weight():
+
+    LEAGUE_COUNT.clear()
+    LEAGUE_WEIGHT.clear()
+
+    conn = store_connect()
+    try:
+        rows = conn.execute(
+            "SELECT league, total FROM agg_league ORDER BY total DESC, league"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for league, count in rows:
+        league = intern_value(league)
+        LEAGUE_COUNT[league] = count
+        LEAGUE_WEIGHT[league] = league_weight(count)
+
+
+def build_store_window_index():
+
+    global WINDOW_INDEX
+
+    # 지연 로드: 기간 목록만, 구간 분포는 SQL 조회 (window_dist)
+    conn = store_connect()
+    try:
+        rows = conn.execute(f"SELECT DISTINCT {STORE_PERIOD} FROM matches").fetchall()
+    finally:
+        conn.close()
+
+    WINDOW_INDEX = {
+        "periods": np.array(sorted(r[0] for r in rows if r[0] is not None), dtype=np.int64),
+        "tables": {}
+    }
+
+
+def load_store(df=None):
+
+    global CURRENT_DF
+
+    meta = store_meta()
+
+    STORE_STATE.update(
+        ready=True,
+        rows=int(meta.get("rows", 0)),
+        columns=json.loads(meta["columns"]),
+        lazy=not STORE_PRELOAD
+    )
+
+    start = time.perf_counter()
+
+    if STORE_PRELOAD:
+        CURRENT_DF = df if df is not None else encode_frame(store_select("1"))
+        LOAD_SECONDS["store"] = round(time.perf_counter() - start, 6)
+        rebuild_caches(CURRENT_DF)
+        return
+
+    # 지연 로드: 경기전 행만 메모리, 완료 경기는 SQL 조회
+    CURRENT_DF = encode_frame(store_select("result = '경기전'"))
+    LOAD_SECONDS["store"] = round(time.perf_counter() - start, 6)
+    rebuild_store_caches(CURRENT_DF)
+
+
+def rebuild_store_caches(df):
+
+    global DATA_VERSION, FIVE_COND_DIST, LEAGUE_COND_DIST, ODDS_DIST_CACHE
+    global CONDITION_CUBE, CONDITION_ROWS, ODDS_INDEX, SIMILAR_INDEX
+
+    start = time.perf_counter()
+
+    # 점수 집계는 저장소 집계 표에서, 전체 행이 필요한 인덱스는 생략 (SQL 조회로 대체)
+    FIVE_COND_DIST = timed(BUILD_SECONDS, "five_cond", store_table, "agg_five_cond")
+    LEAGUE_COND_DIST = timed(BUILD_SECONDS, "league_cond", store_table, "agg_league_cond")
+    ODDS_DIST_CACHE = timed(BUILD_SECONDS, "odds", store_table, "agg_odds")
+    timed(BUILD_SECONDS, "league_weight", build_store_league_weight)
+
+    CONDITION_CUBE = {}
+    CONDITION_ROWS = {}
+    ODDS_INDEX = {}
+    SIMILAR_INDEX = {}
+    STALE_INDEXES.clear()
+    timed(BUILD_SECONDS, "window_index", build_store_window_index)
+
+    timed(BUILD_SECONDS, "validation", build_validation, df)
+    timed(BUILD_SECONDS, "pick_index", build_pick_index, df)
+    timed(BUILD_SECONDS, "facet_index", build_facet_index)
+
+    BUILD_SECONDS["total"] = round(time.perf_counter() - start, 6)
+
+    DATA_VERSION += 1
+
+
+def store_status():
+
+    if STORE_BACKEND != "sqlite":
+        return {"backend": STORE_BACKEND}
+
+    return {
+        "backend": STORE_BACKEND,
+        "path": STORE_PATH,
+        "ready": STORE_STATE["ready"],
+        "rows": STORE_STATE["rows"],
+        "lazy": STORE_STATE["lazy"],
+        "bytes": os.path.getsize(STORE_PATH) if os.path.exists(STORE_PATH) else 0
+    }
+
+# =====================================================
+# 데이터 검증 (데이터 버전별 1회, 벡터 연산)
+# 배당 변환/범위, 결과 값 도메인, 번호 중복, 년도/회차 순서
+# 유형·조건 컬럼은 관측 어휘 (값별 건수) 로 보고, 허용 값은 설정한 컬럼만 검사
+# 고유값만 검사 후 코드로 펼침 → 행 수와 무관하게 문자열 검사 횟수 일정
+# =====================================================
+
+ODDS_RANGE = (1.0, 100.0)
+VALID_SAMPLES = 5
+VOCAB_TOP = 20
+
+DOMAIN_COLS = {
+    "result":   COL_RESULT,
+    "type":     COL_TYPE,
+    "general":  COL_GENERAL,
+    "handi":    COL_HANDI,
+    "dir":      COL_DIR,
+    "homeaway": COL_HOMEAWAY
+}
+
+# 기본 허용 값은 코드가 분기하는 결과 값만
+# (SECRETCORE_VALID_DOMAINS="type=일반|핸디1|핸디2,dir=정|역" 로 컬럼 추가)
+VALID_DOMAINS = {
+    "result": RESULT_LABELS + ("경기전",)
+}
+
+VALID_CHECKS = {
+    "odds_parse":   "배당 숫자 변환 실패",
+    "odds_range":   "배당 범위 밖 (집계 포함)",
+    "result":       "결과 값 도메인 밖",
+    "type":         "유형 값 도메인 밖",
+    "general":      "일반 값 도메인 밖",
+    "handi":        "핸디 값 도메인 밖",
+    "dir":          "정역 값 도메인 밖",
+    "homeaway":     "홈원정 값 도메인 밖",
+    "duplicate_no": "경기 번호 중복",
+    "year_round":   "년도/회차 숫자 변환 실패",
+    "order":        "년도/회차 순서 역행"
+}
+
+def numeric_values(series):
+
+    codes, uniques = pd.factorize(series)
+    values = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce")
+
+    return np.append(values.to_numpy(dtype=float), np.nan)[codes]
+
+
+def load_valid_domains():
+
+    spec = os.getenv("SECRETCORE_VALID_DOMAINS", "")
+
+    for part in spec.split(","):
+        if "=" in part:
+            name, values = part.split("=", 1)
+            if name.strip() in DOMAIN_COLS:
+                VALID_DOMAINS[name.strip()] = tuple(v.strip() for v in values.split("|"))
+
+
+load_valid_domains()
+
+
+def domain_mask(series, valid):
+
+    # valid: 허용 값 목록, NaN 은 항상 위반
+    codes, uniques = pd.factorize(series)
+    ok = pd.Series(uniques, dtype=object).isin(valid).to_numpy()
+
+    return ~np.append(ok, False)[codes]
+
+
+def observed_vocab(series):
+
+    counts = series.value_counts()
+    counts = counts[counts > 0]
+
+    return {
+        "distinct": len(counts),
+        "missing": int(series.isna().sum()),
+        "top": {str(k): int(v) for k, v in counts.head(VOCAB_TOP).items()}
+    }
+
+
+def odds_flags(df, numeric=None):
+
+    # 반환: (변환 실패, 범위 밖) 행 마스크
+    numeric = numeric or {col: numeric_values(df.iloc[:, col]) for col in ODDS_COLS}
+    values = np.column_stack([numeric[col] for col in ODDS_COLS])
+
+    unparsed = np.isnan(values).any(axis=1)
+    with np.errstate(invalid="ignore"):
+        outside = ((values < ODDS_RANGE[0]) | (values > ODDS_RANGE[1])).any(axis=1)
+
+    return unparsed, outside & ~unparsed
+
+
+def order_flags(df):
+
+    year = numeric_values(df.iloc[:, COL_YEAR])
+    rnd = numeric_values(df.iloc[:, COL_ROUND])
+
+    key = year * 10000 + rnd
+    unparsed = np.isnan(key)
+
+    # 바로 앞 행의 (년도, 회차) 보다 작으면 역행 (튀는 값 1건이 뒤 전체를 표시하지 않도록)
+    prev = np.concatenate(([-np.inf], key[:-1]))
+    with np.errstate(invalid="ignore"):
+        behind = key < prev
+
+    return unparsed, behind
+
+
+def sample_rows(df, mask):
+
+    rows = []
+    for pos in np.flatnonzero(mask)[:VALID_SAMPLES]:
+        values = df.iloc[pos].tolist()
+        rows.append({
+            "row": int(pos),
+            "values": [None if pd.isna(v) else v for v in values]
+        })
+
+    return rows
+
+
+def build_validation(df, codes=None):
+
+    global VALIDATION, BAD_ODDS
+
+    if df.empty:
+        VALIDATION = {}
+        BAD_ODDS = frozenset()
+        return
+
+    start = time.perf_counter()
+    scope = "경기전" if STORE_STATE["lazy"] else "전체"
+
+    if df.shape[1] != EXPECTED_COLS:
+        VALIDATION = {
+            "rows": len(df),
+            "scope": scope,
+            "issues": [f"컬럼 수 불일치: {df.shape[1]} / 기대값 {EXPECTED_COLS}"],
+            "checks": {},
+            "bad_odds_rows": 0
+        }
+        BAD_ODDS = frozenset()
+        return
+
+    masks = {}
+    masks["odds_parse"], masks["odds_range"] = odds_flags(
+        df, codes["numeric"] if codes else None
+    )
+
+    for name, valid in VALID_DOMAINS.items():
+        masks[name] = domain_mask(df.iloc[:, DOMAIN_COLS[name]], valid)
+
+    masks["duplicate_no"] = df.iloc[:, COL_NO].duplicated(keep=False).to_numpy()
+    masks["year_round"], masks["order"] = order_flags(df)
+
+    checks = {
+        name: {
+            "label": VALID_CHECKS[name],
+            "count": int(mask.sum()),
+            "samples": sample_rows(df, mask)
+        }
+        for name, mask in masks.items()
+    }
+
+    # 변환 불가 배당 행만 점수 계산 경로에서 생략 (safe_ev / completed_chunks)
+    # 범위 밖 배당은 보고만 (시뮬레이션 합계는 검증 도입 전과 동일)
+    bad_odds = masks["odds_parse"]
+    BAD_ODDS = frozenset(zip(*[
+        df.iloc[:, col].to_numpy()[bad_odds] for col in ODDS_COLS
+    ]))
+
+    VALIDATION = {
+        "rows": len(df),
+        "scope": scope,
+        "issues": [
+            f"{check['label']} {check['count']}건"
+            for check in checks.values() if check["count"]
+        ],
+        "checks": checks,
+        "vocabulary": {
+            name: observed_vocab(df.iloc[:, col])
+            for name, col in DOMAIN_COLS.items() if name not in VALID_DOMAINS
+        },
+        "bad_odds_rows": int(bad_odds.sum()),
+        "bad_odds": bad_odds,
+        "seconds": round(time.perf_counter() - start, 6)
+    }
+
+# =====================================================
+# 집계 캐시 재생성
+# =====================================================
+
+# 행 위치 기반 인덱스: 증분 업로드 후에는 첫 조회 때 현재 데이터로 재생성
+STALE_INDEXES = set()
+INDEX_LOCK = threading.Lock()
+
+def ensure_index(name):
+
+    if name in STALE_INDEXES:
+        with INDEX_LOCK:
+            if name in STALE_INDEXES:
+                timed(BUILD_SECONDS, name, AGG_BUILDERS[name], CURRENT_DF)
+                STALE_INDEXES.discard(name)
+
+
+AGG_BUILDERS = {
+    "five_cond": build_five_cond_cache,
+    "league_weight": build_league_weight,
+    "odds": build_odds_cache,
+    "condition_cube": build_condition_cube,
+    "odds_index": build_odds_index,
+    "similar_index": build_similar_index,
+    "window_index": build_window_index,
+    "condition_rows": build_condition_rows
+}
+
+def rebuild_caches(df, names=None):
+
+    # names: 다시 만들 집계만 지정 (증분 업로드), 점수/패싯 인덱스는 항상 재생성
+    global DATA_VERSION
+
+    start = time.perf_counter()
+    codes = None
+
+    builders = {
+        name: fn for name, fn in AGG_BUILDERS.items()
+        if names is None or name in names
+    }
+
+    if builders:
+
+        codes = timed(BUILD_SECONDS, "codes", frame_codes, df)
+
+        # 코드 공유 집계는 서로 독립 → 스레드 병렬 (numpy 정렬/집계는 GIL 해제)
+        with ThreadPoolExecutor(AGG_THREADS) as pool:
+            futures = [
+                pool.submit(timed, BUILD_SECONDS, name, fn, df, codes)
+                for name, fn in builders.items()
+            ]
+            for future in futures:
+                future.result()
+
+        STALE_INDEXES.difference_update(builders)
+
+    # 점수 인덱스는 5조건/배당 표 + 배당 검증 결과 사용 → 이후 순차
+    timed(BUILD_SECONDS, "validation", build_validation, df, codes)
+    timed(BUILD_SECONDS, "pick_index", build_pick_index, df)
+    timed(BUILD_SECONDS, "facet_index", build_facet_index)
+
+    BUILD_SECONDS["total"] = round(time.perf_counter() - start, 6)
+
+    DATA_VERSION += 1
+
+# =====================================================
+# 페이지네이션 (cursor = "버전:오프셋")
+# =====================================================
+
+def sorted_positions(cache_key, positions_fn, sort, order):
+
+    key = (DATA_VERSION, cache_key, sort, order)
+
+    if key in PAGE_CACHE:
+        return PAGE_CACHE[key]
+
+    mask = np.zeros(len(PICK_INDEX["rows"]), dtype=bool)
+    mask[positions_fn()] = True
+
+    ordered = PICK_INDEX["order"][sort]
+    ordered = ordered[mask[ordered]]
+
+    if order == "asc" and sort in ("confidence", "ev", "sample"):
+        ordered = ordered[::-1]
+    elif order == "desc" and sort in ("row", "no"):
+        ordered = ordered[::-1]
+
+    if len(PAGE_CACHE) >= PAGE_CACHE_MAX:
+        PAGE_CACHE.clear()
+
+    PAGE_CACHE[key] = ordered
+    return ordered
+
+
+def paginate(cache_key, positions_fn, make_item, sort, order, limit, cursor):
+
+    if sort not in SORT_KEYS:
+        return {"error": f"sort 값 오류: {sort} (가능: {', '.join(SORT_KEYS)})"}
+
+    if order is not None and order not in ORDER_KEYS:
+        return {"error": f"order 값 오류: {order} (가능: {', '.join(ORDER_KEYS)})"}
+
+    if limit is not None and not 1 <= limit <= PAGE_LIMIT_MAX:
+        return {"error": f"limit 값 오류: {limit} (가능: 1~{PAGE_LIMIT_MAX})"}
+
+    offset = 0
+
+    if cursor:
+        try:
+            version, offset = map(int, cursor.split(":"))
+        except ValueError:
+            return {"error": "cursor 형식 오류"}
+
+        if offset < 0:
+            return {"error": "cursor 형식 오류"}
+
+        if version != DATA_VERSION:
+            return {"error": "cursor 만료 (데이터 갱신됨)"}
+
+    ordered = sorted_positions(cache_key, positions_fn, sort, order)
+
+    end = len(ordered) if limit is None else offset + limit
+    page = ordered[offset:end]
+
+    next_cursor = f"{DATA_VERSION}:{end}" if end < len(ordered) else None
+
+    return {
+        "items": [make_item(i) for i in page],
+        "total": int(len(ordered)),
+        "count": int(len(page)),
+        "sort": sort,
+        "next_cursor": next_cursor,
+        "version": DATA_VERSION
+    }
+
+# =====================================================
+# 동일 요청 합치기 (single-flight)
+# 같은 엔드포인트 + 파라미터 + 데이터 버전의 동시 요청은 한 번만 계산하고
+# 나머지는 완료를 기다렸다가 같은 결과를 공유
+# =====================================================
+
+def single_flight(name, key, fn):
+
+    with INFLIGHT_LOCK:
+        stats = COALESCE_STATS.setdefault(name, {"leader": 0, "follower": 0, "timeout": 0})
+        call = INFLIGHT.get(key)
+        leader = call is None
+        if leader:
+            call = {"event": threading.Event(), "result": None, "error": None}
+            INFLIGHT[key] = call
+            stats["leader"] += 1
+        else:
+            stats["follower"] += 1
+
+    if not leader:
+        # 리더가 멈추면 대기 제한 후 직접 계산
+        if not call["event"].wait(COALESCE_WAIT):
+            with INFLIGHT_LOCK:
+                stats["timeout"] += 1
+            return fn()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+    try:
+        call["result"] = fn()
+    except Exception as exc:
+        call["error"] = exc
+        raise
+    finally:
+        with INFLIGHT_LOCK:
+            INFLIGHT.pop(key, None)
+        call["event"].set()
+
+    return call["result"]
+
+
+def coalesce(name):
+
+    def decorator(fn):
+
+        @functools.wraps(fn)
+        def wrapper(**kwargs):
+            key = (name, tuple(sorted(kwargs.items())), DATA_VERSION)
+            return single_flight(name, key, lambda: fn(**kwargs))
+
+        return wrapper
+
+    return decorator
+
+# =====================================================
+# 로그인
+# =====================================================
+
+@app.post("/login")
+def login(username: str = Form(...), password: str = Form(...)):
+    global LOGGED_IN
+
+    if username == "ryan" and password == "963258":
+        LOGGED_IN = True
+
+    return RedirectResponse("/", status_code=302)
+
+
+@app.get("/logout")
+def logout():
+    global LOGGED_IN
+    LOGGED_IN = False
+    return RedirectResponse("/", status_code=302)
+
+
+@app.get("/auth-status")
+def auth_status():
+    return {"logged_in": LOGGED_IN}
+
+# =====================================================
+# 업로드 페이지
+# =====================================================
+
+@app.get("/page-upload", response_class=HTMLResponse)
+def page_upload():
+
+    if not LOGGED_IN:
+        return RedirectResponse("/", status_code=302)
+
+    return """
+<html>
+<body style='background:#0f1720;color:white;padding:30px;font-family:Arial;'>
+<h2>📤 업로드</h2>
+<form action="/upload-data" method="post" enctype="multipart/form-data">
+    <input type="file" name="file" required><br><br>
+    <button type="submit">업로드 실행</button>
+</form>
+<br>
+<button onclick="history.back()">← 뒤로</button>
+</body>
+</html>
+"""
+
+# =====================================================
+# 업로드 처리
+# =====================================================
+
+@app.post("/upload-data")
+def upload(file: UploadFile = File(...)):
+
+    global CURRENT_DF
+
+    start = time.perf_counter()
+
+    # 1차: 청크 단위 해시 → 직전 업로드와 같은 파일이면 파싱 없이 종료
+    digest = stream_digest(file.file)
+
+    if digest == UPLOAD_STATE["digest"] and not CURRENT_DF.empty:
+        return upload_response(start, {"mode": "identical", "inserted": 0, "removed": 0, "changed": 0})
+
+    df = pd.read_csv(
+        file.file,
+        encoding="utf-8-sig",
+        dtype=str,
+        low_memory=False
+    )
+
+    LOAD_SECONDS["upload"] = round(time.perf_counter() - start, 6)
+
+    if df.shape[1] != EXPECTED_COLS:
+        return {
+            "error": f"컬럼 불일치: {df.shape[1]} / 기대값 {EXPECTED_COLS}"
+        }
+
+    df = encode_frame(df)
+    hashes = row_hashes(df)
+    diff = upload_diff(df, hashes)
+
+    UPLOAD_STATE["digest"] = digest
+    UPLOAD_STATE["hashes"] = hashes
+
+    if diff["mode"] == "identical":
+        return upload_response(start, diff)
+
+    # SQLite 저장소 재생성 + 교체는 저장 스레드에서 (완료 전까지 이전 버전으로 응답)
+    if STORE_BACKEND == "sqlite":
+        schedule_persist(df, sync=True)
+        diff["store"] = "queued"
+        return upload_response(start, diff)
+
+    DIST_CACHE.clear()
+    SECRET_CACHE.clear()
+
+    if diff["mode"] == "incremental":
+        apply_upload_delta(df, diff)
+    else:
+        CURRENT_DF = df
+        rebuild_caches(CURRENT_DF)
+
+    # CSV 저장은 응답 후 백그라운드 (진행 상태는 /health)
+    schedule_persist(df)
+    start_prerender()
+
+    return upload_response(start, diff)
+
+# =====================================================
+# 업로드 변경분 (파일 해시 / 경기번호별 행 해시 diff / 증분 집계)
+# 같은 파일 → 무변경, 일부 행만 다르면 변경 행의 W/D/L 만 집계 표에 가감
+# 행 위치 기반 인덱스 (배당 구간 / 유사 배당) 와 점수 인덱스는 재생성
+# =====================================================
+
+# 증분 적용 상한 (변경 행 비율), 초과 시 전체 재집계
+UPLOAD_DELTA_MAX = 0.1
+
+UPLOAD_STATE = {"digest": None, "hashes": None, "last": None}
+
+
+def stream_digest(raw):
+
+    digest = hashlib.sha256()
+
+    for chunk in iter(lambda: raw.read(1024 * 1024), b""):
+        digest.update(chunk)
+
+    raw.seek(0)
+    return digest.hexdigest()
+
+
+def row_hashes(df):
+    return pd.Series(
+        pd.util.hash_pandas_object(df, index=False).to_numpy(),
+        index=df.iloc[:, COL_NO].to_numpy()
+    )
+
+
+def upload_diff(df, hashes):
+
+    old = UPLOAD_STATE["hashes"]
+
+    # 시작 후 첫 업로드는 현재 데이터에서 계산
+    if old is None and not CURRENT_DF.empty:
+        old = row_hashes(CURRENT_DF)
+
+    if (
+        old is None or
+        not old.index.is_unique or
+        not hashes.index.is_unique or
+        list(df.columns) != list(CURRENT_DF.columns)
+    ):
+        return {"mode": "full", "inserted": len(df), "removed": 0, "changed": 0}
+
+    common = hashes.index.intersection(old.index)
+
+    inserted = hashes.index.difference(old.index)
+    removed = old.index.difference(hashes.index)
+    changed = common[hashes[common].to_numpy() != old[common].to_numpy()]
+
+    diff = {
+        "inserted": len(inserted),
+        "removed": len(removed),
+        "changed": len(changed),
+        "inserted_no": inserted,
+        "removed_no": removed,
+        "changed_no": changed
+    }
+
+    touched = len(inserted) + len(removed) + len(changed)
+
+    if touched == 0 and hashes.index.equals(old.index):
+        diff["mode"] = "identical"
+    elif STORE_BACKEND != "sqlite" and touched <= UPLOAD_DELTA_MAX * max(len(df), len(old)):
+        diff["mode"] = "incremental"
+    else:
+        diff["mode"] = "full"
+
+    return diff
+
+
+def delta_counts(old_rows, new_rows, cols, completed_only=False, keep_missing=False):
+
+    # 키 → [총, 승, 무, 패] 증감 (cell_counts 와 같은 NaN/경기전 제외 규칙)
+    delta = {}
+
+    for sign, rows in ((-1, old_rows), (1, new_rows)):
+
+        keys = zip(*[rows.iloc[:, c].tolist() for c in cols])
+
+        for key, result in zip(keys, rows.iloc[:, COL_RESULT].tolist()):
+
+            if pd.isna(result):
+                continue
+            if keep_missing:
+                key = tuple(None if pd.isna(k) else k for k in key)
+            elif any(pd.isna(k) for k in key):
+                continue
+            if completed_only and result == "경기전":
+                continue
+
+            counts = delta.setdefault(key, np.zeros(4, dtype=np.int64))
+            counts[0] += sign
+            if result in RESULT_LABELS:
+                counts[RESULT_LABELS.index(result) + 1] += sign
+
+    return delta
+
+
+def apply_delta(table, delta):
+
+    # 새 표를 만들어 교체 (읽는 쪽은 이전 표를 그대로 사용)
+    delta = {key: change for key, change in delta.items() if change.any()}
+
+    if not delta:
+        return table
+
+    counts = table.counts.astype(np.int64)
+    added = []
+
+    for key, change in delta.items():
+        slot = table.slots.get(key)
+        if slot is None:
+            added.append((key, change))
+        else:
+            counts[slot] += change
+
+    if added:
+        counts = np.vstack([counts, np.array([c for _, c in added], dtype=np.int64)])
+
+    keep = counts[:, 0] > 0
+
+    # 0건 키는 전체 재집계와 같게 제거 → 이때만 slot 해시 재생성
+    if not keep.all():
+        keys = [k for k, alive in zip(list(table.slots) + [k for k, _ in added], keep) if alive]
+        return CountTable(keys, counts[keep].astype(np.int32))
+
+    # 새 키는 slot 해시 복사본 뒤에 추가, 없으면 그대로 공유
+    slots = None
+    if added:
+        slots = dict(table.slots)
+        for key, _ in added:
+            slots[key] = len(slots)
+
+    return table.replaced(counts.astype(np.int32), slots)
+
+
+def apply_upload_delta(df, diff):
+
+    global CURRENT_DF, FIVE_COND_DIST, LEAGUE_COND_DIST, ODDS_DIST_CACHE, CONDITION_CUBE
+
+    start = time.perf_counter()
+
+    old_no = CURRENT_DF.iloc[:, COL_NO]
+    new_no = df.iloc[:, COL_NO]
+
+    old_rows = CURRENT_DF[old_no.isin(diff["removed_no"].union(diff["changed_no"]))]
+    new_rows = df[new_no.isin(diff["inserted_no"].union(diff["changed_no"]))]
+
+    five_cols = (COL_TYPE, COL_HOMEAWAY, COL_GENERAL, COL_DIR, COL_HANDI)
+
+    FIVE_COND_DIST = apply_delta(
+        FIVE_COND_DIST, delta_counts(old_rows, new_rows, five_cols)
+    )
+    LEAGUE_COND_DIST = apply_delta(
+        LEAGUE_COND_DIST,
+        delta_counts(old_rows, new_rows, (COL_LEAGUE,) + five_cols, completed_only=True)
+    )
+    ODDS_DIST_CACHE = apply_delta(
+        ODDS_DIST_CACHE, delta_counts(old_rows, new_rows, ODDS_COLS)
+    )
+
+    # 리그 건수 (결과 무관, 리그 NaN 제외) → 건수 내림차순 재정렬
+    counts = Counter(LEAGUE_COUNT)
+    counts.subtract(old_rows.iloc[:, COL_LEAGUE].dropna().tolist())
+    counts.update(new_rows.iloc[:, COL_LEAGUE].dropna().tolist())
+
+    LEAGUE_COUNT.clear()
+    LEAGUE_WEIGHT.clear()
+
+    for league, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])):
+        if count > 0:
+            LEAGUE_COUNT[league] = count
+            LEAGUE_WEIGHT[league] = league_weight(count)
+
+    # 큐브: 가장 세밀한 셀 증감을 부분집합별로 합산 (예산 제외 부분집합은 그대로 스캔)
+    # NaN(None) 키는 그 컬럼을 포함하는 부분집합에서만 제외 (build_condition_cube 와 동일)
+    if CONDITION_CUBE:
+
+        finest = delta_counts(
+            old_rows, new_rows, CUBE_DIMS, completed_only=True, keep_missing=True
+        )
+        keys = list(finest)
+        changes = np.array(list(finest.values()), dtype=np.int64).reshape(len(keys), 4)
+        tables = {}
+
+        for cols, table in CONDITION_CUBE["tables"].items():
+
+            idx = [CUBE_DIMS.index(c) for c in cols]
+            cells = {}
+            inv = []
+            rows = []
+
+            for row, key in enumerate(keys):
+                cell = tuple(key[i] for i in idx)
+                if None in cell:
+                    continue
+                inv.append(cells.setdefault(cell, len(cells)))
+                rows.append(row)
+
+            summed = np.zeros((len(cells), 4), dtype=np.int64)
+            np.add.at(summed, inv, changes[rows])
+
+            tables[cols] = apply_delta(table, dict(zip(cells, summed)))
+
+        CONDITION_CUBE = {
+            "tables": tables,
+            "skipped": CONDITION_CUBE["skipped"],
+            "cells": sum(len(t) for t in tables.values()),
+            "bytes": sum(t.nbytes() for t in tables.values())
+        }
+
+    # 행 위치 기반 인덱스는 교체와 함께 무효화 → 첫 조회 때 재생성
+    with INDEX_LOCK:
+        STALE_INDEXES.update(("odds_index", "similar_index", "window_index", "condition_rows"))
+        CURRENT_DF = df
+
+    BUILD_SECONDS["delta"] = round(time.perf_counter() - start, 6)
+
+    # 점수/패싯 인덱스만 재생성 (버전 증가 포함)
+    rebuild_caches(df, names=())
+
+
+def upload_response(start, diff):
+
+    summary = {
+        key: diff[key] for key in ("mode", "inserted", "removed", "changed")
+    }
+    summary["rows"] = len(CURRENT_DF)
+    summary["version"] = DATA_VERSION
+    summary["seconds"] = round(time.perf_counter() - start, 6)
+
+    if "store" in diff:
+        summary["store"] = diff["store"]
+
+    UPLOAD_STATE["last"] = summary
+
+    # 폼 업로드는 기존대로 메인으로 이동, 변경 요약은 헤더 + /health
+    response = RedirectResponse("/", status_code=302)
+    response.headers["X-Upload-Diff"] = json.dumps(summary)
+
+    return response
+
+# =====================================================
+# 쓰기 지연 저장 (write-behind)
+# 단일 스레드 순차 기록, 대기 중 더 최신 업로드가 있으면 이전 버전은 생략
+# sqlite: 저장소 재생성 → 캐시 교체 → 사전 렌더링 시작 후 CSV 기록 (업로드 응답과 분리)
+# DATA_FILE 은 임시 파일 fsync 후 os.replace → 중간 실패 시에도 이전 파일 유지
+# 스냅샷: BACKUP_FILE 이름 + 시각/버전 .gz, 최근 BACKUP_KEEP 개만 보관
+# =====================================================
+
+def schedule_persist(df, sync=False):
+
+    global PERSIST_POOL
+
+    with PERSIST_LOCK:
+        PERSIST["seq"] += 1
+        PERSIST["pending"] = DATA_VERSION
+        if PERSIST["status"] != "writing":
+            PERSIST["status"] = "queued"
+
+        if PERSIST_POOL is None:
+            PERSIST_POOL = ThreadPoolExecutor(1, thread_name_prefix="persist")
+
+        seq = PERSIST["seq"]
+
+    PERSIST_POOL.submit(persist_data, df, DATA_VERSION, seq, sync)
+
+
+def snapshot_files():
+
+    folder = os.path.dirname(BACKUP_FILE) or "."
+    stem, ext = os.path.splitext(os.path.basename(BACKUP_FILE))
+
+    return sorted(
+        os.path.join(folder, name) for name in os.listdir(folder)
+        if name.startswith(f"{stem}_") and name.endswith(f"{ext}.gz")
+    )
+
+
+def write_snapshot(version):
+
+    stem, ext = os.path.splitext(BACKUP_FILE)
+    path = f"{stem}_{time.strftime('%Y%m%d-%H%M%S')}-v{version:06d}{ext}.gz"
+    tmp = path + ".tmp"
+
+    with open(DATA_FILE, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    os.replace(tmp, path)
+
+    for old in snapshot_files()[:-BACKUP_KEEP or None]:
+        os.remove(old)
+
+    return path
+
+
+def persist_data(df, version, seq, sync=False):
+
+    with PERSIST_LOCK:
+        if seq != PERSIST["seq"]:
+            return
+        PERSIST["status"] = "writing"
+
+    start = time.perf_counter()
+    tmp = DATA_FILE + ".tmp"
+
+    try:
+        if sync:
+            store_sync(df)
+            DIST_CACHE.clear()
+            SECRET_CACHE.clear()
+            load_store(df)
+            start_prerender()
+            version = DATA_VERSION
+
+        with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, DATA_FILE)
+        snapshot = write_snapshot(version) if BACKUP_KEEP > 0 else None
+
+        # 저장소 원본 서명 갱신 (재시작 시 CSV 재동기화 생략)
+        if store_ready():
+            store_mark_source()
+
+    except Exception as e:
+        logging.error(f"[PERSIST] v{version} 저장 실패: {e}")
+        with PERSIST_LOCK:
+            PERSIST.update(status="error", error=str(e))
+        return
+
+    with PERSIST_LOCK:
+        PERSIST.update(
+            status="idle" if PERSIST["seq"] == seq else "queued",
+            written=version,
+            seconds=round(time.perf_counter() - start, 6),
+            bytes=os.path.getsize(DATA_FILE),
+            snapshot=snapshot,
+            error=None
+        )
+
+
+def persist_status():
+
+    with PERSIST_LOCK:
+        status = dict(PERSIST)
+
+    status["snapshots"] = len(snapshot_files())
+    return status
+
+
+def flush_persist():
+    if PERSIST_POOL is not None:
+        PERSIST_POOL.shutdown(wait=True)
+
+# =====================================================
+# Health Check
+# =====================================================
+
+def self_check():
+
+    report = {}
+
+    report["data_loaded"] = not CURRENT_DF.empty
+    report["rows"] = len(CURRENT_DF)
+
+    report["column_count_ok"] = (
+        CURRENT_DF.shape[1] == EXPECTED_COLS
+        if not CURRENT_DF.empty else False
+    )
+
+    try:
+        _ = CURRENT_DF.iloc[:, COL_NO]
+        _ = CURRENT_DF.iloc[:, COL_TYPE]
+        report["index_access_ok"] = True
+    except:
+        report["index_access_ok"] = False
+
+    report["dist_cache_size"] = len(DIST_CACHE)
+    report["secret_cache_size"] = len(SECRET_CACHE)
+    report["expected_cols"] = EXPECTED_COLS
+
+    return report
+
+
+@app.get("/health")
+def health():
+    return {
+        "self_check": self_check(),
+        "persist": persist_status(),
+        "upload": UPLOAD_STATE["last"]
+    }
+
+# =====================================================
+# 필터 값 추출 API
+# =====================================================
+
+@app.get("/filters")
+@coalesce("filters")
+def filters(
+    type: str = None,
+    homeaway: str = None,
+    general: str = None,
+    dir: str = None,
+    handi: str = None
+):
+
+    if CURRENT_DF.empty or not FACET_INDEX:
+        return {}
+
+    result = {
+        name: list(bitmaps.keys())
+        for name, bitmaps in FACET_INDEX["facets"].items()
+    }
+
+    selection = {
+        "type": type, "homeaway": homeaway, "general": general,
+        "dir": dir, "handi": handi
+    }
+
+    if any(selection.values()):
+        result.update(facet_counts(selection))
+    else:
+        result.update(FACET_INDEX["default"])
+
+    return result
+
+# =====================================================
+# 경기목록 API
+# =====================================================
+
+def match_item(i):
+
+    row = PICK_INDEX["rows"][i]
+    sec = PICK_INDEX["sec"][i]
+    brain = PICK_INDEX["brain"][i]
+
+    is_secret = bool(
+        sec["score"] > 0.05 and
+        sec["sample"] >= 20 and
+        sec["추천"] != "없음"
+    )
+
+    return {
+        "row": list(map(str, row)),
+        "secret": is_secret,
+        "pick": sec["추천"] if is_secret else "",
+        "sp_pick": brain["추천"],
+        "confidence": brain["confidence"]
+    }
+
+
+@app.get("/matches")
+@coalesce("matches")
+def matches(
+    type: str = None,
+    homeaway: str = None,
+    general: str = None,
+    dir: str = None,
+    handi: str = None,
+    limit: int = None,
+    cursor: str = None,
+    sort: str = None,
+    order: str = None
+):
+
+    if CURRENT_DF.empty or not PICK_INDEX:
+        return []
+
+    def positions():
+        return np.flatnonzero(selection_mask({
+            "type": type, "homeaway": homeaway, "general": general,
+            "dir": dir, "handi": handi
+        }))
+
+    # 페이지 파라미터가 없으면 기존 전체 목록 응답 유지
+    if limit is None and cursor is None and sort is None:
+        return [match_item(i) for i in positions()]
+
+    return paginate(
+        ("matches", type, homeaway, general, dir, handi),
+        positions, match_item, sort or "row", order, limit, cursor
+    )
+
+@app.get("/", response_class=HTMLResponse)
+def home():
+
+    if not LOGGED_IN:
+        return """
+<html>
+<body style="background:#0f1720;color:white;
+display:flex;justify-content:center;
+align-items:center;height:100vh;">
+<form action="/login" method="post">
+<h2>Login</h2>
+<input name="username"><br><br>
+<input name="password" type="password"><br><br>
+<button type="submit">로그인</button>
+</form>
+</body>
+</html>
+"""
+
+    return """
+<html>
+<head>
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<style>
+body{background:#0f1720;color:white;font-family:Arial;margin:0;}
+.header{
+display:flex;justify-content:space-between;align-items:center;
+padding:14px 18px;background:#111827;position:sticky;top:0;z-index:50;
+}
+.logo{font-weight:700;font-size:18px;color:#38bdf8;}
+.top-icons{display:flex;gap:18px;font-size:18px;cursor:pointer;}
+.card{
+background:#1e293b;margin:14px;padding:18px;
+border-radius:18px;position:relative;
+box-shadow:0 4px 12px rgba(0,0,0,0.3);
+}
+.info-btn{position:absolute;right:14px;top:12px;font-size:12px;}
+.bottom-nav{
+position:fixed;bottom:0;width:100%;
+background:#111827;display:flex;
+justify-content:space-around;padding:12px 0;font-size:20px;
+}
+.modal{
+display:none;position:fixed;top:0;left:0;width:100%;height:100%;
+background:rgba(0,0,0,0.6);justify-content:center;align-items:center;
+}
+.modal-content{
+background:#1e293b;padding:20px;border-radius:16px;
+width:340px;max-height:80vh;overflow:auto;
+}
+.checkbox-group{margin-bottom:12px;}
+.secret-badge{
+position:absolute;right:18px;top:50%;
+transform:translateY(-50%);
+background:#22c55e;color:#0f1720;
+padding:8px 12px;border-radius:14px;
+font-size:12px;font-weight:bold;
+box-shadow:0 4px 10px rgba(0,0,0,0.4);
+}
+</style>
+</head>
+
+<body>
+
+<div class="header">
+<div class="logo">SecretCore PRO</div>
+<div class="top-icons">
+<div onclick="resetFilters()">🔄</div>
+<div onclick="openModal()">🔍</div>
+<div onclick="location.href='/page-upload'">📤</div>
+<div onclick="location.href='/logout'">👤</div>
+</div>
+</div>
+
+<div id="conditionBar"
+style="padding:8px 16px;font-size:12px;
+opacity:0.8;border-bottom:1px solid #1e293b;">
+기본조건
+</div>
+
+<div id="list" style="padding-bottom:100px;"></div>
+
+<div class="bottom-nav">
+<a href="/strategy1-view">🧠</a>
+<a href="/strategy2-view">🎯</a>
+<a href="/history">📊</a>
+<a href="/evaluate">🧪</a>
+</div>
+
+<div class="modal" id="filterModal">
+<div class="modal-content">
+<h3>필터</h3>
+<div id="filterArea"></div>
+<button onclick="applyFilters()">적용</button>
+<button onclick="closeModal()">닫기</button>
+</div>
+</div>
+
+<script>
+
+function resetFilters(){ window.location.href="/"; }
+
+function openModal(){
+document.getElementById("filterModal").style.display="flex";
+loadFilters();
+}
+
+function closeModal(){
+document.getElementById("filterModal").style.display="none";
+}
+
+const FILTER_KEYS = ["type","homeaway","general","dir","handi"];
+
+function selectedParams(){
+
+    let params = new URLSearchParams();
+
+    FILTER_KEYS.forEach(key=>{
+
+        let checked = Array.from(
+            document.querySelectorAll(`input[name="${key}"]:checked`)
+        ).map(el=>el.value);
+
+        if(checked.length>0){
+            params.set(key, checked.join(","));
+        }
+    });
+
+    return params;
+}
+
+function renderCounts(data){
+    document.querySelectorAll(".facet-count").forEach(el=>{
+        let c = (data.counts[el.dataset.key] || {})[el.dataset.value] || 0;
+        el.innerText = `(${c})`;
+    });
+}
+
+// 체크 변경 시 현재 선택 기준 건수만 갱신
+async function refreshCounts(){
+    let res = await fetch("/filters?" + selectedParams().toString());
+    renderCounts(await res.json());
+}
+
+async function loadFilters(){
+
+    let current = new URLSearchParams(window.location.search);
+    let res = await fetch("/filters?" + current.toString());
+    let data = await res.json();
+
+    let area = document.getElementById("filterArea");
+    area.innerHTML = "";
+
+    function createGroup(title, key){
+        if(!data[key] || data[key].length===0) return;
+
+        let div = document.createElement("div");
+        div.className="checkbox-group";
+
+        let selected = (current.get(key) || "").split(",");
+
+        let html = `<b>${title}</b><br>`;
+        data[key].forEach(v=>{
+            html += `
+            <label style="display:block;font-size:13px;">
+            <input type="checkbox" name="${key}" value="${v}"
+            ${selected.includes(v) ? "checked" : ""} onchange="refreshCounts()">
+            ${v} <span class="facet-count" data-key="${key}" data-value="${v}"></span>
+            </label>`;
+        });
+
+        div.innerHTML = html;
+        area.appendChild(div);
+    }
+
+    createGroup("유형","type");
+    createGroup("홈/원정","homeaway");
+    createGroup("일반","general");
+    createGroup("정역","dir");
+    createGroup("핸디","handi");
+
+    renderCounts(data);
+}
+
+function applyFilters(){
+    window.location.href = "/?" + selectedParams().toString();
+}
+
+// 첫 화면만 먼저 받고 나머지는 스크롤 시 cursor 로 이어받기
+const PAGE_SIZE = 30;
+let nextCursor = null;
+let loading = false;
+
+async function load(cursor){
+
+    if(loading) return;
+    loading = true;
+
+    let params = new URLSearchParams(window.location.search);
+    params.set("limit", PAGE_SIZE);
+    if(cursor) params.set("cursor", cursor);
+
+    let r = await fetch('/matches?' + params.toString());
+    let page = await r.json();
+
+    // cursor 만료(업로드로 버전 변경) 시 처음부터 다시 로드
+    if(page.error){
+        loading = false;
+        if(cursor) window.location.reload();
+        return;
+    }
+
+    let data = page.items || [];
+    nextCursor = page.next_cursor;
+
+    // 🔥 여기서 conditionBar 처리 (첫 페이지)
+    if(!cursor){
+        if(data.length>0){
+            let first=data[0].row;
+            document.getElementById("conditionBar").innerText =
+            first[1] + "년 · " + first[2] + " · " + page.total + "경기";
+        } else {
+            document.getElementById("conditionBar").innerText="경기 없음";
+        }
+    }
+
+    let html="";
+    let query = window.location.search;
+
+    data.forEach(function(m){
+
+        let row=m.row;
+        let badge="";
+
+        if(m.secret){
+            badge=`<div class="secret-badge">
+            시크릿픽 ${m.pick}
+            </div>`;
+        }
+
+        html+=`<div class="card">
+        ${badge}
+        <div><b>${row[6]}</b> vs <b>${row[7]}</b></div>
+        <div>승 ${row[8]} | 무 ${row[9]} | 패 ${row[10]}</div>
+        <div>${row[14]} · ${row[16]} · ${row[11]} · ${row[15]} · ${row[12]}</div>
+        <div class="info-btn">
+        <a href="/detail?no=${row[0]}${query}" style="color:#38bdf8;">정보</a>
+        </div>
+        </div>`;
+    });
+
+    document.getElementById("list").insertAdjacentHTML("beforeend", html);
+    loading = false;
+}
+
+window.addEventListener("scroll", function(){
+    if(nextCursor && !loading &&
+       window.innerHeight + window.scrollY >= document.body.offsetHeight - 400){
+        load(nextCursor);
+    }
+});
+
+load();
+</script>
+
+</body>
+</html>
+"""
+
+# =====================================================
+# PRO 막대그래프
+# =====================================================
+
+def bar_html(percent, mode="win"):
+
+    color_map = {
+        "win":"linear-gradient(90deg,#22c55e,#16a34a)",
+        "draw":"linear-gradient(90deg,#94a3b8,#64748b)",
+        "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
+    }
+
+    return f"""
+<div style="width:100%;background:rgba(255,255,255,0.08);
+border-radius:999px;height:14px;margin:6px 0;">
+<div style="width:{percent}%;
+background:{color_map[mode]};
+height:100%;
+border-radius:999px;"></div>
+</div>
+"""
+
+# =====================================================
+# Page2 - 상세 분석 (ULTRA MASTER FINAL COMPLETE)
+# 카드1 좌우 / 카드2 좌우 / 카드3 리그별 / 3버튼 / 경기수표시 전부포함
+# =====================================================
+
+@app.get("/detail", response_class=HTMLResponse)
+@coalesce("detail")
+def detail(
+    no: str = None,
+    type: str = None,
+    homeaway: str = None,
+    general: str = None,
+    dir: str = None,
+    handi: str = None,
+    window: str = None
+):
+
+    if not no:
+        return "<h2>잘못된 접근</h2>"
+
+    if CURRENT_DF.empty and not store_ready():
+        return "<h2>데이터 없음</h2>"
+
+    row = find_match(no)
+    if row is None:
+        return "<h2>경기 없음</h2>"
+
+    try:
+        span = parse_window(window)
+    except ValueError as e:
+        return f"<h2>{e}</h2>"
+
+    home   = row.iloc[COL_HOME]
+    away   = row.iloc[COL_AWAY]
+    league = row.iloc[COL_LEAGUE]
+
+    card_condition = (
+        f"유형={row.iloc[COL_TYPE]} · "
+        f"{row.iloc[COL_HOMEAWAY]} · "
+        f"{row.iloc[COL_GENERAL]} · "
+        f"{row.iloc[COL_DIR]} · "
+        f"{row.iloc[COL_HANDI]}"
+    )
+
+    odds_text = (
+        f"승 {row.iloc[COL_WIN_ODDS]} · "
+        f"무 {row.iloc[COL_DRAW_ODDS]} · "
+        f"패 {row.iloc[COL_LOSE_ODDS]}"
+    )
+
+    filters = filter_conditions(type, homeaway, general, dir, handi)
+    if not store_ready():
+        source_df = window_frame(span)
+
+    # =====================================================
+    # 공통 UI
+    # =====================================================
+
+    def bar_html(percent, mode="win"):
+        color_map = {
+            "win":"linear-gradient(90deg,#3b82f6,#2563eb)",
+            "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
+            "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
+        }
+        return f"""
+        <div style="width:100%;background:rgba(255,255,255,0.08);
+        border-radius:999px;height:14px;margin:6px 0;">
+        <div style="width:{percent}%;
+        background:{color_map[mode]};
+        height:100%;
+        border-radius:999px;"></div>
+        </div>
+        """
+
+    def result_circle(result, reverse=False):
+        if not reverse:
+            color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
+        else:
+            color_map = {"승":"#ef4444","무":"#22c55e","패":"#3b82f6"}
+        color = color_map.get(result, "#64748b")
+        return f"""
+        <span style="display:inline-flex;
+        align-items:center;justify-content:center;
+        width:22px;height:22px;border-radius:50%;
+        background:{color};color:white;
+        font-size:12px;font-weight:bold;margin-left:6px;">
+        {result}</span>
+        """
+
+    def match_list_html(df, reverse=False):
+        # 번호 내림차순 20행 위치만 정렬로 구한 뒤 그 행 값만 꺼내 렌더
+        numbers = pd.to_numeric(df.iloc[:, COL_NO], errors="coerce").reset_index(drop=True)
+        top = numbers.sort_values(ascending=False).index[:20]
+
+        html=""
+        for r in df.iloc[top].to_numpy():
+            html+=f"""
+            <div style="font-size:12px;border-bottom:1px solid #334155;padding:6px 0;">
+            {r[COL_YEAR]} · {r[COL_ROUND]} · {r[COL_LEAGUE]} ·
+            {r[COL_HOME]} vs {r[COL_AWAY]} ·
+            유형={r[COL_TYPE]} · {r[COL_HOMEAWAY]} ·
+            {r[COL_GENERAL]} · {r[COL_DIR]} · {r[COL_HANDI]}
+            {result_circle(r[COL_RESULT], reverse)}
+            </div>
+            """
+        return html if html else "<div style='font-size:12px;'>경기 없음</div>"
+
+    # =====================================================
+    # 카드1 : 맞대결 좌우 비교
+    # =====================================================
+
+    if store_ready():
+        h2h_df = store_frame(
+            {COL_HOME: home, COL_AWAY: away, COL_TYPE: row.iloc[COL_TYPE]}, window=span
+        )
+        h2h_reverse_df = store_frame(
+            {COL_HOME: away, COL_AWAY: home, COL_TYPE: row.iloc[COL_TYPE]}, window=span
+        )
+    else:
+        h2h_df = source_df[
+            (source_df.iloc[:, COL_HOME] == home) &
+            (source_df.iloc[:, COL_AWAY] == away) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+        h2h_reverse_df = source_df[
+            (source_df.iloc[:, COL_HOME] == away) &
+            (source_df.iloc[:, COL_AWAY] == home) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+    h2h_dist = distribution(h2h_df)
+    h2h_reverse_dist = distribution(h2h_reverse_df)
+
+    # =====================================================
+    # 카드2 : 5조건 전체 vs 동일리그
+    # =====================================================
+
+    if store_ready():
+        base_df = store_frame(pinned_conditions(build_5cond(row), filters), window=span)
+        league_df = store_frame(pinned_conditions(build_league_cond(row), filters), window=span)
+
+        league_groups = [
+            (lg, group, group)
+            for lg, group in base_df.groupby(base_df.iloc[:, COL_LEAGUE], observed=True)
+        ]
+        base_rows = base_df
+    else:
+        # 조건별 행 인덱스에서 해당 셀만, 프레임은 목록 20행 또는 표 조회 실패 시에만 생성
+        positions, league_codes, league_values = condition_rows(
+            pinned_conditions(build_5cond(row), filters), span
+        )
+
+        def rows_frame(pos):
+            return lambda: CURRENT_DF.iloc[pos]
+
+        base_df = rows_frame(positions)
+        base_rows = CURRENT_DF.iloc[positions[:20]]
+        league_rows = positions[
+            (league_codes >= 0) & (league_values[league_codes] == league)
+        ]
+        league_df = CURRENT_DF.iloc[league_rows[:20]]
+
+        # 리그 코드는 정렬 factorize → 코드 순서 = groupby 리그 순서 (NaN 리그 제외)
+        league_groups = []
+        for code in np.unique(league_codes[league_codes >= 0]):
+            pos = positions[league_codes == code]
+            league_groups.append((
+                league_values[code],
+                rows_frame(pos),
+                CURRENT_DF.iloc[pos[:20]]
+            ))
+
+    base_dist = lookup_distribution(
+        pinned_conditions(build_5cond(row), filters), base_df, span
+    )
+    league_dist = league_cond_dist(row, filters, span)
+
+    # =====================================================
+    # 카드3 : 리그별 분포
+    # =====================================================
+
+    league_card_html = ""
+
+    for lg, group, group_rows in league_groups:
+        lg_cond = build_5cond(row)
+        lg_cond[COL_LEAGUE] = lg
+        dist = lookup_distribution(pinned_conditions(lg_cond, filters), group, span)
+        box_id = f"lg_{lg}"
+
+        league_card_html += f"""
+        <div style="background:#1e293b;padding:16px;
+        border-radius:16px;margin-top:20px;">
+
+        <h3>카드3 - 리그별 분포 ({lg})  총 ({dist["총"]}경기)</h3>
+
+        <div style="font-size:12px;opacity:0.7;">
+        조건: 리그={lg} · {card_condition}
+        </div>
+
+        <div>승 {dist["wp"]}% ({dist["승"]}경기)</div>{bar_html(dist["wp"],"win")}
+        <div>무 {dist["dp"]}% ({dist["무"]}경기)</div>{bar_html(dist["dp"],"draw")}
+        <div>패 {dist["lp"]}% ({dist["패"]}경기)</div>{bar_html(dist["lp"],"lose")}
+
+        <button onclick="toggleBox('{box_id}')">경기목록</button>
+        <div id="{box_id}" style="display:none;">
+        {match_list_html(group_rows)}
+        </div>
+
+        </div>
+        """
+
+    # =====================================================
+    # HTML
+    # =====================================================
+
+    return f"""
+<html>
+<body style="background:#0f1720;color:white;
+font-family:Arial;padding:20px;">
+
+<div style="display:flex;justify-content:space-between;align-items:center;">
+<h2>[{league}] {home} vs {away}</h2>
+
+<div style="display:flex;gap:12px;">
+<a href="/page3?no={no}&away=0{window_query(window)}" style="color:#38bdf8;">홈팀분석</a>
+<a href="/page3?no={no}&away=1{window_query(window)}" style="color:#38bdf8;">원정팀분석</a>
+<a href="/page4?no={no}{window_query(window)}" style="color:#38bdf8;">배당분석</a>
+</div>
+
+</div>
+
+<div style="opacity:0.7;font-size:12px;margin-bottom:15px;">
+{card_condition}<br>배당: {odds_text}{window_label(window)}
+</div>
+
+<!-- 카드1 -->
+<div style="display:flex;gap:20px;flex-wrap:wrap;margin-bottom:25px;">
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드1 - 맞대결 (정방향)  총 ({h2h_dist["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;">
+조건: 유형={row.iloc[COL_TYPE]} · 홈={home} · 원정={away}
+</div>
+<div>승 {h2h_dist["wp"]}% ({h2h_dist["승"]}경기)</div>{bar_html(h2h_dist["wp"],"win")}
+<div>무 {h2h_dist["dp"]}% ({h2h_dist["무"]}경기)</div>{bar_html(h2h_dist["dp"],"draw")}
+<div>패 {h2h_dist["lp"]}% ({h2h_dist["패"]}경기)</div>{bar_html(h2h_dist["lp"],"lose")}
+<button onclick="toggleBox('h1')">경기목록</button>
+<div id="h1" style="display:none;">{match_list_html(h2h_df)}</div>
+</div>
+
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드1 - 맞대결 (역방향)  총 ({h2h_reverse_dist["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;">
+조건: 유형={row.iloc[COL_TYPE]} · 홈={away} · 원정={home}
+</div>
+<div>승 {h2h_reverse_dist["wp"]}% ({h2h_reverse_dist["승"]}경기)</div>{bar_html(h2h_reverse_dist["wp"],"win")}
+<div>무 {h2h_reverse_dist["dp"]}% ({h2h_reverse_dist["무"]}경기)</div>{bar_html(h2h_reverse_dist["dp"],"draw")}
+<div>패 {h2h_reverse_dist["lp"]}% ({h2h_reverse_dist["패"]}경기)</div>{bar_html(h2h_reverse_dist["lp"],"lose")}
+<button onclick="toggleBox('h2')">경기목록</button>
+<div id="h2" style="display:none;">
+{match_list_html(h2h_reverse_df,True)}
+</div>
+</div>
+</div>
+
+<!-- 카드2 -->
+<div style="display:flex;gap:20px;flex-wrap:wrap;margin-bottom:25px;">
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드2 - 5조건 전체  총 ({base_dist["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;">
+조건: {card_condition}
+</div>
+<div>승 {base_dist["wp"]}% ({base_dist["승"]}경기)</div>{bar_html(base_dist["wp"],"win")}
+<div>무 {base_dist["dp"]}% ({base_dist["무"]}경기)</div>{bar_html(base_dist["dp"],"draw")}
+<div>패 {base_dist["lp"]}% ({base_dist["패"]}경기)</div>{bar_html(base_dist["lp"],"lose")}
+<button onclick="toggleBox('b1')">경기목록</button>
+<div id="b1" style="display:none;">
+{match_list_html(base_rows)}
+</div>
+</div>
+
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드2 - 동일리그 5조건  총 ({league_dist["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;">
+조건: 리그={league} · {card_condition}
+</div>
+<div>승 {league_dist["wp"]}% ({league_dist["승"]}경기)</div>{bar_html(league_dist["wp"],"win")}
+<div>무 {league_dist["dp"]}% ({league_dist["무"]}경기)</div>{bar_html(league_dist["dp"],"draw")}
+<div>패 {league_dist["lp"]}% ({league_dist["패"]}경기)</div>{bar_html(league_dist["lp"],"lose")}
+<button onclick="toggleBox('b2')">경기목록</button>
+<div id="b2" style="display:none;">
+{match_list_html(league_df)}
+</div>
+</div>
+</div>
+
+<!-- 카드3 -->
+<button onclick="toggleBox('lg_card')">
+카드3 - 리그별 분포 보기/숨기기
+</button>
+
+<div id="lg_card" style="display:none;">
+{league_card_html}
+</div>
+
+<br><br>
+<button onclick="history.back()">← 뒤로가기</button>
+
+<script>
+function toggleBox(id){{
+    var el=document.getElementById(id);
+    if(el.style.display==="none"){{el.style.display="block";}}
+    else{{el.style.display="none";}}
+}}
+</script>
+
+</body>
+</html>
+"""
+
+# =====================================================
+# Page3 - 팀 분석
+# =====================================================
+
+@app.get("/page3", response_class=HTMLResponse)
+@coalesce("page3")
+def page3_view(no: str = None, away: int = 0, window: str = None):
+
+    if not no:
+        return "<h2>잘못된 접근</h2>"
+    if CURRENT_DF.empty and not store_ready():
+        return "<h2>데이터 없음</h2>"
+
+    row = find_match(no)
+    if row is None:
+        return "<h2>경기 없음</h2>"
+
+    try:
+        span = parse_window(window)
+    except ValueError as e:
+        return f"<h2>{e}</h2>"
+
+    source_df = window_frame(span)
+
+    home_team = row.iloc[COL_HOME]
+    away_team = row.iloc[COL_AWAY]
+    league    = row.iloc[COL_LEAGUE]
+
+    team = home_team if away == 0 else away_team
+    page_title = "홈팀분석" if away == 0 else "원정팀분석"
+
+    match_condition = (
+        f"{row.iloc[COL_TYPE]} · "
+        f"{row.iloc[COL_HOMEAWAY]} · "
+        f"{row.iloc[COL_GENERAL]} · "
+        f"{row.iloc[COL_DIR]} · "
+        f"{row.iloc[COL_HANDI]}"
+    )
+
+    odds_text = (
+        f"승 {row.iloc[COL_WIN_ODDS]} · "
+        f"무 {row.iloc[COL_DRAW_ODDS]} · "
+        f"패 {row.iloc[COL_LOSE_ODDS]}"
+    )
+
+    reverse_mode = (away == 1)
+
+    # ======================================================
+    # 공통 UI 함수
+    # ======================================================
+
+    def bar_html(percent, mode="win", reverse=False):
+
+        if not reverse:
+            color_map = {
+                "win":"linear-gradient(90deg,#3b82f6,#2563eb)",
+                "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
+                "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
+            }
+        else:
+            color_map = {
+                "win":"linear-gradient(90deg,#ef4444,#dc2626)",
+                "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
+                "lose":"linear-gradient(90deg,#3b82f6,#2563eb)"
+            }
+
+        return f"""
+        <div style="width:100%;background:rgba(255,255,255,0.08);
+        border-radius:999px;height:14px;margin:6px 0;">
+        <div style="width:{percent}%;
+        background:{color_map[mode]};
+        height:100%;
+        border-radius:999px;"></div>
+        </div>
+        """
+
+    def result_circle(result, reverse=False):
+
+        if not reverse:
+            color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
+        else:
+            color_map = {"승":"#ef4444","무":"#22c55e","패":"#3b82f6"}
+
+        color = color_map.get(result, "#64748b")
+
+        return f"""
+        <span style="
+            display:inline-flex;
+            align-items:center;
+            justify-content:center;
+            width:22px;
+            height:22px;
+            border-radius:50%;
+            background:{color};
+            color:white;
+            font-size:12px;
+            font-weight:bold;
+            margin-left:6px;">
+            {result}
+        </span>
+        """
+
+    def distribution(df):
+        total = len(df)
+        if total == 0:
+            return {"총":0,"승":0,"무":0,"패":0,"wp":0,"dp":0,"lp":0}
+        win  = (df.iloc[:, COL_RESULT] == "승").sum()
+        draw = (df.iloc[:, COL_RESULT] == "무").sum()
+        lose = (df.iloc[:, COL_RESULT] == "패").sum()
+        return {
+            "총":total,
+            "승":win,
+            "무":draw,
+            "패":lose,
+            "wp":round(win/total*100,2),
+            "dp":round(draw/total*100,2),
+            "lp":round(lose/total*100,2)
+        }
+
+    def match_list_html(df, box_id, reverse=False):
+
+        df = df.assign(
+            __no_numeric=pd.to_numeric(df.iloc[:, COL_NO], errors="coerce")
+        ).sort_values(
+            by="__no_numeric",
+            ascending=False
+        ).head(20)
+
+        html = ""
+
+        for _, r in df.iterrows():
+
+            html += f"""
+            <div style="font-size:12px;
+            border-bottom:1px solid #334155;
+            padding:6px 0;">
+
+            {r.iloc[COL_YEAR]} ·
+            {r.iloc[COL_ROUND]} ·
+            {r.iloc[COL_LEAGUE]} ·
+
+            {r.iloc[COL_HOME]} vs {r.iloc[COL_AWAY]} ·
+
+            {r.iloc[COL_TYPE]} ·
+            {r.iloc[COL_HOMEAWAY]} ·
+            {r.iloc[COL_GENERAL]} ·
+            {r.iloc[COL_DIR]} ·
+            {r.iloc[COL_HANDI]}
+
+            {result_circle(r.iloc[COL_RESULT], reverse)}
+
+            </div>
+            """
+
+        return f"""
+        <button onclick="toggleBox('{box_id}')">
+        경기목록 보기/숨기기
+        </button>
+        <div id="{box_id}" style="display:none;margin-top:10px;">
+        {html if html else "경기 없음"}
+        </div>
+        """
+
+    # ======================================================
+    # 카드1 (유형 필터 추가 완료)
+    # ======================================================
+
+    if store_ready():
+        team_home_df = store_frame({COL_HOME: team, COL_TYPE: row.iloc[COL_TYPE]}, window=span)
+        team_away_df = store_frame({COL_AWAY: team, COL_TYPE: row.iloc[COL_TYPE]}, window=span)
+    else:
+        team_home_df = source_df[
+            (source_df.iloc[:, COL_HOME] == team) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+        team_away_df = source_df[
+            (source_df.iloc[:, COL_AWAY] == team) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+    if span is None:
+        dist_home = distribution(team_home_df)
+        dist_away = distribution(team_away_df)
+    else:
+        dist_home = window_lookup({COL_HOME: team, COL_TYPE: row.iloc[COL_TYPE]}, team_home_df, span)
+        dist_away = window_lookup({COL_AWAY: team, COL_TYPE: row.iloc[COL_TYPE]}, team_away_df, span)
+
+    # ======================================================
+    # 카드2 (원문 그대로)
+    # ======================================================
+
+    if store_ready():
+        team_5cond_df = store_frame(build_5cond(row), team=team, window=span)
+    else:
+        team_5cond_df = source_df[
+            (
+                (source_df.iloc[:, COL_HOME] == team) |
+                (source_df.iloc[:, COL_AWAY] == team)
+            ) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_HOMEAWAY] == row.iloc[COL_HOMEAWAY]) &
+            (source_df.iloc[:, COL_GENERAL] == row.iloc[COL_GENERAL]) &
+            (source_df.iloc[:, COL_DIR] == row.iloc[COL_DIR]) &
+            (source_df.iloc[:, COL_HANDI] == row.iloc[COL_HANDI]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+    team_5cond_league_df = team_5cond_df[
+        team_5cond_df.iloc[:, COL_LEAGUE] == league
+    ]
+
+    dist_5cond = distribution(team_5cond_df)
+    dist_5cond_league = distribution(team_5cond_league_df)
+
+    # ======================================================
+    # 카드3 (상위 토글 추가)
+    # ======================================================
+
+    if store_ready():
+        team_general_df = store_frame({
+            COL_TYPE: row.iloc[COL_TYPE],
+            COL_HOMEAWAY: row.iloc[COL_HOMEAWAY]
+        }, team=team, window=span)
+    else:
+        team_general_df = source_df[
+            (
+                (source_df.iloc[:, COL_HOME] == team) |
+                (source_df.iloc[:, COL_AWAY] == team)
+            ) &
+            (source_df.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
+            (source_df.iloc[:, COL_HOMEAWAY] == row.iloc[COL_HOMEAWAY]) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+    general_groups = team_general_df.groupby(
+        team_general_df.iloc[:, COL_GENERAL],
+        observed=True
+    )
+
+    general_html = ""
+
+    for gen, group in general_groups:
+
+        dist = distribution(group)
+        box_id = f"gen_{gen}"
+
+        general_html += f"""
+        <div style="background:#1e293b;padding:16px;border-radius:16px;margin-top:20px;">
+
+        <h3>카드3 - 일반 {gen} ({dist["총"]}경기)</h3>
+
+        <div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
+        조건: 팀={team} · 유형={row.iloc[COL_TYPE]} ·
+        {row.iloc[COL_HOMEAWAY]} · 일반={gen}
+        </div>
+
+        <div>승 {dist["wp"]}% ({dist["승"]}경기)</div>
+        {bar_html(dist["wp"],"win",reverse_mode)}
+        <div>무 {dist["dp"]}% ({dist["무"]}경기)</div>
+        {bar_html(dist["dp"],"draw",reverse_mode)}
+        <div>패 {dist["lp"]}% ({dist["패"]}경기)</div>
+        {bar_html(dist["lp"],"lose",reverse_mode)}
+
+        {match_list_html(group, box_id, reverse_mode)}
+
+        </div>
+        """
+
+    # ======================================================
+    # HTML 출력
+    # ======================================================
+
+    return f"""
+<html>
+<body style="background:#0f1720;color:white;font-family:Arial;padding:20px;">
+
+<div style="display:flex;justify-content:space-between;align-items:center;">
+<h2>[{league}] {home_team} vs {away_team}</h2>
+<div style="display:flex;gap:12px;">
+<a href="/page3?no={no}&away=0{window_query(window)}" style="color:#38bdf8;">홈팀분석</a>
+<a href="/page3?no={no}&away=1{window_query(window)}" style="color:#38bdf8;">원정팀분석</a>
+<a href="/page4?no={no}{window_query(window)}" style="color:#38bdf8;">배당분석</a>
+</div>
+</div>
+
+<div style="opacity:0.7;font-size:13px;margin-bottom:15px;">
+해당경기 조건: {match_condition}<br>
+배당: {odds_text}<br>
+{page_title} - {team}{window_label(window)}
+</div>
+
+<!-- 카드1 -->
+<div style="display:flex;gap:20px;flex-wrap:wrap;">
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드1 - 팀 홈 경기 ({dist_home["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
+조건: 유형={row.iloc[COL_TYPE]} · 팀={team} · 홈경기
+</div>
+<div>승 {dist_home["wp"]}% ({dist_home["승"]}경기)</div>
+{bar_html(dist_home["wp"],"win",reverse_mode)}
+<div>무 {dist_home["dp"]}% ({dist_home["무"]}경기)</div>
+{bar_html(dist_home["dp"],"draw",reverse_mode)}
+<div>패 {dist_home["lp"]}% ({dist_home["패"]}경기)</div>
+{bar_html(dist_home["lp"],"lose",reverse_mode)}
+{match_list_html(team_home_df,"c1_home",reverse_mode)}
+</div>
+
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드1 - 팀 원정 경기 ({dist_away["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
+조건: 유형={row.iloc[COL_TYPE]} · 팀={team} · 원정경기
+</div>
+<div>승 {dist_away["wp"]}% ({dist_away["승"]}경기)</div>
+{bar_html(dist_away["wp"],"win",reverse_mode)}
+<div>무 {dist_away["dp"]}% ({dist_away["무"]}경기)</div>
+{bar_html(dist_away["dp"],"draw",reverse_mode)}
+<div>패 {dist_away["lp"]}% ({dist_away["패"]}경기)</div>
+{bar_html(dist_away["lp"],"lose",reverse_mode)}
+{match_list_html(team_away_df,"c1_away",reverse_mode)}
+</div>
+</div>
+
+<br>
+
+<!-- 카드2 -->
+<div style="display:flex;gap:20px;flex-wrap:wrap;">
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드2 - 팀 5조건 전체 ({dist_5cond["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
+조건: 팀={team} · 동일 5조건
+</div>
+<div>승 {dist_5cond["wp"]}% ({dist_5cond["승"]}경기)</div>
+{bar_html(dist_5cond["wp"],"win",reverse_mode)}
+<div>무 {dist_5cond["dp"]}% ({dist_5cond["무"]}경기)</div>
+{bar_html(dist_5cond["dp"],"draw",reverse_mode)}
+<div>패 {dist_5cond["lp"]}% ({dist_5cond["패"]}경기)</div>
+{bar_html(dist_5cond["lp"],"lose",reverse_mode)}
+{match_list_html(team_5cond_df,"c2_all",reverse_mode)}
+</div>
+
+<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
+<h3>카드2 - 동일리그 5조건 ({dist_5cond_league["총"]}경기)</h3>
+<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
+조건: 팀={team} · 동일리그
+</div>
+<div>승 {dist_5cond_league["wp"]}% ({dist_5cond_league["승"]}경기)</div>
+{bar_html(dist_5cond_league["wp"],"win",reverse_mode)}
+<div>무 {dist_5cond_league["dp"]}% ({dist_5cond_league["무"]}경기)</div>
+{bar_html(dist_5cond_league["dp"],"draw",reverse_mode)}
+<div>패 {dist_5cond_league["lp"]}% ({dist_5cond_league["패"]}경기)</div>
+{bar_html(dist_5cond_league["lp"],"lose",reverse_mode)}
+{match_list_html(team_5cond_league_df,"c2_league",reverse_mode)}
+</div>
+</div>
+
+<br>
+
+<!-- 카드3 -->
+<button onclick="toggleBox('card3_all')">
+카드3 - 일반구분 분포 보기/숨기기
+</button>
+
+<div id="card3_all" style="display:none;">
+{general_html}
+</div>
+
+<br><br>
+<button onclick="history.back()">← 뒤로가기</button>
+
+<script>
+function toggleBox(id){{
+    var el=document.getElementById(id);
+    if(el.style.display==="none"){{el.style.display="block";}}
+    else{{el.style.display="none";}}
+}}
+</script>
+
+</body>
+</html>
+"""
+
+# =====================================================
+# Page4 - 배당 분석
+# =====================================================
+
+PAGE4_BANDS = (0.05, 0.1, 0.2)
+
+@app.get("/page4", response_class=HTMLResponse)
+@coalesce("page4")
+def page4_view(no: str = None, band: float = 0, window: str = None):
+
+    if not no:
+        return "<h2>잘못된 접근</h2>"
+    if CURRENT_DF.empty and not store_ready():
+        return "<h2>데이터 없음</h2>"
+    if band < 0:
+        return "<h2>band 값 오류</h2>"
+
+    row = find_match(no)
+    if row is None:
+        return "<h2>경기 없음</h2>"
+
+    try:
+        span = parse_window(window)
+    except ValueError as e:
+        return f"<h2>{e}</h2>"
+
+    source_df = window_frame(span)
+
+    home = row.iloc[COL_HOME]
+    away = row.iloc[COL_AWAY]
+    league = row.iloc[COL_LEAGUE]
+
+    type_val = row.iloc[COL_TYPE]
+    win_odds  = row.iloc[COL_WIN_ODDS]
+    draw_odds = row.iloc[COL_DRAW_ODDS]
+    lose_odds = row.iloc[COL_LOSE_ODDS]
+
+    # =========================================================
+    # 공통 함수 (페이지3 동일)
+    # =========================================================
+
+    def distribution(df):
+        total = len(df)
+        if total == 0:
+            return {"총":0,"승":0,"무":0,"패":0,"wp":0,"dp":0,"lp":0}
+        win  = (df.iloc[:, COL_RESULT] == "승").sum()
+        draw = (df.iloc[:, COL_RESULT] == "무").sum()
+        lose = (df.iloc[:, COL_RESULT] == "패").sum()
+        return {
+            "총":total,
+            "승":win,
+            "무":draw,
+            "패":lose,
+            "wp":round(win/total*100,2),
+            "dp":round(draw/total*100,2),
+            "lp":round(lose/total*100,2)
+        }
+
+    def result_circle(result):
+        color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
+        color = color_map.get(result, "#64748b")
+        return f"""
+        <span style="
+            display:inline-flex;
+            align-items:center;
+            justify-content:center;
+            width:22px;height:22px;
+            border-radius:50%;
+            background:{color};
+            color:white;font-size:12px;
+            font-weight:bold;margin-left:6px;">
+            {result}
+        </span>
+        """
 
-    # ======================================================
-    # 공통 UI 함수
-    # ======================================================
+    def match_list_html(df, box_id):
 
-    def bar_html(percent, mode="win", reverse=False):
+        df = df.assign(
+            __no_numeric=pd.to_numeric(df.iloc[:, COL_NO], errors="coerce")
+        ).sort_values(by="__no_numeric", ascending=False).head(20)
 
-        if not reverse:
-            color_map = {
-                "win":"linear-gradient(90deg,#3b82f6,#2563eb)",
-                "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
-                "lose":"linear-gradient(90deg,#ef4444,#dc2626)"
-            }
-        else:
-            color_map = {
-                "win":"linear-gradient(90deg,#ef4444,#dc2626)",
-                "draw":"linear-gradient(90deg,#22c55e,#16a34a)",
-                "lose":"linear-gradient(90deg,#3b82f6,#2563eb)"
-            }
+        html = ""
+        for _, r in df.iterrows():
+            html += f"""
+            <div style="font-size:12px;border-bottom:1px solid #334155;padding:6px 0;">
+            {r.iloc[COL_YEAR]} · {r.iloc[COL_ROUND]} · {r.iloc[COL_LEAGUE]} ·
+            {r.iloc[COL_HOME]} vs {r.iloc[COL_AWAY]} ·
+            {r.iloc[COL_TYPE]} · {r.iloc[COL_HOMEAWAY]} ·
+            {r.iloc[COL_GENERAL]} · {r.iloc[COL_DIR]} · {r.iloc[COL_HANDI]}
+            {result_circle(r.iloc[COL_RESULT])}
+            </div>
+            """
 
         return f"""
-        <div style="width:100%;background:rgba(255,255,255,0.08);
-        border-radius:999px;height:14px;margin:6px 0;">
-        <div style="width:{percent}%;
-        background:{color_map[mode]};
-        height:100%;
-        border-radius:999px;"></div>
+        <button onclick="toggleBox('{box_id}')">경기목록</button>
+        <div id="{box_id}" style="display:none;margin-top:8px;">
+        {html if html else "경기 없음"}
         </div>
         """
 
-    def result_circle(result, reverse=False):
+    # =========================================================
+    # 카드1 : 유형 + 승무패 완전일치
+    # =========================================================
 
-        if not reverse:
-            color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
-        else:
-            color_map = {"승":"#ef4444","무":"#22c55e","패":"#3b82f6"}
+    if store_ready():
+        card1_df = store_frame({
+            COL_TYPE: type_val,
+            COL_WIN_ODDS: win_odds,
+            COL_DRAW_ODDS: draw_odds,
+            COL_LOSE_ODDS: lose_odds
+        }, window=span)
+    else:
+        card1_df = source_df[
+            (source_df.iloc[:, COL_TYPE] == type_val) &
+            (source_df.iloc[:, COL_WIN_ODDS] == win_odds) &
+            (source_df.iloc[:, COL_DRAW_ODDS] == draw_odds) &
+            (source_df.iloc[:, COL_LOSE_ODDS] == lose_odds) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
 
-        color = color_map.get(result, "#64748b")
+    dist1 = distribution(card1_df)
 
+    # =========================================================
+    # 카드2~4 : band > 0 이면 정렬 배당 인덱스로 ±band 구간 조회
+    # =========================================================
+
+    def band_card(side, value):
+        try:
+            center = float(value)
+        except (TypeError, ValueError):
+            return distribution(CURRENT_DF.iloc[0:0]), CURRENT_DF.iloc[0:0]
+        if store_ready():
+            return store_band(type_val, side, center - band, center + band, span)
+        dist, pos = odds_band(type_val, side, center - band, center + band)
+        if span is not None:
+            band_df = CURRENT_DF.iloc[window_positions(pos, span)]
+            return distribution(band_df), band_df
+        return dist, CURRENT_DF.iloc[pos]
+
+    def band_text(dist):
+        if not band:
+            return ""
         return f"""
-        <span style="
-            display:inline-flex;
-            align-items:center;
-            justify-content:center;
-            width:22px;
-            height:22px;
-            border-radius:50%;
-            background:{color};
-            color:white;
-            font-size:12px;
-            font-weight:bold;
-            margin-left:6px;">
-            {result}
-        </span>
+        <div style="font-size:12px;opacity:0.7;">
+        승 {dist["wp"]}% · 무 {dist["dp"]}% · 패 {dist["lp"]}%
+        </div>
         """
 
-    def distribution(df):
-        total = len(df)
-        if total == 0:
-            return {"총":0,"승":0,"무":0,"패":0,"wp":0,"dp":0,"lp":0}
-        win  = (df.iloc[:, COL_RESULT] == "승").sum()
-        draw = (df.iloc[:, COL_RESULT] == "무").sum()
-        lose = (df.iloc[:, COL_RESULT] == "패").sum()
-        return {
-            "총":total,
-            "승":win,
-            "무":draw,
-            "패":lose,
-            "wp":round(win/total*100,2),
-            "dp":round(draw/total*100,2),
-            "lp":round(lose/total*100,2)
-        }
+    match_text = f"±{band}" if band else "완전일치"
+
+    # =========================================================
+    # 카드2
+    # =========================================================
+
+    if band:
+        dist2_win, card2_win_df = band_card("win", win_odds)
+    elif store_ready():
+        card2_win_df = store_frame({COL_TYPE: type_val, COL_WIN_ODDS: win_odds}, window=span)
+        dist2_win = distribution(card2_win_df)
+    else:
+        card2_win_df = source_df[
+            (source_df.iloc[:, COL_TYPE] == type_val) &
+            (source_df.iloc[:, COL_WIN_ODDS] == win_odds) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+        dist2_win = distribution(card2_win_df)
+
+    # =========================================================
+    # 카드3
+    # =========================================================
+
+    if band:
+        dist3_draw, card3_draw_df = band_card("draw", draw_odds)
+    elif store_ready():
+        card3_draw_df = store_frame({COL_TYPE: type_val, COL_DRAW_ODDS: draw_odds}, window=span)
+        dist3_draw = distribution(card3_draw_df)
+    else:
+        card3_draw_df = source_df[
+            (source_df.iloc[:, COL_TYPE] == type_val) &
+            (source_df.iloc[:, COL_DRAW_ODDS] == draw_odds) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+        dist3_draw = distribution(card3_draw_df)
+
+    # =========================================================
+    # 카드4
+    # =========================================================
+
+    if band:
+        dist4_lose, card4_lose_df = band_card("lose", lose_odds)
+    elif store_ready():
+        card4_lose_df = store_frame({COL_TYPE: type_val, COL_LOSE_ODDS: lose_odds}, window=span)
+        dist4_lose = distribution(card4_lose_df)
+    else:
+        card4_lose_df = source_df[
+            (source_df.iloc[:, COL_TYPE] == type_val) &
+            (source_df.iloc[:, COL_LOSE_ODDS] == lose_odds) &
+            (source_df.iloc[:, COL_RESULT] != "경기전")
+        ]
+
+        dist4_lose = distribution(card4_lose_df)
+
+    band_links = " · ".join(
+        f'<a href="/page4?no={no}&band={b}{window_query(window)}" style="color:#38bdf8;">±{b}</a>'
+        for b in PAGE4_BANDS
+    )
+
+    # =========================================================
+    # HTML 출력
+    # =========================================================
+
+    return f"""
+<html>
+<body style="background:#0f1720;color:white;font-family:Arial;padding:20px;">
+
+<h2>[{league}] {home} vs {away}</h2>
+
+<div style="display:flex;gap:12px;margin-bottom:10px;">
+<a href="/page3?no={no}&away=0{window_query(window)}" style="color:#38bdf8;">홈팀분석</a>
+<a href="/page3?no={no}&away=1{window_query(window)}" style="color:#38bdf8;">원정팀분석</a>
+<a href="/page4?no={no}{window_query(window)}" style="color:#38bdf8;">배당분석</a>
+</div>
+
+<div style="opacity:0.7;margin-bottom:20px;">
+유형: {type_val} <br>
+배당: 승 {win_odds} · 무 {draw_odds} · 패 {lose_odds}{window_label(window)}
+</div>
+
+<div style="font-size:12px;margin-bottom:20px;">
+배당 범위: <a href="/page4?no={no}{window_query(window)}" style="color:#38bdf8;">완전일치</a> · {band_links}
+</div>
+
+<h3>카드1 - 유형+승무패 완전일치 ({dist1["총"]}경기)</h3>
+{match_list_html(card1_df,"c1")}
+
+<h3>카드2 - 유형+승 {match_text} ({dist2_win["총"]}경기)</h3>
+{band_text(dist2_win)}
+{match_list_html(card2_win_df,"c2")}
+
+<h3>카드3 - 유형+무 {match_text} ({dist3_draw["총"]}경기)</h3>
+{band_text(dist3_draw)}
+{match_list_html(card3_draw_df,"c3")}
+
+<h3>카드4 - 유형+패 {match_text} ({dist4_lose["총"]}경기)</h3>
+{band_text(dist4_lose)}
+{match_list_html(card4_lose_df,"c4")}
+
+<br><br>
+<button onclick="history.back()">← 뒤로가기</button>
+
+<script>
+function toggleBox(id){{
+    var el=document.getElementById(id);
+    if(el.style.display==="none"){{el.style.display="block";}}
+    else{{el.style.display="none";}}
+}}
+</script>
+
+</body>
+</html>
+"""
+
+# =====================================================
+# 배당 구간 분포 API (?odds=&band= 또는 ?low=&high=)
+# =====================================================
+
+@app.get("/odds-band")
+def odds_band_view(
+    type: str,
+    side: str = "win",
+    odds: float = None,
+    band: float = 0.05,
+    low: float = None,
+    high: float = None,
+    window: str = None
+):
+
+    if side not in ODDS_SIDES:
+        return {"error": f"side 값 오류 (가능: {', '.join(ODDS_SIDES)})"}
+
+    try:
+        span = parse_window(window)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if low is None or high is None:
+        if odds is None or band < 0:
+            return {"error": "odds+band 또는 low+high 필요"}
+        low, high = odds - band, odds + band
+
+    # 저장소 모드는 배당 인덱스가 없음 → SQL 범위 조회 (기간 조건 포함)
+    if store_ready():
+        dist, _ = store_band(type, side, low, high, span)
+    else:
+        dist, pos = odds_band(type, side, low, high)
+
+        if span is not None:
+            dist = count_dist(frame_counts(CURRENT_DF.iloc[window_positions(pos, span)]))
+
+    return {
+        "type": type,
+        "side": side,
+        "low": low,
+        "high": high,
+        "dist": dist
+    }
+
+# =====================================================
+# 유사 배당 경기 API
+# =====================================================
+
+SIMILAR_MAX_K = 500
+
+@app.get("/similar")
+def similar(no: str, k: int = 50, same_type: bool = False, same_league: bool = False):
+
+    if CURRENT_DF.empty:
+        return {"error": "데이터 없음"}
+
+    if STORE_STATE["lazy"]:
+        return {"error": "SQLite 지연 로드 모드에서는 유사 배당 검색 미지원"}
+
+    if not 1 <= k <= SIMILAR_MAX_K:
+        return {"error": f"k 는 1~{SIMILAR_MAX_K}"}
+
+    matches = np.flatnonzero((CURRENT_DF.iloc[:, COL_NO] == str(no)).to_numpy())
+    if len(matches) == 0:
+        return {"error": "경기 없음"}
+
+    pos = int(matches[0])
+    row = CURRENT_DF.iloc[pos]
+
+    try:
+        point = [
+            float(row.iloc[COL_WIN_ODDS]),
+            float(row.iloc[COL_DRAW_ODDS]),
+            float(row.iloc[COL_LOSE_ODDS])
+        ]
+    except (TypeError, ValueError):
+        return {"error": "배당 값 오류"}
+
+    type_val = row.iloc[COL_TYPE] if same_type else None
+    league = row.iloc[COL_LEAGUE] if same_league else None
+
+    positions, dists = similar_matches(point, k, type_val, league, exclude=pos)
+    neighbours = CURRENT_DF.iloc[positions]
+
+    result_col = neighbours.iloc[:, COL_RESULT].to_numpy()
+    counts = np.array([len(result_col)] + [
+        int(np.count_nonzero(result_col == label)) for label in RESULT_LABELS
+    ])
+
+    return {
+        "no": str(no),
+        "odds": point,
+        "k": k,
+        "type": type_val,
+        "league": league,
+        "dist": count_dist(counts),
+        "neighbours": [
+            {
+                "no": r[COL_NO],
+                "year": r[COL_YEAR],
+                "round": r[COL_ROUND],
+                "league": r[COL_LEAGUE],
+                "home": r[COL_HOME],
+                "away": r[COL_AWAY],
+                "type": r[COL_TYPE],
+                "odds": [r[COL_WIN_ODDS], r[COL_DRAW_ODDS], r[COL_LOSE_ODDS]],
+                "result": r[COL_RESULT],
+                "distance": round(float(d), 4)
+            }
+            for r, d in zip(neighbours.itertuples(index=False), dists)
+        ]
+    }
+
+# =====================================================
+# 고신뢰도 시크릿픽 전용 API
+# =====================================================
+
+def high_conf_item(i):
+
+    row = PICK_INDEX["rows"][i]
+    brain = PICK_INDEX["brain"][i]
+
+    return {
+        "no": row[COL_NO],
+        "home": row[COL_HOME],
+        "away": row[COL_AWAY],
+        "추천": brain["추천"],
+        "confidence": brain["confidence"],
+        "sample": brain["sample"]
+    }
+
+
+@app.get("/high-confidence")
+def high_confidence(
+    min_conf: float = MIN_CONFIDENCE,
+    limit: int = None,
+    cursor: str = None,
+    sort: str = None,
+    order: str = None
+):
+
+    if CURRENT_DF.empty or not PICK_INDEX:
+        return []
+
+    def positions():
+        return np.flatnonzero(PICK_INDEX["conf"] >= min_conf)
+
+    if limit is None and cursor is None and sort is None:
+        return [high_conf_item(i) for i in positions()]
+
+    return paginate(
+        ("high-confidence", min_conf),
+        positions, high_conf_item, sort or "row", order, limit, cursor
+    )
+
+# =====================================================
+# EV 기준 상위 경기 추출 API
+# =====================================================
+
+@app.get("/top-ev")
+@coalesce("top-ev")
+def top_ev(limit: int = 20):
+
+    if CURRENT_DF.empty or not PICK_INDEX:
+        return []
+
+    ordered = sorted_positions(
+        ("top-ev",),
+        lambda: np.flatnonzero(PICK_INDEX["sample"] >= 10),
+        "ev", None
+    )
+
+    result = []
+
+    for i in ordered[:limit]:
+
+        row = PICK_INDEX["rows"][i]
+        sec = PICK_INDEX["sec"][i]
+
+        result.append({
+            "no": row[COL_NO],
+            "home": row[COL_HOME],
+            "away": row[COL_AWAY],
+            "추천": sec["추천"],
+            "EV": sec["score"],
+            "sample": sec["sample"]
+        })
+
+    return result
+
+# =====================================================
+# 고EV + 고신뢰도 복합 필터 API
+# =====================================================
+
+def elite_item(i):
+
+    row = PICK_INDEX["rows"][i]
+    brain = PICK_INDEX["brain"][i]
+
+    return {
+        "no": row[COL_NO],
+        "home": row[COL_HOME],
+        "away": row[COL_AWAY],
+        "EV": PICK_INDEX["sec"][i]["score"],
+        "confidence": brain["confidence"],
+        "추천": brain["추천"]
+    }
+
+
+@app.get("/elite-picks")
+def elite_picks(min_ev: float = 0.05,
+                min_conf: float = 0.45,
+                limit: int = None,
+                cursor: str = None,
+                sort: str = None,
+                order: str = None):
+
+    if CURRENT_DF.empty or not PICK_INDEX:
+        return []
+
+    def positions():
+        return np.flatnonzero(
+            (PICK_INDEX["sample"] >= 20) &
+            (PICK_INDEX["ev"] >= min_ev) &
+            (PICK_INDEX["conf"] >= min_conf)
+        )
+
+    # 기본 정렬: confidence → EV 내림차순 (기존 동일)
+    if limit is None and cursor is None and sort is None:
+        ordered = sorted_positions(
+            ("elite-picks", min_ev, min_conf), positions, "confidence", None
+        )
+        return [elite_item(i) for i in ordered]
+
+    return paginate(
+        ("elite-picks", min_ev, min_conf),
+        positions, elite_item, sort or "confidence", order, limit, cursor
+    )
+
+# =====================================================
+# 백그라운드 작업 (프로세스 풀)
+# 무거운 백테스트는 별도 프로세스에서 실행 → 스레드풀/GIL 점유 방지
+# 결과는 (작업종류, 파라미터, 데이터 버전) 단위로 캐시
+# 작업에는 데이터 원본 (종류, 경로, 버전) 만 전달 → 워커가 버전별 1회 적재 후 재사용
+# =====================================================
+
+def get_job_pool():
+
+    global JOB_POOL
+
+    with JOB_POOL_LOCK:
+
+        if JOB_POOL is None:
+            # 워커는 main 을 다시 import → initializer 표시로 초기 적재 생략 (데이터는 job_state 로 적재)
+            JOB_POOL = ProcessPoolExecutor(
+                max_workers=JOB_WORKERS,
+                mp_context=JOB_CONTEXT,
+                initializer=job_worker.init_worker
+            )
+
+        return JOB_POOL
+
+
+def pool_submit(fn, *args):
+
+    global JOB_POOL
+
+    pool = get_job_pool()
+
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        with JOB_POOL_LOCK:
+            if JOB_POOL is pool:
+                JOB_POOL = None
+        return get_job_pool().submit(fn, *args)
+
+
+def job_source():
+
+    # sqlite: 저장소 파일, memory: 현재 데이터 pickle (버전당 1회, 직전 버전 1개 유지)
+    version = DATA_VERSION
+
+    if store_ready():
+        return ("sqlite", STORE_PATH, version)
+
+    with JOB_SOURCE_LOCK:
+
+        source = JOB_SOURCES.get(version)
+        if source is not None:
+            return source
+
+        if JOB_DIR["path"] is None:
+            JOB_DIR["path"] = tempfile.mkdtemp(prefix="secretcore_jobs_")
+
+        path = os.path.join(JOB_DIR["path"], f"data-v{version:06d}.pkl")
+        CURRENT_DF.to_pickle(path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+        source = JOB_SOURCES[version] = ("memory", path, version)
+
+        for old in sorted(JOB_SOURCES)[:-2]:
+            os.remove(JOB_SOURCES.pop(old)[1])
+
+        return source
 
-    def match_list_html(df, box_id, reverse=False):
 
-        df = df.assign(
-            __no_numeric=pd.to_numeric(df.iloc[:, COL_NO], errors="coerce")
-        ).sort_values(
-            by="__no_numeric",
-            ascending=False
-        ).head(20)
+def job_state(source):
 
-        html = ""
+    # 작업 프로세스: 원본이 바뀔 때만 서버와 같은 방식으로 적재 + 캐시 재생성
+    global CURRENT_DF
 
-        for _, r in df.iterrows():
+    if JOB_STATE["source"] == source:
+        return
 
-            html += f"""
-            <div style="font-size:12px;
-            border-bottom:1px solid #334155;
-            padding:6px 0;">
+    DIST_CACHE.clear()
+    SECRET_CACHE.clear()
 
-            {r.iloc[COL_YEAR]} ·
-            {r.iloc[COL_ROUND]} ·
-            {r.iloc[COL_LEAGUE]} ·
+    if source[0] == "sqlite":
+        load_store()
+    else:
+        CURRENT_DF = encode_frame(pd.read_pickle(source[1]))
+        rebuild_caches(CURRENT_DF)
 
-            {r.iloc[COL_HOME]} vs {r.iloc[COL_AWAY]} ·
+    JOB_STATE["source"] = source
 
-            {r.iloc[COL_TYPE]} ·
-            {r.iloc[COL_HOMEAWAY]} ·
-            {r.iloc[COL_GENERAL]} ·
-            {r.iloc[COL_DIR]} ·
-            {r.iloc[COL_HANDI]}
 
-            {result_circle(r.iloc[COL_RESULT], reverse)}
+def clear_job_sources():
 
-            </div>
-            """
+    if JOB_DIR["path"] is not None:
+        shutil.rmtree(JOB_DIR["path"], ignore_errors=True)
 
-        return f"""
-        <button onclick="toggleBox('{box_id}')">
-        경기목록 보기/숨기기
-        </button>
-        <div id="{box_id}" style="display:none;margin-top:10px;">
-        {html if html else "경기 없음"}
-        </div>
-        """
 
-    # ======================================================
-    # 카드1 (유형 필터 추가 완료)
-    # ======================================================
+def prune_jobs():
 
-    team_home_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_HOME] == team) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+    # 이전 버전 결과 제거
+    for key in [k for k in JOB_RESULTS if k[2] != DATA_VERSION]:
+        del JOB_RESULTS[key]
+
+    if len(JOBS) <= JOB_MAX:
+        return
 
-    team_away_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_AWAY] == team) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
+    finished = [
+        job_id for job_id, job in JOBS.items()
+        if job["future"].done()
     ]
 
-    dist_home = distribution(team_home_df)
-    dist_away = distribution(team_away_df)
+    for job_id in finished[:len(JOBS) - JOB_MAX]:
+        JOBS.pop(job_id, None)
 
-    # ======================================================
-    # 카드2 (원문 그대로)
-    # ======================================================
 
-    team_5cond_df = CURRENT_DF[
-        (
-            (CURRENT_DF.iloc[:, COL_HOME] == team) |
-            (CURRENT_DF.iloc[:, COL_AWAY] == team)
-        ) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_HOMEAWAY] == row.iloc[COL_HOMEAWAY]) &
-        (CURRENT_DF.iloc[:, COL_GENERAL] == row.iloc[COL_GENERAL]) &
-        (CURRENT_DF.iloc[:, COL_DIR] == row.iloc[COL_DIR]) &
-        (CURRENT_DF.iloc[:, COL_HANDI] == row.iloc[COL_HANDI]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+def submit_job(kind, params, fn, *args):
 
-    team_5cond_league_df = team_5cond_df[
-        team_5cond_df.iloc[:, COL_LEAGUE] == league
-    ]
+    # 요청 스레드에서 호출 (원본 준비는 잠금 밖), fn(원본, *args) 는 작업 프로세스에서 실행
+    source = job_source()
+    key = (kind, tuple(sorted(params.items())), source[2])
 
-    dist_5cond = distribution(team_5cond_df)
-    dist_5cond_league = distribution(team_5cond_league_df)
+    with JOB_LOCK:
 
-    # ======================================================
-    # 카드3 (상위 토글 추가)
-    # ======================================================
+        job_id = JOB_RESULTS.get(key)
 
-    team_general_df = CURRENT_DF[
-        (
-            (CURRENT_DF.iloc[:, COL_HOME] == team) |
-            (CURRENT_DF.iloc[:, COL_AWAY] == team)
-        ) &
-        (CURRENT_DF.iloc[:, COL_TYPE] == row.iloc[COL_TYPE]) &
-        (CURRENT_DF.iloc[:, COL_HOMEAWAY] == row.iloc[COL_HOMEAWAY]) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+        if job_id in JOBS:
+            job = JOBS[job_id]
+            if not job["future"].done() or job_status(job) == "done":
+                return job
 
-    general_groups = team_general_df.groupby(
-        team_general_df.iloc[:, COL_GENERAL]
-    )
+        prune_jobs()
 
-    general_html = ""
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "params": params,
+            "version": source[2],
+            "created": time.time(),
+            "future": pool_submit(fn, source, *args)
+        }
 
-    for gen, group in general_groups:
+        JOBS[job["id"]] = job
+        JOB_RESULTS[key] = job["id"]
 
-        dist = distribution(group)
-        box_id = f"gen_{gen}"
+        return job
 
-        general_html += f"""
-        <div style="background:#1e293b;padding:16px;border-radius:16px;margin-top:20px;">
 
-        <h3>카드3 - 일반 {gen} ({dist["총"]}경기)</h3>
+def job_status(job):
 
-        <div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
-        조건: 팀={team} · 유형={row.iloc[COL_TYPE]} ·
-        {row.iloc[COL_HOMEAWAY]} · 일반={gen}
-        </div>
+    future = job["future"]
 
-        <div>승 {dist["wp"]}% ({dist["승"]}경기)</div>
-        {bar_html(dist["wp"],"win",reverse_mode)}
-        <div>무 {dist["dp"]}% ({dist["무"]}경기)</div>
-        {bar_html(dist["dp"],"draw",reverse_mode)}
-        <div>패 {dist["lp"]}% ({dist["패"]}경기)</div>
-        {bar_html(dist["lp"],"lose",reverse_mode)}
+    if not future.done():
+        return "running" if future.running() else "pending"
 
-        {match_list_html(group, box_id, reverse_mode)}
+    return "error" if future.exception() else "done"
 
-        </div>
-        """
 
-    # ======================================================
-    # HTML 출력
-    # ======================================================
+def job_info(job):
 
-    return f"""
-<html>
-<body style="background:#0f1720;color:white;font-family:Arial;padding:20px;">
+    status = job_status(job)
 
-<div style="display:flex;justify-content:space-between;align-items:center;">
-<h2>[{league}] {home_team} vs {away_team}</h2>
-<div style="display:flex;gap:12px;">
-<a href="/page3?no={no}&away=0" style="color:#38bdf8;">홈팀분석</a>
-<a href="/page3?no={no}&away=1" style="color:#38bdf8;">원정팀분석</a>
-<a href="/page4?no={no}" style="color:#38bdf8;">배당분석</a>
-</div>
-</div>
+    info = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "params": job["params"],
+        "version": job["version"],
+        "status": status,
+        "created": round(job["created"], 3)
+    }
 
-<div style="opacity:0.7;font-size:13px;margin-bottom:15px;">
-해당경기 조건: {match_condition}<br>
-배당: {odds_text}<br>
-{page_title} - {team}
-</div>
+    if status == "done":
+        info["result"] = job["future"].result()
+    elif status == "error":
+        info["error"] = str(job["future"].exception())
 
-<!-- 카드1 -->
-<div style="display:flex;gap:20px;flex-wrap:wrap;">
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드1 - 팀 홈 경기 ({dist_home["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
-조건: 유형={row.iloc[COL_TYPE]} · 팀={team} · 홈경기
-</div>
-<div>승 {dist_home["wp"]}% ({dist_home["승"]}경기)</div>
-{bar_html(dist_home["wp"],"win",reverse_mode)}
-<div>무 {dist_home["dp"]}% ({dist_home["무"]}경기)</div>
-{bar_html(dist_home["dp"],"draw",reverse_mode)}
-<div>패 {dist_home["lp"]}% ({dist_home["패"]}경기)</div>
-{bar_html(dist_home["lp"],"lose",reverse_mode)}
-{match_list_html(team_home_df,"c1_home",reverse_mode)}
-</div>
+    return info
 
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드1 - 팀 원정 경기 ({dist_away["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
-조건: 유형={row.iloc[COL_TYPE]} · 팀={team} · 원정경기
-</div>
-<div>승 {dist_away["wp"]}% ({dist_away["승"]}경기)</div>
-{bar_html(dist_away["wp"],"win",reverse_mode)}
-<div>무 {dist_away["dp"]}% ({dist_away["무"]}경기)</div>
-{bar_html(dist_away["dp"],"draw",reverse_mode)}
-<div>패 {dist_away["lp"]}% ({dist_away["패"]}경기)</div>
-{bar_html(dist_away["lp"],"lose",reverse_mode)}
-{match_list_html(team_away_df,"c1_away",reverse_mode)}
-</div>
-</div>
 
-<br>
+async def wait_job(job, wait):
 
-<!-- 카드2 -->
-<div style="display:flex;gap:20px;flex-wrap:wrap;">
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드2 - 팀 5조건 전체 ({dist_5cond["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
-조건: 팀={team} · 동일 5조건
-</div>
-<div>승 {dist_5cond["wp"]}% ({dist_5cond["승"]}경기)</div>
-{bar_html(dist_5cond["wp"],"win",reverse_mode)}
-<div>무 {dist_5cond["dp"]}% ({dist_5cond["무"]}경기)</div>
-{bar_html(dist_5cond["dp"],"draw",reverse_mode)}
-<div>패 {dist_5cond["lp"]}% ({dist_5cond["패"]}경기)</div>
-{bar_html(dist_5cond["lp"],"lose",reverse_mode)}
-{match_list_html(team_5cond_df,"c2_all",reverse_mode)}
-</div>
+    if wait and wait > 0 and not job["future"].done():
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(job["future"])), wait
+            )
+        except asyncio.TimeoutError:
+            pass
+        except Exception:
+            pass
 
-<div style="flex:1;background:#1e293b;padding:16px;border-radius:16px;">
-<h3>카드2 - 동일리그 5조건 ({dist_5cond_league["총"]}경기)</h3>
-<div style="font-size:12px;opacity:0.7;margin-bottom:8px;">
-조건: 팀={team} · 동일리그
-</div>
-<div>승 {dist_5cond_league["wp"]}% ({dist_5cond_league["승"]}경기)</div>
-{bar_html(dist_5cond_league["wp"],"win",reverse_mode)}
-<div>무 {dist_5cond_league["dp"]}% ({dist_5cond_league["무"]}경기)</div>
-{bar_html(dist_5cond_league["dp"],"draw",reverse_mode)}
-<div>패 {dist_5cond_league["lp"]}% ({dist_5cond_league["패"]}경기)</div>
-{bar_html(dist_5cond_league["lp"],"lose",reverse_mode)}
-{match_list_html(team_5cond_league_df,"c2_league",reverse_mode)}
-</div>
-</div>
+    return job_info(job)
 
-<br>
 
-<!-- 카드3 -->
-<button onclick="toggleBox('card3_all')">
-카드3 - 일반구분 분포 보기/숨기기
-</button>
+async def job_response(job, wait):
 
-<div id="card3_all" style="display:none;">
-{general_html}
-</div>
+    # 대기 시간 안에 끝나면 기존 응답 그대로, 아니면 202 + job_id
+    info = await wait_job(job, wait)
 
-<br><br>
-<button onclick="history.back()">← 뒤로가기</button>
+    if info["status"] == "done":
+        return info["result"]
 
-<script>
-function toggleBox(id){
-    var el=document.getElementById(id);
-    if(el.style.display==="none"){el.style.display="block";}
-    else{el.style.display="none";}
-}
-</script>
+    if info["status"] == "error":
+        return JSONResponse(status_code=500, content=info)
 
-</body>
-</html>
-"""
+    info["poll"] = f"/jobs/{job['id']}"
+    return JSONResponse(status_code=202, content=info)
+
+
+@app.get("/jobs")
+def jobs_list():
+
+    return [
+        {k: v for k, v in job_info(job).items() if k != "result"}
+        for job in JOBS.values()
+    ]
+
+
+@app.get("/jobs/{job_id}")
+async def job_detail(job_id: str, wait: float = 0):
+
+    job = JOBS.get(job_id)
+
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "job not found"})
+
+    return await wait_job(job, min(wait, 60))
 
 # =====================================================
-# Page4 - 배당 분석
+# 파일 분석 API (/analyze, /my-analyses)
+# Bearer JWT (SECRET_KEY) 사용자별 CSV/Excel 프로파일
+# 파싱은 작업 프로세스 풀에서 청크 단위 스트리밍 → 큰 파일도 이벤트 루프 비차단
+# 이력은 (user_id, created_at, id) 인덱스 keyset 페이지
 # =====================================================
 
-@app.get("/page4", response_class=HTMLResponse)
-def page4_view(no: str = None):
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+JWT_ALGORITHM = os.getenv("SECRETCORE_JWT_ALGORITHM", "HS256")
 
-    if not no:
-        return "<h2>잘못된 접근</h2>"
-    if CURRENT_DF.empty:
-        return "<h2>데이터 없음</h2>"
+ANALYZE_CHUNK = 50000
+ANALYZE_SUFFIXES = (".csv", ".xlsx")
+ANALYSIS_PAGE_MAX = 100
 
-    row_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_NO] == str(no)]
-    if row_df.empty:
-        return "<h2>경기 없음</h2>"
+ANALYSIS_DB = {"ready": False}
+ANALYSIS_DB_LOCK = threading.Lock()
 
-    row = row_df.iloc[0]
 
-    home = row.iloc[COL_HOME]
-    away = row.iloc[COL_AWAY]
-    league = row.iloc[COL_LEAGUE]
+def analysis_db():
 
-    type_val = row.iloc[COL_TYPE]
-    win_odds  = row.iloc[COL_WIN_ODDS]
-    draw_odds = row.iloc[COL_DRAW_ODDS]
-    lose_odds = row.iloc[COL_LOSE_ODDS]
+    # 테이블/인덱스 1회 생성 (기존 테이블에도 복합 인덱스 추가)
+    if not ANALYSIS_DB["ready"]:
+        with ANALYSIS_DB_LOCK:
+            if not ANALYSIS_DB["ready"]:
+                Base.metadata.create_all(bind=engine)
+                for index in AnalysisRecord.__table__.indexes:
+                    index.create(bind=engine, checkfirst=True)
+                ANALYSIS_DB["ready"] = True
 
-    # =========================================================
-    # 공통 함수 (페이지3 동일)
-    # =========================================================
+    return SessionLocal()
 
-    def distribution(df):
-        total = len(df)
-        if total == 0:
-            return {"총":0,"승":0,"무":0,"패":0,"wp":0,"dp":0,"lp":0}
-        win  = (df.iloc[:, COL_RESULT] == "승").sum()
-        draw = (df.iloc[:, COL_RESULT] == "무").sum()
-        lose = (df.iloc[:, COL_RESULT] == "패").sum()
-        return {
-            "총":total,
-            "승":win,
-            "무":draw,
-            "패":lose,
-            "wp":round(win/total*100,2),
-            "dp":round(draw/total*100,2),
-            "lp":round(lose/total*100,2)
-        }
 
-    def result_circle(result):
-        color_map = {"승":"#3b82f6","무":"#22c55e","패":"#ef4444"}
-        color = color_map.get(result, "#64748b")
-        return f"""
-        <span style="
-            display:inline-flex;
-            align-items:center;
-            justify-content:center;
-            width:22px;height:22px;
-            border-radius:50%;
-            background:{color};
-            color:white;font-size:12px;
-            font-weight:bold;margin-left:6px;">
-            {result}
-        </span>
-        """
+def token_user(authorization):
+
+    # 반환: (승인된 User, None) 또는 (None, 오류 응답)
+    # 이 서버는 토큰을 발급하지 않음 (/login 은 폼 세션만) → 별도 인증 서버 발급 토큰 사용
+    if not SECRET_KEY or jwt is None:
+        return None, auth_error(501, "토큰 인증 미설정: SECRET_KEY 와 python-jose 필요")
+
+    scheme, _, token = (authorization or "").partition(" ")
+
+    if scheme.lower() != "bearer" or not token:
+        return None, auth_error(
+            401, "Bearer 토큰 필요 (/login 은 토큰을 발급하지 않음, 인증 서버 발급 JWT 사용)"
+        )
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None, auth_error(401, "토큰 검증 실패 (서명/만료 확인)")
 
-    def match_list_html(df, box_id):
+    db = analysis_db()
+    try:
+        user = db.query(User).filter(User.username == payload.get("sub")).first()
+        if user is None or not user.is_approved:
+            return None, auth_error(401, "승인된 사용자가 아님")
+        db.expunge(user)
+        return user, None
+    finally:
+        db.close()
 
-        df = df.assign(
-            __no_numeric=pd.to_numeric(df.iloc[:, COL_NO], errors="coerce")
-        ).sort_values(by="__no_numeric", ascending=False).head(20)
 
-        html = ""
-        for _, r in df.iterrows():
-            html += f"""
-            <div style="font-size:12px;border-bottom:1px solid #334155;padding:6px 0;">
-            {r.iloc[COL_YEAR]} · {r.iloc[COL_ROUND]} · {r.iloc[COL_LEAGUE]} ·
-            {r.iloc[COL_HOME]} vs {r.iloc[COL_AWAY]} ·
-            {r.iloc[COL_TYPE]} · {r.iloc[COL_HOMEAWAY]} ·
-            {r.iloc[COL_GENERAL]} · {r.iloc[COL_DIR]} · {r.iloc[COL_HANDI]}
-            {result_circle(r.iloc[COL_RESULT])}
-            </div>
-            """
+def auth_error(status, message):
 
-        return f"""
-        <button onclick="toggleBox('{box_id}')">경기목록</button>
-        <div id="{box_id}" style="display:none;margin-top:8px;">
-        {html if html else "경기 없음"}
-        </div>
-        """
+    headers = {"WWW-Authenticate": "Bearer"} if status == 401 else None
+    return JSONResponse(status_code=status, content={"error": message}, headers=headers)
 
-    # =========================================================
-    # 카드1 : 유형 + 승무패 완전일치
-    # =========================================================
 
-    card1_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_TYPE] == type_val) &
-        (CURRENT_DF.iloc[:, COL_WIN_ODDS] == win_odds) &
-        (CURRENT_DF.iloc[:, COL_DRAW_ODDS] == draw_odds) &
-        (CURRENT_DF.iloc[:, COL_LOSE_ODDS] == lose_odds) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+def iter_csv_chunks(path):
+    yield from pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        dtype=str,
+        chunksize=ANALYZE_CHUNK,
+        low_memory=False
+    )
 
-    dist1 = distribution(card1_df)
 
-    # =========================================================
-    # 카드2
-    # =========================================================
+def iter_xlsx_chunks(path):
 
-    card2_win_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_TYPE] == type_val) &
-        (CURRENT_DF.iloc[:, COL_WIN_ODDS] == win_odds) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+    from openpyxl import load_workbook
 
-    dist2_win = distribution(card2_win_df)
+    # read_only: 시트를 행 단위로 읽음 (전체 셀 객체 미생성)
+    book = load_workbook(path, read_only=True, data_only=True)
 
-    # =========================================================
-    # 카드3
-    # =========================================================
+    try:
+        rows = book.active.iter_rows(values_only=True)
+        header = next(rows, None)
 
-    card3_draw_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_TYPE] == type_val) &
-        (CURRENT_DF.iloc[:, COL_DRAW_ODDS] == draw_odds) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+        if header is None:
+            return
 
-    dist3_draw = distribution(card3_draw_df)
+        names = [
+            str(h) if h is not None else f"column_{i + 1}"
+            for i, h in enumerate(header)
+        ]
+        n = len(names)
 
-    # =========================================================
-    # 카드4
-    # =========================================================
+        buffer = []
+        yielded = False
 
-    card4_lose_df = CURRENT_DF[
-        (CURRENT_DF.iloc[:, COL_TYPE] == type_val) &
-        (CURRENT_DF.iloc[:, COL_LOSE_ODDS] == lose_odds) &
-        (CURRENT_DF.iloc[:, COL_RESULT] != "경기전")
-    ]
+        for values in rows:
+            buffer.append(tuple(values[:n]) + (None,) * (n - len(values)))
+            if len(buffer) >= ANALYZE_CHUNK:
+                yield pd.DataFrame(buffer, columns=names)
+                buffer = []
+                yielded = True
 
-    dist4_lose = distribution(card4_lose_df)
+        if buffer or not yielded:
+            yield pd.DataFrame(buffer, columns=names)
 
-    # =========================================================
-    # HTML 출력
-    # =========================================================
+    finally:
+        book.close()
 
-    return f"""
-<html>
-<body style="background:#0f1720;color:white;font-family:Arial;padding:20px;">
 
-<h2>[{league}] {home} vs {away}</h2>
+def profile_file(path, suffix):
 
-<div style="display:flex;gap:12px;margin-bottom:10px;">
-<a href="/page3?no={no}&away=0" style="color:#38bdf8;">홈팀분석</a>
-<a href="/page3?no={no}&away=1" style="color:#38bdf8;">원정팀분석</a>
-<a href="/page4?no={no}" style="color:#38bdf8;">배당분석</a>
-</div>
+    # 작업 프로세스에서 실행: 청크별 누적 → 컬럼별 결측/숫자 요약
+    start = time.perf_counter()
+    chunks = iter_xlsx_chunks(path) if suffix == ".xlsx" else iter_csv_chunks(path)
 
-<div style="opacity:0.7;margin-bottom:20px;">
-유형: {type_val} <br>
-배당: 승 {win_odds} · 무 {draw_odds} · 패 {lose_odds}
-</div>
+    names = []
+    stats = []
+    rows = 0
 
-<h3>카드1 - 유형+승무패 완전일치 ({dist1["총"]}경기)</h3>
-{match_list_html(card1_df,"c1")}
+    for chunk in chunks:
 
-<h3>카드2 - 유형+승 완전일치 ({dist2_win["총"]}경기)</h3>
-{match_list_html(card2_win_df,"c2")}
+        if not names:
+            names = [str(c) for c in chunk.columns]
+            stats = [
+                {"non_null": 0, "numeric": 0, "min": None, "max": None, "sum": 0.0}
+                for _ in names
+            ]
 
-<h3>카드3 - 유형+무 완전일치 ({dist3_draw["총"]}경기)</h3>
-{match_list_html(card3_draw_df,"c3")}
+        rows += len(chunk)
 
-<h3>카드4 - 유형+패 완전일치 ({dist4_lose["총"]}경기)</h3>
-{match_list_html(card4_lose_df,"c4")}
+        for j, stat in enumerate(stats):
 
-<br><br>
-<button onclick="history.back()">← 뒤로가기</button>
+            # 숫자 변환은 고유값만 (frame_codes 와 같은 방식)
+            codes, uniques = pd.factorize(chunk.iloc[:, j])
+            codes = codes[codes >= 0]
 
-<script>
-function toggleBox(id){{
-    var el=document.getElementById(id);
-    if(el.style.display==="none"){{el.style.display="block";}}
-    else{{el.style.display="none";}}
-}}
-</script>
+            numeric = pd.to_numeric(
+                pd.Series(uniques, dtype=object), errors="coerce"
+            ).to_numpy(dtype=float)[codes]
+            numeric = numeric[~np.isnan(numeric)]
 
-</body>
-</html>
-"""
+            stat["non_null"] += len(codes)
 
-# =====================================================
-# 고신뢰도 시크릿픽 전용 API
-# =====================================================
+            if len(numeric):
+                low, high = float(numeric.min()), float(numeric.max())
+                stat["numeric"] += len(numeric)
+                stat["sum"] += float(numeric.sum())
+                stat["min"] = low if stat["min"] is None else min(stat["min"], low)
+                stat["max"] = high if stat["max"] is None else max(stat["max"], high)
 
-@app.get("/high-confidence")
-def high_confidence(min_conf: float = MIN_CONFIDENCE):
+    return {
+        "rows": rows,
+        "columns": len(names),
+        "column_names": names,
+        "profile": [
+            {
+                "name": name,
+                "non_null": stat["non_null"],
+                "missing": rows - stat["non_null"],
+                "numeric": stat["numeric"],
+                "min": stat["min"],
+                "max": stat["max"],
+                "mean": round(stat["sum"] / stat["numeric"], 6) if stat["numeric"] else None
+            }
+            for name, stat in zip(names, stats)
+        ],
+        "seconds": round(time.perf_counter() - start, 6)
+    }
 
-    if CURRENT_DF.empty:
-        return []
 
-    result = []
+def analysis_item(record):
+    return {
+        "id": record.id,
+        "filename": record.filename,
+        "rows": record.total_rows,
+        "columns": record.total_columns,
+        "column_names": json.loads(record.columns or "[]"),
+        "created_at": record.created_at.isoformat()
+    }
 
-    base_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] == "경기전"]
 
-    for _, row in base_df.iterrows():
+def save_analysis(user_id, filename, result):
 
-        brain = secret_pick_brain(row, CURRENT_DF)
+    db = analysis_db()
+    try:
+        record = AnalysisRecord(
+            filename=filename,
+            total_rows=result["rows"],
+            total_columns=result["columns"],
+            columns=json.dumps(result["column_names"], ensure_ascii=False),
+            user_id=user_id
+        )
+        db.add(record)
+        db.commit()
+        db.refresh(record)
+        return analysis_item(record)
+    finally:
+        db.close()
 
-        if brain["confidence"] >= min_conf:
 
-            result.append({
-                "no": row.iloc[COL_NO],
-                "home": row.iloc[COL_HOME],
-                "away": row.iloc[COL_AWAY],
-                "추천": brain["추천"],
-                "confidence": brain["confidence"],
-                "sample": brain["sample"]
-            })
+async def run_profile(path, suffix):
+    return await asyncio.wrap_future(pool_submit(profile_file, path, suffix))
 
-    return result
 
-# =====================================================
-# EV 기준 상위 경기 추출 API
-# =====================================================
+@app.post("/analyze")
+async def analyze(request: Request, file: UploadFile = File(...)):
 
-@app.get("/top-ev")
-def top_ev(limit: int = 20):
+    user, error = await asyncio.to_thread(token_user, request.headers.get("Authorization"))
+    if error is not None:
+        return error
 
-    if CURRENT_DF.empty:
-        return []
+    filename = file.filename or "upload"
+    suffix = os.path.splitext(filename)[1].lower()
 
-    candidates = []
+    if suffix not in ANALYZE_SUFFIXES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"지원 형식: {', '.join(ANALYZE_SUFFIXES)} (xls 는 xlsx 로 저장)"}
+        )
 
-    base_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] == "경기전"]
+    # 업로드 본문 → 임시 파일 (작업 프로세스에 경로만 전달)
+    tmp = tempfile.NamedTemporaryFile(prefix="secretcore_analyze_", suffix=suffix, delete=False)
 
-    for _, row in base_df.iterrows():
+    try:
+        with tmp:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, tmp, 1024 * 1024)
 
-        key = (
-            row.iloc[COL_TYPE],
-            row.iloc[COL_HOMEAWAY],
-            row.iloc[COL_GENERAL],
-            row.iloc[COL_DIR],
-            row.iloc[COL_HANDI]
-        )
+        try:
+            result = await run_profile(tmp.name, suffix)
+        except Exception as e:
+            return JSONResponse(status_code=400, content={"error": f"파일 분석 실패: {e}"})
 
-        dist = FIVE_COND_DIST.get(key)
+    finally:
+        os.remove(tmp.name)
 
-        if not dist or dist["총"] < 10:
-            continue
+    record = await asyncio.to_thread(save_analysis, user.id, filename, result)
 
-        ev_data = safe_ev(dist, row)
-        best_ev = max(ev_data["EV"].values())
-
-        candidates.append({
-            "no": row.iloc[COL_NO],
-            "home": row.iloc[COL_HOME],
-            "away": row.iloc[COL_AWAY],
-            "추천": ev_data["추천"],
-            "EV": round(best_ev, 4),
-            "sample": dist["총"]
-        })
+    return {**record, **result}
 
-    return sorted(candidates, key=lambda x: x["EV"], reverse=True)[:limit]
 
-# =====================================================
-# 고EV + 고신뢰도 복합 필터 API
-# =====================================================
+def analysis_cursor(text):
 
-@app.get("/elite-picks")
-def elite_picks(min_ev: float = 0.05,
-                min_conf: float = 0.45):
+    # cursor = "<created_at ISO>|<id>"
+    created, _, record_id = text.rpartition("|")
+    return datetime.fromisoformat(created), int(record_id)
 
-    if CURRENT_DF.empty:
-        return []
 
-    result = []
+@app.get("/my-analyses")
+def my_analyses(request: Request, limit: int = 20, cursor: str = None):
 
-    base_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] == "경기전"]
+    user, error = token_user(request.headers.get("Authorization"))
+    if error is not None:
+        return error
 
-    for _, row in base_df.iterrows():
+    if not 1 <= limit <= ANALYSIS_PAGE_MAX:
+        return JSONResponse(status_code=400, content={"error": f"limit 은 1~{ANALYSIS_PAGE_MAX}"})
 
-        key = (
-            row.iloc[COL_TYPE],
-            row.iloc[COL_HOMEAWAY],
-            row.iloc[COL_GENERAL],
-            row.iloc[COL_DIR],
-            row.iloc[COL_HANDI]
-        )
+    db = analysis_db()
 
-        dist = FIVE_COND_DIST.get(key)
+    try:
+        query = db.query(AnalysisRecord).filter(AnalysisRecord.user_id == user.id)
 
-        if not dist or dist["총"] < 20:
-            continue
+        if cursor:
+            try:
+                created, record_id = analysis_cursor(cursor)
+            except ValueError:
+                return JSONResponse(status_code=400, content={"error": "cursor 형식 오류"})
 
-        ev_data = safe_ev(dist, row)
-        best_ev = max(ev_data["EV"].values())
+            query = query.filter(or_(
+                AnalysisRecord.created_at < created,
+                and_(AnalysisRecord.created_at == created, AnalysisRecord.id < record_id)
+            ))
 
-        brain = secret_pick_brain(row, CURRENT_DF)
+        records = query.order_by(
+            AnalysisRecord.created_at.desc(),
+            AnalysisRecord.id.desc()
+        ).limit(limit + 1).all()
 
-        if best_ev >= min_ev and brain["confidence"] >= min_conf:
+    finally:
+        db.close()
 
-            result.append({
-                "no": row.iloc[COL_NO],
-                "home": row.iloc[COL_HOME],
-                "away": row.iloc[COL_AWAY],
-                "EV": round(best_ev, 4),
-                "confidence": brain["confidence"],
-                "추천": brain["추천"]
-            })
+    page = records[:limit]
+    last = page[-1] if len(records) > limit else None
 
-    return sorted(result, key=lambda x: (x["confidence"], x["EV"]), reverse=True)
+    return {
+        "items": [analysis_item(r) for r in page],
+        "count": len(page),
+        "next_cursor": f"{last.created_at.isoformat()}|{last.id}" if last else None
+    }
 
 # =====================================================
 # 전략 성능 시뮬레이션 API (누적 EV 기반)
 # =====================================================
 
-@app.get("/strategy-sim")
-def strategy_sim(min_sample: int = 20):
+def completed_chunks():
 
-    if CURRENT_DF.empty:
-        return {"status": "no data"}
+    # 지연 로드 모드는 완료 경기가 메모리에 없음 → 저장소에서 청크 단위로 읽어 배당 검사
+    if STORE_STATE["lazy"]:
+        for frame in store_chunks(STORE_COMPLETED):
+            unparsed, _ = odds_flags(frame)
+            yield frame[~unparsed]
+        return
+
+    # 검증에서 배당 변환 불가로 확인된 행은 집계에서 제외
+    mask = CURRENT_DF.iloc[:, COL_RESULT].to_numpy() != "경기전"
+    bad = VALIDATION.get("bad_odds")
+    if bad is not None and len(bad) == len(mask):
+        mask &= ~bad
+
+    yield CURRENT_DF[mask]
+
+
+def completed_rows():
+    return itertools.chain.from_iterable(
+        frame.iterrows() for frame in completed_chunks()
+    )
+
+
+def run_strategy_sim(source, min_sample):
+
+    job_state(source)
+    five_cond = FIVE_COND_DIST
 
     total_profit = 0
     bet_count = 0
 
-    completed = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] != "경기전"]
-
-    for _, row in completed.iterrows():
+    for _, row in completed_rows():
 
         key = (
             row.iloc[COL_TYPE],
@@ -1975,7 +5478,7 @@ def strategy_sim(min_sample: int = 20):
             row.iloc[COL_HANDI]
         )
 
-        dist = FIVE_COND_DIST.get(key)
+        dist = five_cond.get(key)
 
         if not dist or dist["총"] < min_sample:
             continue
@@ -2005,22 +5508,40 @@ def strategy_sim(min_sample: int = 20):
         "ROI": roi
     }
 
+
+@app.get("/strategy-sim")
+async def strategy_sim(min_sample: int = 20, wait: float = JOB_WAIT_DEFAULT):
+
+    if CURRENT_DF.empty and not store_ready():
+        return {"status": "no data"}
+
+    job = await asyncio.to_thread(
+        submit_job, "strategy-sim", {"min_sample": min_sample}, run_strategy_sim, min_sample
+    )
+
+    return await job_response(job, wait)
+
 # =====================================================
 # 리스크 등급 분류 API
 # =====================================================
 
 @app.get("/risk-grade")
-def risk_grade(no: str):
+def risk_grade(no: str, window: str = None):
 
     if CURRENT_DF.empty:
         return {"status": "no data"}
 
+    try:
+        span = parse_window(window)
+    except ValueError as e:
+        return {"error": str(e)}
+
     row_df = CURRENT_DF[CURRENT_DF.iloc[:, COL_NO] == str(no)]
     if row_df.empty:
         return {"status": "match not found"}
 
     row = row_df.iloc[0]
-    brain = secret_pick_brain(row, CURRENT_DF)
+    brain = secret_pick_brain(row, CURRENT_DF, span)
 
     conf = brain["confidence"]
 
@@ -2033,75 +5554,272 @@ def risk_grade(no: str):
     else:
         grade = "D"
 
-    return {
-        "home": row.iloc[COL_HOME],
-        "away": row.iloc[COL_AWAY],
-        "confidence": conf,
-        "risk_grade": grade
-    }
+    return {
+        "home": row.iloc[COL_HOME],
+        "away": row.iloc[COL_AWAY],
+        "confidence": conf,
+        "risk_grade": grade
+    }
+
+# =====================================================
+# 회차별 ROI 추적 API
+# =====================================================
+
+def run_round_roi(source):
+
+    job_state(source)
+    five_cond = FIVE_COND_DIST
+
+    # 회차별 [수익, 베팅 수] (청크 단위 순회, 회차 NaN 은 groupby 와 같이 제외)
+    rounds = {}
+
+    for _, row in completed_rows():
+
+        rnd = row.iloc[COL_ROUND]
+
+        if pd.isna(rnd):
+            continue
+
+        stat = rounds.setdefault(rnd, [0, 0])
+
+        key = (
+            row.iloc[COL_TYPE],
+            row.iloc[COL_HOMEAWAY],
+            row.iloc[COL_GENERAL],
+            row.iloc[COL_DIR],
+            row.iloc[COL_HANDI]
+        )
+
+        dist = five_cond.get(key)
+
+        if not dist or dist["총"] < 20:
+            continue
+
+        ev_data = safe_ev(dist, row)
+        pick = ev_data["추천"]
+        actual = row.iloc[COL_RESULT]
+
+        odds_map = {
+            "승": float(row.iloc[COL_WIN_ODDS]),
+            "무": float(row.iloc[COL_DRAW_ODDS]),
+            "패": float(row.iloc[COL_LOSE_ODDS])
+        }
+
+        if pick == actual:
+            stat[0] += odds_map[pick] - 1
+        else:
+            stat[0] -= 1
+
+        stat[1] += 1
+
+    report = []
+
+    for rnd, (profit, bets) in rounds.items():
+
+        roi = round((profit / bets), 4) if bets > 0 else 0
+
+        report.append({
+            "round": rnd,
+            "bets": bets,
+            "ROI": roi
+        })
+
+    return sorted(report, key=lambda x: x["round"])
+
+
+@app.get("/round-roi")
+async def round_roi(wait: float = JOB_WAIT_DEFAULT):
+
+    if CURRENT_DF.empty and not store_ready():
+        return {"status": "no data"}
+
+    job = await asyncio.to_thread(submit_job, "round-roi", {}, run_round_roi)
+
+    return await job_response(job, wait)
+
+# =====================================================
+# 경기전 페이지 사전 렌더링
+# 시작/업로드 직후 /detail, /page3?away=0/1, /page4 를 경기전 전체에 대해
+# 작업 풀에서 렌더 (워커는 데이터 원본을 job_state 로 적재) → gzip 바이트를 버전별 보관
+# 기본 파라미터 요청은 미들웨어가 보관본을 바로 응답
+# =====================================================
+
+PRERENDER_PARAMS = {
+    "/detail": (),
+    "/page3": ("away",),
+    "/page4": ("band",)
+}
+
+def prerender_pages(no):
+    return [
+        (("/detail", no, None), lambda: inspect.unwrap(detail)(no=no)),
+        (("/page3", no, 0), lambda: inspect.unwrap(page3_view)(no=no, away=0)),
+        (("/page3", no, 1), lambda: inspect.unwrap(page3_view)(no=no, away=1)),
+        (("/page4", no, None), lambda: inspect.unwrap(page4_view)(no=no))
+    ]
+
+
+def render_batch(source, nos):
+
+    job_state(source)
+
+    pages = {}
+
+    for no in nos:
+        for key, render in prerender_pages(no):
+            pages[key] = gzip.compress(render().encode("utf-8"), 6)
+
+    return pages
+
+
+def run_prerender(version, batches):
+
+    start = time.perf_counter()
+
+    try:
+        source = job_source()
+
+        # 원본 준비 중 새 업로드가 반영됨 → 새 사전 렌더링이 대신 진행
+        if source[2] != version:
+            return
+
+        pending = deque()
+
+        for i, nos in enumerate(batches):
+
+            pending.append(pool_submit(render_batch, source, nos))
+
+            while pending and (len(pending) >= PRERENDER_WORKERS or i == len(batches) - 1):
+
+                pages = pending.popleft().result()
+
+                if PRERENDER["version"] != version:
+                    for future in pending:
+                        future.cancel()
+                    return
+
+                PRERENDER["pages"].update(pages)
+                PRERENDER["done"] += len(pages)
+                PRERENDER["bytes"] += sum(len(b) for b in pages.values())
+
+    except Exception as exc:
+        PRERENDER["error"] = repr(exc)
+        logging.error(f"[PRERENDER] 실패: {exc!r}")
+
+    if PRERENDER["version"] == version:
+        PRERENDER["seconds"] = round(time.perf_counter() - start, 3)
+        logging.info(
+            f"[PRERENDER] v{version} {PRERENDER['done']}페이지 "
+            f"{PRERENDER['bytes']} bytes {PRERENDER['seconds']}s"
+        )
+        enforce_budgets(["prerender"])
+
+
+def start_prerender():
+
+    if not PRERENDER_ENABLED or not PICK_INDEX:
+        return
+
+    nos = [str(no) for no in PICK_INDEX["frame"].iloc[:, COL_NO].tolist()]
+    batches = [
+        nos[i:i + PRERENDER_BATCH]
+        for i in range(0, len(nos), PRERENDER_BATCH)
+    ]
+
+    PRERENDER.clear()
+    PRERENDER.update({
+        "version": DATA_VERSION,
+        "pages": {},
+        "total": len(nos) * len(prerender_pages(None)),
+        "done": 0,
+        "bytes": 0,
+        "started": time.time(),
+        "seconds": None,
+        "error": None
+    })
+
+    threading.Thread(
+        target=run_prerender,
+        args=(DATA_VERSION, batches),
+        daemon=True
+    ).start()
+
+
+def prerender_key(request):
+
+    path = request.url.path
+    allowed = PRERENDER_PARAMS.get(path)
 
-# =====================================================
-# 회차별 ROI 추적 API
-# =====================================================
+    if allowed is None or request.method != "GET":
+        return None
 
-@app.get("/round-roi")
-def round_roi():
+    params = request.query_params
+    no = params.get("no")
 
-    if CURRENT_DF.empty:
-        return {"status": "no data"}
+    if not no or any(k != "no" and k not in allowed and v for k, v in params.items()):
+        return None
 
-    completed = CURRENT_DF[CURRENT_DF.iloc[:, COL_RESULT] != "경기전"]
+    if path == "/page3":
+        away = params.get("away", "0")
+        return (path, no, int(away)) if away in ("0", "1") else None
 
-    grouped = completed.groupby(completed.iloc[:, COL_ROUND])
+    if path == "/page4" and params.get("band", "0") not in ("0", "0.0"):
+        return None
 
-    report = []
+    return (path, no, None)
 
-    for rnd, group in grouped:
 
-        profit = 0
-        bets = 0
+def prerendered_response(request):
 
-        for _, row in group.iterrows():
+    if PRERENDER.get("version") != DATA_VERSION:
+        return None
 
-            key = (
-                row.iloc[COL_TYPE],
-                row.iloc[COL_HOMEAWAY],
-                row.iloc[COL_GENERAL],
-                row.iloc[COL_DIR],
-                row.iloc[COL_HANDI]
-            )
+    key = prerender_key(request)
+    body = PRERENDER["pages"].get(key) if key else None
 
-            dist = FIVE_COND_DIST.get(key)
+    if body is None:
+        return None
 
-            if not dist or dist["총"] < 20:
-                continue
+    # 라우팅을 거치지 않으므로 메트릭 라벨용 라우트 지정
+    request.scope["route"] = next(
+        r for r in app.routes if getattr(r, "path", None) == key[0]
+    )
 
-            ev_data = safe_ev(dist, row)
-            pick = ev_data["추천"]
-            actual = row.iloc[COL_RESULT]
+    headers = {"X-Prerendered": str(PRERENDER["version"]), "Vary": "Accept-Encoding"}
 
-            odds_map = {
-                "승": float(row.iloc[COL_WIN_ODDS]),
-                "무": float(row.iloc[COL_DRAW_ODDS]),
-                "패": float(row.iloc[COL_LOSE_ODDS])
-            }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
 
-            if pick == actual:
-                profit += odds_map[pick] - 1
-            else:
-                profit -= 1
+    return Response(content=body, media_type="text/html; charset=utf-8", headers=headers)
 
-            bets += 1
 
-        roi = round((profit / bets), 4) if bets > 0 else 0
+def prerender_status():
 
-        report.append({
-            "round": rnd,
-            "bets": bets,
-            "ROI": roi
-        })
+    status = {k: v for k, v in PRERENDER.items() if k != "pages"}
+    status["pages"] = len(PRERENDER.get("pages", {}))
 
-    return sorted(report, key=lambda x: x["round"])
+    return status
+
+# =====================================================
+# 작업 결과 폴링 (202 응답 시 /jobs/{id} long-poll)
+# =====================================================
+
+JOB_FETCH_JS = """
+    async function fetchJob(url){
+        let res = await fetch(url);
+        let data = await res.json();
+        if(res.status !== 202) return data;
+        document.getElementById("content").innerHTML = "계산 중...";
+        while(true){
+            res = await fetch(`/jobs/${data.job_id}?wait=10`);
+            data = await res.json();
+            if(data.status === "done") return data.result;
+            if(data.status === "error") throw new Error(data.error);
+        }
+    }
+"""
 
 # =====================================================
 # Strategy 1 View
@@ -2183,8 +5901,8 @@ def history_view():
     <div id="content"></div>
 
     <script>
-    fetch("/round-roi")
-    .then(res=>res.json())
+    """ + JOB_FETCH_JS + """
+    fetchJob("/round-roi")
     .then(data=>{
         let html="";
         data.forEach(r=>{
@@ -2216,8 +5934,8 @@ def evaluate_view():
     <div id="content"></div>
 
     <script>
-    fetch("/strategy-sim")
-    .then(res=>res.json())
+    """ + JOB_FETCH_JS + """
+    fetchJob("/strategy-sim")
     .then(data=>{
         document.getElementById("content").innerHTML =
         `베팅수: ${data.bets}<br>
@@ -2242,37 +5960,429 @@ def system_report():
     return {
         "rows": len(CURRENT_DF),
         "five_cond_cache": len(FIVE_COND_DIST),
+        "league_cond_cache": len(LEAGUE_COND_DIST),
+        "league_mode": "blend" if LEAGUE_MODE else "weight",
         "league_count": len(LEAGUE_COUNT),
         "league_weight": len(LEAGUE_WEIGHT),
         "favorites": len(FAVORITES),
         "dist_cache": len(DIST_CACHE),
-        "secret_cache": len(SECRET_CACHE)
+        "secret_cache": len(SECRET_CACHE),
+        "condition_cube": {
+            "cells": CONDITION_CUBE.get("cells", 0),
+            "bytes": CONDITION_CUBE.get("bytes", 0),
+            "skipped": len(CONDITION_CUBE.get("skipped", []))
+        },
+        "prerender": prerender_status(),
+        "store": store_status(),
+        "vocab": vocab_status(),
+        "coalesce": COALESCE_STATS
     }
 
 # =====================================================
-# 데이터 정합성 점검
+# 메모리 리포트 / 예산
+# 큰 캐시는 균등 표본으로 항목당 평균 크기를 추정 → 주기적 수집 가능
 # =====================================================
 
-@app.get("/data-validate")
-def data_validate():
+def parse_size(text):
 
-    if CURRENT_DF.empty:
-        return {"status": "no data"}
+    text = text.strip().upper()
+
+    for unit, mult in (("GB", 1024 ** 3), ("MB", 1024 ** 2), ("KB", 1024), ("B", 1)):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * mult)
+
+    return int(float(text))
+
+
+def load_memory_budgets():
+
+    spec = os.getenv("SECRETCORE_MEMORY_BUDGETS", "")
+
+    for part in spec.split(","):
+        if "=" in part:
+            name, size = part.split("=", 1)
+            MEMORY_BUDGETS[name.strip()] = parse_size(size)
+
+
+load_memory_budgets()
+
+
+def deep_sizeof(obj, seen=None):
+
+    if seen is None:
+        seen = set()
+
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+
+    if isinstance(obj, (CountTable, WindowTable)):
+        return obj.nbytes()
+
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        if obj.dtype == object:
+            size += sum(deep_sizeof(x, seen) for x in obj.ravel())
+        return size
+
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        size += sum(
+            deep_sizeof(k, seen) + deep_sizeof(v, seen)
+            for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        first = next(iter(obj), None)
+        if len(obj) > 64 and isinstance(first, (int, float)):
+            # DIST_CACHE 키 같은 긴 숫자 튜플은 첫 원소 기준으로 추정
+            size += len(obj) * sys.getsizeof(first)
+        else:
+            size += sum(deep_sizeof(x, seen) for x in obj)
+    elif hasattr(obj, "__dict__") and not callable(obj):
+        size += deep_sizeof(vars(obj), seen)
+
+    return size
+
+
+def sample_entries(container):
 
-    issues = []
+    # 항목이 많으면 일정 간격으로 약 MEMORY_SAMPLE 개 (크기 추정 / 상위 항목 공용)
+    items = list(container.items() if isinstance(container, dict) else container)
+    step = max(1, len(items) // MEMORY_SAMPLE)
 
-    if CURRENT_DF.shape[1] != EXPECTED_COLS:
-        issues.append("컬럼 수 불일치")
+    return items[::step]
 
-    if CURRENT_DF.iloc[:, COL_RESULT].isnull().sum() > 0:
-        issues.append("결과 컬럼 null 존재")
 
-    if CURRENT_DF.iloc[:, COL_TYPE].isnull().sum() > 0:
-        issues.append("유형 컬럼 null 존재")
+def entry_size(container, item):
 
+    # 항목마다 새 seen → 앞 항목과 공유하는 객체도 각 항목 크기에 포함
+    seen = set()
+
+    if isinstance(container, dict):
+        return deep_sizeof(item[0], seen) + deep_sizeof(item[1], seen)
+
+    return deep_sizeof(item, seen)
+
+
+def estimate_size(container):
+
+    n = len(container)
+
+    if n <= MEMORY_SAMPLE:
+        return deep_sizeof(container)
+
+    sampled = sample_entries(container)
+    per_item = sum(entry_size(container, item) for item in sampled) / len(sampled)
+
+    return sys.getsizeof(container) + int(per_item * n)
+
+
+def job_results():
+    return {
+        job_id: job["future"].result()
+        for job_id, job in list(JOBS.items())
+        if job["future"].done() and not job["future"].exception()
+    }
+
+
+def memory_targets():
     return {
+        "five_cond": FIVE_COND_DIST,
+        "league_cond": LEAGUE_COND_DIST,
+        "odds": ODDS_DIST_CACHE,
+        "league": {"count": LEAGUE_COUNT, "weight": LEAGUE_WEIGHT},
+        "pick_index": PICK_INDEX,
+        "facet_index": FACET_INDEX,
+        "cube": CONDITION_CUBE.get("tables", {}),
+        "condition_rows": CONDITION_ROWS,
+        "odds_index": ODDS_INDEX,
+        "similar_index": SIMILAR_INDEX,
+        "window_index": WINDOW_INDEX.get("tables", {}),
+        "dist": DIST_CACHE,
+        "secret": SECRET_CACHE,
+        "page": PAGE_CACHE,
+        "prerender": PRERENDER.get("pages", {}),
+        "jobs": job_results(),
+        "profiles": PROFILES
+    }
+
+
+def evict_cache(name, fraction):
+
+    # 오래된 항목부터 (dict 삽입 순서) 제거
+    if name == "jobs":
+        cache = {
+            job_id: job for job_id, job in JOBS.items()
+            if job["future"].done()
+        }
+        target = JOBS
+    else:
+        cache = target = {
+            "dist": DIST_CACHE,
+            "secret": SECRET_CACHE,
+            "page": PAGE_CACHE,
+            "prerender": PRERENDER.get("pages", {})
+        }[name]
+
+    count = max(1, int(len(cache) * fraction))
+
+    for key in list(itertools.islice(cache, count)):
+        target.pop(key, None)
+
+    return count
+
+
+def enforce_budgets(names=None, sizes=None):
+
+    warnings = []
+    evicted = {}
+    targets = memory_targets()
+
+    for name, budget in MEMORY_BUDGETS.items():
+
+        if names is not None and name not in names:
+            continue
+
+        if name == "rss":
+            size = process_rss()
+        elif name in targets:
+            size = sizes[name] if sizes and name in sizes else estimate_size(targets[name])
+        else:
+            continue
+
+        if not size or size <= budget:
+            continue
+
+        if name in ("dist", "secret", "page", "prerender", "jobs"):
+            # 예산의 80% 수준까지 줄임
+            fraction = 1 - (budget * 0.8) / size
+            evicted[name] = evict_cache(name, fraction)
+            logging.warning(f"[MEMORY] {name} {size} > {budget} bytes → {evicted[name]}개 제거")
+        else:
+            warnings.append(f"{name}: {size} bytes > 예산 {budget} bytes")
+            logging.warning(f"[MEMORY] {name} {size} > {budget} bytes")
+
+    return warnings, evicted
+
+
+def process_rss():
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def process_peak_rss():
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def dataset_memory():
+
+    # 데이터프레임은 버전 단위로 불변 → 버전별 캐시
+    cached = MEMORY_REPORT_CACHE.get("dataset")
+    if cached and cached[0] == DATA_VERSION:
+        return cached[1]
+
+    usage = CURRENT_DF.memory_usage(deep=True, index=True)
+    report = {
         "rows": len(CURRENT_DF),
-        "issues": issues if issues else "정상"
+        "total_bytes": int(usage.sum()),
+        "columns": {str(k): int(v) for k, v in usage.items()}
+    }
+
+    MEMORY_REPORT_CACHE["dataset"] = (DATA_VERSION, report)
+    return report
+
+
+def top_entries(targets, top):
+
+    # 큰 캐시는 표본 항목 중 상위 (전체 순회 없음)
+    entries = []
+
+    for name in ("dist", "secret", "page", "prerender", "jobs"):
+        cache = targets[name]
+        for key, value in sample_entries(cache):
+            entries.append((entry_size(cache, (key, value)), name, key))
+
+    entries.sort(key=lambda e: e[0], reverse=True)
+
+    return [
+        {"cache": name, "key": repr(key)[:120], "bytes": size}
+        for size, name, key in entries[:top]
+    ]
+
+
+@app.get("/memory-report")
+def memory_report(top: int = 10, enforce: bool = True):
+
+    targets = memory_targets()
+    sizes = {name: estimate_size(obj) for name, obj in targets.items()}
+
+    warnings, evicted = enforce_budgets(sizes=sizes) if enforce else ([], {})
+
+    return {
+        "rss_bytes": process_rss(),
+        "rss_peak_bytes": process_peak_rss(),
+        "dataset": dataset_memory(),
+        "caches": {
+            name: {
+                "entries": len(targets[name]),
+                "bytes": sizes[name],
+                "budget": MEMORY_BUDGETS.get(name)
+            }
+            for name in targets
+        },
+        "top_entries": top_entries(targets, top) if top > 0 else [],
+        "budgets": MEMORY_BUDGETS,
+        "warnings": warnings,
+        "evicted": evicted
+    }
+
+# =====================================================
+# Prometheus 메트릭
+# =====================================================
+
+def metric_labels(**labels):
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_metrics():
+
+    lines = []
+
+    def header(name, kind, text):
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    header("secretcore_http_requests_total", "counter", "HTTP 요청 수")
+    for (route, method, status), n in list(REQUEST_COUNT.items()):
+        lines.append(
+            "secretcore_http_requests_total"
+            f"{metric_labels(route=route, method=method, status=status)} {n}"
+        )
+
+    header("secretcore_http_errors_total", "counter", "처리되지 않은 예외 수")
+    for (route, exc), n in list(ERROR_COUNT.items()):
+        lines.append(
+            "secretcore_http_errors_total"
+            f"{metric_labels(route=route, exception=exc)} {n}"
+        )
+
+    header("secretcore_http_request_duration_seconds", "histogram", "요청 처리 시간")
+    for (route, method), hist in list(LATENCY_HIST.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, hist["buckets"]):
+            cumulative += n
+            lines.append(
+                "secretcore_http_request_duration_seconds_bucket"
+                f"{metric_labels(route=route, method=method, le=bound)} {cumulative}"
+            )
+        labels = metric_labels(route=route, method=method)
+        lines.append(
+            "secretcore_http_request_duration_seconds_bucket"
+            f"{metric_labels(route=route, method=method, le='+Inf')} {hist['count']}"
+        )
+        lines.append(f"secretcore_http_request_duration_seconds_sum{labels} {round(hist['sum'], 6)}")
+        lines.append(f"secretcore_http_request_duration_seconds_count{labels} {hist['count']}")
+
+    header("secretcore_http_requests_in_flight", "gauge", "처리 중인 요청 수")
+    lines.append(f"secretcore_http_requests_in_flight {IN_FLIGHT['value']}")
+
+    with CACHE_STATS_LOCK:
+        cache_stats = {name: list(stats) for name, stats in CACHE_STATS.items()}
+
+    header("secretcore_cache_hits_total", "counter", "캐시 hit 수")
+    for name, (hit, _) in cache_stats.items():
+        lines.append(f"secretcore_cache_hits_total{metric_labels(cache=name)} {hit}")
+
+    header("secretcore_cache_misses_total", "counter", "캐시 miss 수")
+    for name, (_, miss) in cache_stats.items():
+        lines.append(f"secretcore_cache_misses_total{metric_labels(cache=name)} {miss}")
+
+    header("secretcore_cache_entries", "gauge", "캐시 항목 수")
+    for name, cache in (
+        ("five_cond", FIVE_COND_DIST), ("odds", ODDS_DIST_CACHE),
+        ("dist", DIST_CACHE), ("secret", SECRET_CACHE)
+    ):
+        lines.append(f"secretcore_cache_entries{metric_labels(cache=name)} {len(cache)}")
+
+    header("secretcore_coalesced_requests_total", "counter", "single-flight 합류 요청 수")
+    for name, stats in list(COALESCE_STATS.items()):
+        for role, n in stats.items():
+            lines.append(
+                "secretcore_coalesced_requests_total"
+                f"{metric_labels(endpoint=name, role=role)} {n}"
+            )
+
+    header("secretcore_dataset_load_seconds", "gauge", "마지막 데이터 로드 시간")
+    for source, sec in LOAD_SECONDS.items():
+        lines.append(f"secretcore_dataset_load_seconds{metric_labels(source=source)} {sec}")
+
+    header("secretcore_cache_build_seconds", "gauge", "마지막 캐시 생성 시간")
+    for name, sec in BUILD_SECONDS.items():
+        lines.append(f"secretcore_cache_build_seconds{metric_labels(cache=name)} {sec}")
+
+    header("secretcore_dataset_rows", "gauge", "현재 데이터 행 수")
+    lines.append(f"secretcore_dataset_rows {len(CURRENT_DF)}")
+
+    header("secretcore_dataset_version", "gauge", "현재 데이터 버전")
+    lines.append(f"secretcore_dataset_version {DATA_VERSION}")
+
+    header("secretcore_jobs", "gauge", "상태별 백그라운드 작업 수")
+    job_counts = {}
+    for job in list(JOBS.values()):
+        status = job_status(job)
+        job_counts[status] = job_counts.get(status, 0) + 1
+    for status, n in job_counts.items():
+        lines.append(f"secretcore_jobs{metric_labels(status=status)} {n}")
+
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        render_metrics(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+# =====================================================
+# 데이터 정합성 점검
+# =====================================================
+
+@app.get("/data-validate")
+def data_validate():
+
+    # 보고서는 데이터 버전별로 rebuild 시 1회 생성 → 조회만
+    if CURRENT_DF.empty or not VALIDATION:
+        return {"status": "no data"}
+
+    report = {k: v for k, v in VALIDATION.items() if k != "bad_odds"}
+
+    return {
+        **report,
+        "version": DATA_VERSION,
+        "issues": report["issues"] or "정상"
     }
 
 # =====================================================
@@ -2285,12 +6395,14 @@ def cache_clear():
     DIST_CACHE.clear()
     SECRET_CACHE.clear()
     FIVE_COND_DIST.clear()
+    LEAGUE_COND_DIST.clear()
     LEAGUE_COUNT.clear()
     LEAGUE_WEIGHT.clear()
 
-    if not CURRENT_DF.empty:
-        build_five_cond_cache(CURRENT_DF)
-        build_league_weight(CURRENT_DF)
+    if STORE_STATE["lazy"]:
+        rebuild_store_caches(CURRENT_DF)
+    elif not CURRENT_DF.empty:
+        rebuild_caches(CURRENT_DF)
 
     return {
         "status": "cache rebuilt",
@@ -2298,16 +6410,251 @@ def cache_clear():
         "league_weight": len(LEAGUE_WEIGHT)
     }
 
+# =====================================================
+# 요청 프로파일링
+# 관리자 헤더(X-Profile-Token) 또는 로그인 상태의 ?_profile=1 요청은 시작부터,
+# SECRETCORE_PROFILE_SLOW_MS 설정 시 임계값을 넘긴 요청은 그 시점부터
+# 별도 샘플러 스레드가 엔드포인트 스택을 수집 → folded stack 형식으로 보관
+# (speedscope / flamegraph.pl 에서 바로 열림). 둘 다 꺼져 있으면 비용 없음.
+# =====================================================
+
+def profile_requested(scope):
+
+    if b"_profile=1" in scope.get("query_string", b"") and LOGGED_IN:
+        return True
+
+    if PROFILE_TOKEN:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile-token":
+                return value.decode("latin-1") == PROFILE_TOKEN
+
+    return False
+
+
+def endpoint_code(scope):
+
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            endpoint = getattr(route, "endpoint", None)
+            if endpoint is not None:
+                return inspect.unwrap(endpoint).__code__
+            return None
+
+    return None
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(sessions):
+
+    # 임계값 이전 세션만 있으면 스택 수집 생략
+    now = time.perf_counter()
+    due = [s for s in sessions if now - s["start"] >= s["delay"]]
+
+    if not due:
+        return
+
+    frames = sys._current_frames()
+
+    for session in due:
+
+        if session["code"] is None:
+            session["code"] = endpoint_code(session["scope"]) or False
+
+        target = session["code"]
+        if not target:
+            continue
+
+        # 이 요청을 실행 중인 스레드만 (같은 엔드포인트의 다른 요청 제외)
+        frame = frames.get(session["thread"])
+        stack = []
+
+        while frame is not None:
+            stack.append(frame.f_code)
+            if frame.f_code is target:
+                folded = ";".join(frame_label(c) for c in reversed(stack))
+                session["samples"][folded] += 1
+                break
+            frame = frame.f_back
+
+
+def bind_profile_thread(call):
+
+    # 동기 엔드포인트는 스레드풀에서 실행 → 실행 스레드를 세션에 기록
+    @functools.wraps(call)
+    def bound(*args, **kwargs):
+        session = PROFILE_CURRENT.get()
+        if session is not None:
+            session["thread"] = threading.get_ident()
+        return call(*args, **kwargs)
+
+    return bound
+
+
+def bind_profile_routes():
+
+    for route in app.router.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None and not inspect.iscoroutinefunction(route.endpoint):
+            dependant.call = bind_profile_thread(dependant.call)
+
+
+def sampler_loop():
+
+    while True:
+
+        with PROFILE_LOCK:
+            sessions = list(PROFILE_SESSIONS.values())
+            if not sessions:
+                PROFILE_SAMPLER["thread"] = None
+                return
+
+        sample_stacks(sessions)
+        time.sleep(PROFILE_INTERVAL)
+
+
+def start_profile(request, explicit):
+
+    session = {
+        "id": uuid.uuid4().hex[:12],
+        "scope": request.scope,
+        "path": request.url.path,
+        "query": request.url.query,
+        "trigger": "request" if explicit else "slow",
+        "start": time.perf_counter(),
+        "delay": 0 if explicit else PROFILE_SLOW_MS / 1000,
+        "code": None,
+        # async 엔드포인트는 이벤트 루프 스레드, 동기 엔드포인트는 bind_profile_thread 가 교체
+        "thread": threading.get_ident(),
+        "samples": Counter()
+    }
+
+    with PROFILE_LOCK:
+        PROFILE_SESSIONS[session["id"]] = session
+        if PROFILE_SAMPLER["thread"] is None:
+            thread = threading.Thread(target=sampler_loop, daemon=True)
+            PROFILE_SAMPLER["thread"] = thread
+            thread.start()
+
+    return session
+
+
+def finish_profile(session, status, elapsed):
+
+    with PROFILE_LOCK:
+        PROFILE_SESSIONS.pop(session["id"], None)
+
+    if session["trigger"] == "slow" and elapsed * 1000 < PROFILE_SLOW_MS:
+        return
+
+    PROFILES.append({
+        "id": session["id"],
+        "path": session["path"],
+        "query": session["query"],
+        "trigger": session["trigger"],
+        "status": status,
+        "duration_ms": round(elapsed * 1000, 2),
+        "samples": sum(session["samples"].values()),
+        "interval_ms": PROFILE_INTERVAL * 1000,
+        "created": round(time.time(), 3),
+        "folded": "\n".join(
+            f"{stack} {n}" for stack, n in session["samples"].most_common()
+        ) + "\n"
+    })
+
+
+def profile_admin(request):
+    return LOGGED_IN or (
+        PROFILE_TOKEN and request.headers.get("x-profile-token") == PROFILE_TOKEN
+    )
+
+
+@app.get("/profiles")
+def profiles_list(request: Request):
+
+    if not profile_admin(request):
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+
+    return [
+        {k: v for k, v in p.items() if k != "folded"}
+        for p in reversed(PROFILES)
+    ]
+
+
+@app.get("/profiles/{profile_id}")
+def profile_download(profile_id: str, request: Request):
+
+    if not profile_admin(request):
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+
+    for p in PROFILES:
+        if p["id"] == profile_id:
+            return PlainTextResponse(
+                p["folded"],
+                headers={
+                    "Content-Disposition":
+                    f'attachment; filename="profile-{profile_id}.folded"'
+                }
+            )
+
+    return JSONResponse(status_code=404, content={"error": "profile not found"})
+
 # =====================================================
 # 요청 처리 시간 측정 미들웨어
 # =====================================================
 
+def route_label(request):
+    route = request.scope.get("route")
+    return route.path if route is not None else "unmatched"
+
+
+def observe_request(route, method, status, seconds):
+
+    key = (route, method, str(status))
+    REQUEST_COUNT[key] = REQUEST_COUNT.get(key, 0) + 1
+
+    hist = LATENCY_HIST.get((route, method))
+    if hist is None:
+        hist = LATENCY_HIST[(route, method)] = {
+            "buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0
+        }
+
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if seconds <= bound:
+            hist["buckets"][i] += 1
+            break
+
+    hist["sum"] += seconds
+    hist["count"] += 1
+
+
 @app.middleware("http")
 async def process_time_middleware(request, call_next):
-    start_time = time.time()
-    response: Response = await call_next(request)
-    process_time = round((time.time() - start_time) * 1000, 2)
-    response.headers["X-Process-Time-ms"] = str(process_time)
+    start_time = time.perf_counter()
+    IN_FLIGHT["value"] += 1
+    status = 500
+
+    profile = None
+    explicit = profile_requested(request.scope)
+    if explicit or PROFILE_SLOW_MS > 0:
+        profile = start_profile(request, explicit)
+        token = PROFILE_CURRENT.set(profile)
+
+    try:
+        response: Response = prerendered_response(request) or await call_next(request)
+        status = response.status_code
+    finally:
+        IN_FLIGHT["value"] -= 1
+        if profile is not None:
+            PROFILE_CURRENT.reset(token)
+        elapsed = time.perf_counter() - start_time
+        observe_request(route_label(request), request.method, status, elapsed)
+        if profile is not None:
+            finish_profile(profile, status, elapsed)
+    response.headers["X-Process-Time-ms"] = str(round(elapsed * 1000, 2))
     return response
 
 # =====================================================
@@ -2316,6 +6663,8 @@ async def process_time_middleware(request, call_next):
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    key = (route_label(request), type(exc).__name__)
+    ERROR_COUNT[key] = ERROR_COUNT.get(key, 0) + 1
     logging.error(f"[ERROR] {request.url} -> {str(exc)}")
     traceback.print_exc()
 
@@ -2342,8 +6691,29 @@ def startup_log():
     print("=====================================")
 
 
+@app.on_event("startup")
+def startup_prerender():
+    # 초기 데이터 로드 (import 시점) 후 경기전 페이지 사전 렌더링
+    start_prerender()
+
+
 @app.on_event("shutdown")
 def shutdown_log():
+    # 대기 중인 CSV 저장은 끝까지 기록
+    flush_persist()
+    if JOB_POOL is not None:
+        JOB_POOL.shutdown(wait=False, cancel_futures=True)
+    clear_job_sources()
     print("=====================================")
     print(" SecretCore PRO Server Shutdown")
-    print("=====================================")
\ No newline at end of file
+    print("=====================================")
+
+# 프로파일링: 동기 엔드포인트 실행 스레드 기록 (모든 라우트 정의 이후)
+bind_profile_routes()
+
+# =====================================================
+# 초기 데이터 로드 (빌더/메모리 예산 정의 이후 실행)
+# =====================================================
+
+if not job_worker.WORKER["active"]:
+    load_data()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -26,4 +26,9 @@ class AnalysisRecord(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="analyses")
\ No newline at end of file
+    owner = relationship("User", back_populates="analyses")
+
+    # 사용자별 최신순 이력 (keyset 페이지: created_at, id 순)
+    __table_args__ = (
+        Index("ix_analysis_records_user_created", "user_id", "created_at", "id"),
+    )
\ No newline at end of file